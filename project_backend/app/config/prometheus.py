@@ -1,8 +1,29 @@
 # \app\config\prometheus.py
-from prometheus_client import Counter, Gauge, Histogram
-from prometheus_fastapi_instrumentator import Instrumentator
-from fastapi import Request
+"""
+统一监控出口
+
+所有指标注册在默认注册表上，由本模块挂载唯一的 /metrics 端点。
+设置环境变量 PROMETHEUS_MULTIPROC_DIR 后进入多进程模式（多个uvicorn/gunicorn worker），
+各worker的指标写入共享目录，由 MultiProcessCollector 在抓取时聚合；
+进程内的客户端统计表无法跨进程聚合，按 worker 标签导出处理本次抓取的 worker 的数据。
+gunicorn 由 gunicorn.conf.py 的 child_exit 钩子调用 mark_worker_dead 清理退出 worker 的指标文件。
+Celery worker 没有 HTTP 服务，由主进程在 WORKER_METRICS_PORT 上单独暴露（见 start_worker_metrics_server）。
+"""
+import os
 import time
+from typing import Optional
+from prometheus_client import (
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    CollectorRegistry,
+    CONTENT_TYPE_LATEST,
+    generate_latest,
+    multiprocess,
+    start_http_server
+)
+from fastapi import Request, Response
 
 # ------------------------- 监控指标定义 -------------------------
 REQUEST_COUNT = Counter(
@@ -20,41 +41,92 @@ REQUEST_DURATION = Histogram(
 MODEL_LOAD_STATUS = Gauge(
     "model_load_status",
     "Current model load status (1=loaded, 0=error)",
-    ["model_name"]
+    ["model_name"],
+    multiprocess_mode="livemax"
 )
 
+# 不计入HTTP指标的端点
+EXCLUDED_PATHS = {"/health", "/metrics"}
+
+
+def is_multiprocess() -> bool:
+    """是否启用多进程指标模式"""
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+_multiprocess_registry: Optional[CollectorRegistry] = None
+
+
+def _get_multiprocess_registry() -> CollectorRegistry:
+    """多进程聚合注册表（首次抓取时创建）：各worker共享目录中的指标 + 本worker的客户端统计表"""
+    global _multiprocess_registry
+    if _multiprocess_registry is None:
+        from project_backend.app.utils.metrics import ClientStatsCollector, monitor
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(ClientStatsCollector(monitor.client_stats, worker=str(os.getpid())))
+        _multiprocess_registry = registry
+    return _multiprocess_registry
+
+
+def render_metrics() -> bytes:
+    """生成指标文本（多进程模式下聚合所有worker）"""
+    if is_multiprocess():
+        return generate_latest(_get_multiprocess_registry())
+    return generate_latest(REGISTRY)
+
+
 # ------------------------- 指标初始化 -------------------------
 def init_monitoring(app):
     """集成Prometheus监控到FastAPI应用"""
-    instrumentator = Instrumentator(
-        should_group_status_codes=False,
-        excluded_handlers=["/health", "/metrics"]
-    )
 
-    # 中间件用于测量请求持续时间
+    # 中间件用于测量请求持续时间（按路由模板聚合，避免路径参数导致标签爆炸）
     @app.middleware("http")
-    async def add_request_duration(request: Request, call_next):
-        start_time = time.time()
-        response = await call_next(request)
-        duration = time.time() - start_time
-
-        REQUEST_DURATION.labels(
-            method=request.method,
-            endpoint=request.url.path
-        ).observe(duration)
-
-        return response
-
-    # 注册自定义指标
-    instrumentator.add(
-        "http_requests_total",
-        REQUEST_COUNT,
-        lambda req, res: {
-            "method": req.method,
-            "endpoint": req.url.path,
-            "status_code": res.status_code
-        }
-    )
-
-    # 挂载到应用
-    instrumentator.instrument(app).expose(app)
+    async def add_request_metrics(request: Request, call_next):
+        if request.url.path in EXCLUDED_PATHS:
+            return await call_next(request)
+
+        start_time = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            REQUEST_DURATION.labels(
+                method=request.method,
+                endpoint=endpoint
+            ).observe(time.perf_counter() - start_time)
+            REQUEST_COUNT.labels(
+                method=request.method,
+                endpoint=endpoint,
+                status_code=status_code
+            ).inc()
+
+    # 唯一的指标出口
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+def start_worker_metrics_server(port: int):
+    """
+    Celery worker 的指标出口（在 worker 主进程启动）
+
+    prefork 子进程的指标只有在多进程模式下（PROMETHEUS_MULTIPROC_DIR）才能由主进程聚合
+    """
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    start_http_server(port, registry=registry)
+
+
+def mark_worker_dead(pid: int):
+    """worker退出时清理其多进程指标文件（供gunicorn child_exit钩子调用）"""
+    if is_multiprocess():
+        multiprocess.mark_process_dead(pid)
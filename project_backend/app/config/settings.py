@@ -2,8 +2,9 @@
 """
 项目配置中心（适配 Pydantic v2 规范）
 """
+import tempfile
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -80,9 +81,80 @@ class Settings(BaseSettings):
         default=False,
         description="是否启用SSL数据库连接"
     )
+    DB_MAX_CONNECTIONS: int = Field(
+        default=100,
+        gt=0,
+        description="本服务可占用的数据库连接总数（按UVICORN_WORKERS均分到各worker连接池）"
+    )
+    DB_POOL_SIZE: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description="每个worker的常驻连接数（None=按连接总预算自动推导）"
+    )
+    DB_MAX_OVERFLOW: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="每个worker的溢出连接数（None=按连接总预算自动推导）"
+    )
+    DB_POOL_TIMEOUT: float = Field(
+        default=10.0,
+        gt=0,
+        description="等待空闲连接的最长时间（秒）"
+    )
+    DB_POOL_PREWARM: bool = Field(
+        default=True,
+        description="启动时预先建立常驻连接，避免首批请求承担建连开销"
+    )
+    RESULT_PERSISTENCE_ENABLED: bool = Field(
+        default=False,
+        description="是否持久化视频流逐帧结果（需数据库可用）"
+    )
+    RESULT_FLUSH_BATCH_SIZE: int = Field(
+        default=500,
+        gt=0,
+        description="帧结果批量写入行数（达到即触发刷新）"
+    )
+    RESULT_FLUSH_INTERVAL: float = Field(
+        default=1.0,
+        gt=0,
+        description="帧结果最长刷新间隔（秒）"
+    )
+    RESULT_BUFFER_MAX_ROWS: int = Field(
+        default=50_000,
+        gt=0,
+        description="帧结果内存缓冲上限（行）"
+    )
+    RESULT_OVERFLOW_POLICY: Literal["drop", "spill"] = Field(
+        default="drop",
+        description="缓冲溢出策略：drop=丢弃最旧批次，spill=溢写到磁盘待回灌"
+    )
+    RESULT_SPILL_DIR: str = Field(
+        default=str(Path(tempfile.gettempdir()) / "frame_result_spill"),
+        description="帧结果溢写目录"
+    )
+    FRAME_RESULT_RETENTION_DAYS: int = Field(
+        default=30,
+        gt=0,
+        description="帧结果原始数据保留天数（过期分区整体删除，任务汇总保留）"
+    )
+    FRAME_PARTITION_PRECREATE_DAYS: int = Field(
+        default=3,
+        ge=0,
+        description="提前创建的日分区数"
+    )
     # ===================== 文件处理配置 =====================
     MAX_FPS: int = 30
     MAX_CONNECTIONS: int = 100
+    HEARTBEAT_INTERVAL: float = Field(
+        default=5.0,
+        gt=0,
+        description="心跳检测周期（秒）"
+    )
+    CONNECTION_TIMEOUT: float = Field(
+        default=30.0,
+        gt=0,
+        description="连接空闲超时（秒，期间未收到任何帧即关闭）"
+    )
     MAX_CONCURRENT_STREAMS: int = 100  # 最大并发流数量
     MAX_FRAME_SIZE: int = Field(
         default=1024 * 1024,  # 1MB
@@ -94,17 +166,217 @@ class Settings(BaseSettings):
         gt=0,
         description="最大带宽（Mbps）"
     )
+    MAX_CLIENT_BANDWIDTH_MBPS: float = Field(
+        default=4.0,
+        gt=0,
+        description="单客户端最大带宽（Mbps，实测入站+出站）"
+    )
+    BANDWIDTH_WINDOW_SECONDS: float = Field(
+        default=5.0,
+        gt=0,
+        description="带宽统计滑动窗口（秒）"
+    )
+    BANDWIDTH_BURST_FACTOR: float = Field(
+        default=1.5,
+        ge=1.0,
+        description="突发流量允许倍数（1秒窗口内相对带宽上限）"
+    )
     MAX_FILE_SIZE: int = Field(
         default=8 * 1024 * 1024,  # 8MB
         gt=0,
         description="允许上传的最大文件尺寸（字节）"
     )
+    UPLOAD_CHUNK_SIZE: int = Field(
+        default=64 * 1024,
+        gt=0,
+        description="上传文件分块读取大小（字节）"
+    )
+    UPLOAD_SNIFF_BYTES: int = Field(
+        default=64 * 1024,
+        ge=1024,
+        description="解析图像头最多读取的字节数（JPEG帧头可能位于较大的EXIF段之后）"
+    )
+    MAX_IMAGE_PIXELS: int = Field(
+        default=40_000_000,
+        gt=0,
+        description="上传图像允许的最大像素数（按文件头尺寸判断，拒绝解压炸弹）"
+    )
+
+    IMAGE_WORKERS: int = Field(
+        default=4,
+        gt=0,
+        description="图像处理流水线线程池大小"
+    )
+
+    OPENCV_THREADS: int = Field(
+        default=1,
+        ge=0,
+        description="OpenCV内部并行线程数（由线程池并行时设为1避免超订，0为OpenCV默认）"
+    )
+
+    IMAGE_MEMORY_LIMIT_MB: int = Field(
+        default=512,
+        gt=0,
+        description="单张图像处理的峰值内存上限（MB，超出时降采样解码或拒绝）"
+    )
+
+    IMAGE_TILE_THRESHOLD_PIXELS: int = Field(
+        default=4_000_000,
+        gt=0,
+        description="超过该像素数的图像分块处理"
+    )
+
+    IMAGE_TILE_SIZE: int = Field(
+        default=1024,
+        ge=64,
+        description="分块边长（像素，不含重叠边）"
+    )
+
+    IMAGE_TILE_WORKERS: int = Field(
+        default=4,
+        gt=0,
+        description="分块并行线程数"
+    )
 
     ALLOWED_IMAGE_TYPES: List[str] = Field(
         default=["image/jpeg", "image/png", "image/webp"],
         description="允许上传的图片MIME类型"
     )
 
+    # ===================== 过载保护配置 =====================
+    OVERLOAD_CHECK_INTERVAL: float = Field(
+        default=2.0,
+        gt=0,
+        description="过载调控器采样周期（秒）"
+    )
+    OVERLOAD_QUEUE_HIGH: int = Field(
+        default=8,
+        gt=0,
+        description="推理队列深度上阈值（超过即降级最重客户端）"
+    )
+    OVERLOAD_QUEUE_LOW: int = Field(
+        default=2,
+        ge=0,
+        description="推理队列深度下阈值（低于才允许恢复）"
+    )
+    OVERLOAD_P95_HIGH_MS: float = Field(
+        default=200.0,
+        gt=0,
+        description="推理P95延迟上阈值（毫秒）"
+    )
+    OVERLOAD_P95_LOW_MS: float = Field(
+        default=80.0,
+        gt=0,
+        description="推理P95延迟下阈值（毫秒）"
+    )
+    OVERLOAD_RECOVERY_SAMPLES: int = Field(
+        default=3,
+        gt=0,
+        description="连续多少个低负载采样后才恢复一级（迟滞）"
+    )
+
+    # ===================== 推理准入配置 =====================
+    CLASSIFY_MAX_INFLIGHT: int = Field(
+        default=16,
+        gt=0,
+        description="图像分类接口在途推理数上限（相同内容的合并请求只计一次，超出返回503）"
+    )
+    INFERENCE_RETRY_AFTER: int = Field(
+        default=1,
+        gt=0,
+        description="推理繁忙时 Retry-After 的最小秒数（实际取其与推理P95延迟的较大值）"
+    )
+
+    # ===================== 视频流跟踪与增量下发配置 =====================
+    TRACK_DETECT_INTERVAL: int = Field(
+        default=3,
+        gt=0,
+        description="视频流每隔多少帧运行一次检测（其余帧由跟踪器外推，1为每帧检测）"
+    )
+    TRACK_IOU_THRESHOLD: float = Field(
+        default=0.3,
+        gt=0,
+        le=1,
+        description="检测框与轨迹关联的最小IoU"
+    )
+    TRACK_MAX_MISSES: int = Field(
+        default=2,
+        ge=0,
+        description="轨迹连续多少轮检测未匹配后删除"
+    )
+    TRACK_GENDER_EMA: float = Field(
+        default=0.3,
+        gt=0,
+        le=1,
+        description="轨迹性别概率指数平滑系数（越小越平滑）"
+    )
+    TRACK_SMOOTHING: Literal["ema", "vote"] = Field(
+        default="ema",
+        description="轨迹性别平滑方式：ema=指数平滑+迟滞，vote=滑动窗口多数表决"
+    )
+    TRACK_VOTE_WINDOW: int = Field(
+        default=5,
+        gt=0,
+        description="多数表决的滑动窗口（检测次数）"
+    )
+    TRACK_LABEL_HYSTERESIS: float = Field(
+        default=0.1,
+        ge=0,
+        lt=0.5,
+        description="ema模式下标签切换的迟滞（平滑概率需越过 0.5±该值）"
+    )
+    STREAM_KEYFRAME_INTERVAL: float = Field(
+        default=2.0,
+        gt=0,
+        description="增量模式下全量结果下发间隔（秒）"
+    )
+    DELTA_CONFIDENCE_STEP: float = Field(
+        default=0.05,
+        ge=0,
+        description="增量模式下置信度变化超过该值才下发"
+    )
+    DELTA_BBOX_TOLERANCE: float = Field(
+        default=4.0,
+        ge=0,
+        description="增量模式下检测框坐标变化超过该像素数才下发"
+    )
+
+    # ===================== 画面变化检测配置 =====================
+    SCENE_CHANGE_THRESHOLD: float = Field(
+        default=0.015,
+        ge=0,
+        le=1,
+        description="画面变化量阈值（缩略图平均绝对差/255，低于该值的帧复用上一帧结果，0为不跳帧）"
+    )
+    SCENE_CUT_THRESHOLD: float = Field(
+        default=0.1,
+        gt=0,
+        le=1,
+        description="视为镜头切换的变化量（超过时立即重新检测，不沿用跟踪结果）"
+    )
+    SCENE_THUMB_SIZE: int = Field(
+        default=32,
+        ge=8,
+        description="画面变化检测缩略图边长（像素）"
+    )
+
+    # ===================== 监控配置 =====================
+    METRICS_MAX_CLIENTS: int = Field(
+        default=5000,
+        gt=0,
+        description="进程内客户端统计表条目上限（超出淘汰最久未活跃者）"
+    )
+    METRICS_TOP_K_CLIENTS: int = Field(
+        default=10,
+        ge=0,
+        description="以client_id为标签导出的Top-K客户端数量"
+    )
+    WORKER_METRICS_PORT: int = Field(
+        default=9101,
+        ge=0,
+        description="Celery worker 主进程的 /metrics 端口（聚合各子进程指标，0 表示不暴露）"
+    )
+
     # ===================== 模型配置 =====================
     MODEL_PATH: str = Field(
         default=str(Path(__file__).parent.parent / "ml_models/model_weights/gender.pt"),
@@ -127,6 +399,35 @@ class Settings(BaseSettings):
         description="分类标签列表"
     )
 
+    FACE_DETECTOR_PATH: Optional[str] = Field(
+        default=None,
+        description="YOLO人脸检测模型路径（设置后视频流使用“检测→裁剪→批量分类”两阶段识别）"
+    )
+
+    GENDER_CLASSIFIER_PATH: str = Field(
+        default=str(Path(__file__).parent.parent / "ml_models/model_weights/gender.onnx"),
+        description="两阶段识别中人脸性别分类的ONNX模型路径"
+    )
+
+    MAX_FACES_PER_FRAME: int = Field(
+        default=20,
+        gt=0,
+        description="单帧最多识别的人脸数（按检测置信度取前N个）"
+    )
+
+    FACE_DETECT_CONFIDENCE: float = Field(
+        default=0.4,
+        ge=0,
+        le=1,
+        description="人脸检测置信度阈值"
+    )
+
+    FACE_CROP_MARGIN: float = Field(
+        default=0.2,
+        ge=0,
+        description="人脸裁剪外扩比例（相对检测框宽高）"
+    )
+
     MODEL_SHA256: str = Field(
         default="14b0a93a5edd0bdcd89523239d7bdeacdf355e98878f81d6360eb68e4701fe73",
         min_length=64,
@@ -139,6 +440,18 @@ class Settings(BaseSettings):
         description="是否启用模型签名验证"
     )
 
+    MODEL_METADATA_CACHE_TTL: float = Field(
+        default=300.0,
+        gt=0,
+        description="模型元数据缓存有效期（秒）"
+    )
+
+    MODEL_METADATA_NEGATIVE_TTL: float = Field(
+        default=30.0,
+        gt=0,
+        description="模型元数据“不存在”及读库失败结果的缓存有效期（秒）"
+    )
+
     # ===================== Celery配置 =====================
     BROKER_URL: str = Field(
         default="redis://localhost:6379/0",
@@ -162,6 +475,56 @@ class Settings(BaseSettings):
         description="任务超时时间（秒）"
     )
 
+    CELERY_BATCH_SIZE: int = Field(
+        default=16,
+        gt=0,
+        description="批量任务单次合并的最大消息数"
+    )
+
+    CELERY_BATCH_INTERVAL: float = Field(
+        default=0.5,
+        gt=0,
+        description="批量任务未攒满时的最长等待时间（秒）"
+    )
+
+    CELERY_BATCH_THREADS: int = Field(
+        default=4,
+        gt=0,
+        description="批内并行处理线程数"
+    )
+
+    # ===================== 离线视频分析配置 =====================
+    MAX_VIDEO_FILE_SIZE: int = Field(
+        default=2 * 1024 * 1024 * 1024,  # 2GB
+        gt=0,
+        description="离线分析允许上传的最大视频尺寸（字节）"
+    )
+    VIDEO_FRAME_STRIDE: int = Field(
+        default=5,
+        gt=0,
+        description="默认取帧步长（每N帧分析一帧）"
+    )
+    VIDEO_SEGMENT_SECONDS: float = Field(
+        default=60.0,
+        gt=0,
+        description="默认分段时长（秒），各段由不同worker并行处理"
+    )
+    VIDEO_INFER_BATCH: int = Field(
+        default=16,
+        gt=0,
+        description="送入检测器的单批帧数"
+    )
+    VIDEO_WRITE_BATCH: int = Field(
+        default=5000,
+        gt=0,
+        description="帧结果攒满多少行批量写入一次（同时更新任务进度）"
+    )
+    VIDEO_SEEK_MIN_GAP: int = Field(
+        default=60,
+        gt=0,
+        description="相邻采样帧间隔超过该帧数时直接seek，否则逐帧grab（只解复用不解码）"
+    )
+
     # ===================== MinIO存储配置 =====================
     MINIO_ENDPOINT: str = Field(
         default="localhost:9000",
@@ -183,6 +546,42 @@ class Settings(BaseSettings):
         description="默认存储桶名称"
     )
 
+    MINIO_SECURE: bool = Field(
+        default=False,
+        description="是否通过HTTPS访问MinIO"
+    )
+
+    OBJECT_STORE_BACKEND: Literal["minio", "local"] = Field(
+        default="minio",
+        description="对象存储后端：minio=MinIO服务，local=本地目录（开发用，API与worker需共享）"
+    )
+
+    OBJECT_STORE_LOCAL_DIR: str = Field(
+        default=str(Path(tempfile.gettempdir()) / "object_store"),
+        description="本地对象存储根目录"
+    )
+
+    UPLOAD_PREFIX: str = Field(
+        default="uploads",
+        description="待处理上传图像的对象路径前缀"
+    )
+
+    RESULT_PREFIX: str = Field(
+        default="results",
+        description="处理结果图像的对象路径前缀"
+    )
+
+    FRAME_ARCHIVE_PREFIX: str = Field(
+        default="frame-archives",
+        description="帧结果列式归档的对象路径前缀"
+    )
+
+    FRAME_ARCHIVE_CHUNK_ROWS: int = Field(
+        default=50_000,
+        gt=0,
+        description="归档导出每批读取行数（即Parquet行组大小）"
+    )
+
     # ===================== 联系人信息 =====================
     CONTACT_NAME: str = Field(
         default="kong Team",
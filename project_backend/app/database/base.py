@@ -2,23 +2,51 @@
 
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import asyncio
-from sqlalchemy import text
+import time
+from sqlalchemy import event, text
 from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from project_backend.app.config.settings import settings
 from contextlib import asynccontextmanager
-from sqlalchemy import select, JSON
+from sqlalchemy import select, insert, update, and_, or_, func, JSON
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator, Optional, Sequence, Tuple
 from project_backend.app.database.declarative_base import Base
+from project_backend.app.database.metadata_cache import metadata_cache
+from project_backend.app.utils.metrics import monitor
 import logging
+import uuid
 import pymysql
 
 # ------------------------- 核心配置 -------------------------
-# 异步引擎配置（优化连接池）
+def _pool_params() -> dict:
+    """
+    推导每个worker的连接池参数
+
+    DB_MAX_CONNECTIONS 为整个服务的连接预算，按 UVICORN_WORKERS 均分，
+    每个worker约2/3为常驻连接、其余为溢出连接；显式配置的值优先。
+    """
+    per_worker = max(2, settings.DB_MAX_CONNECTIONS // settings.UVICORN_WORKERS)
+    pool_size = settings.DB_POOL_SIZE or max(1, per_worker * 2 // 3)
+    max_overflow = settings.DB_MAX_OVERFLOW
+    if max_overflow is None:
+        max_overflow = max(0, per_worker - pool_size)
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+
+# 异步引擎配置（连接池参数按worker数推导）
 async_engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG_MODE,
-    pool_size=5,
-    max_overflow=10,
+    poolclass=AsyncAdaptedQueuePool,
+    **_pool_params(),
     pool_recycle=3600,  # MySQL需要更频繁回收连接
     pool_pre_ping=True,
     connect_args={
@@ -28,6 +56,26 @@ async_engine = create_async_engine(
 )
 
 
+# ------------------------- 连接池监控 -------------------------
+def _report_pool_state(pool):
+    monitor.record_db_pool_state(pool.checkedout(), max(0, pool.overflow()))
+
+
+@event.listens_for(async_engine.sync_engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    monitor.record_db_connect()
+
+
+@event.listens_for(async_engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    _report_pool_state(async_engine.sync_engine.pool)
+
+
+@event.listens_for(async_engine.sync_engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    _report_pool_state(async_engine.sync_engine.pool)
+
+
 # 异步会话工厂（优化自动提交策略）
 AsyncSessionLocal = sessionmaker(
     bind=async_engine,
@@ -39,20 +87,32 @@ AsyncSessionLocal = sessionmaker(
 
 # ------------------------- 生命周期管理 -------------------------
 async def init_db():
-    """验证数据库连接池可用性"""
+    """验证数据库连接池可用性（常驻连接预热见 prewarm_pool，由应用启动时调用）"""
     from project_backend.app.database.models.frame import FrameResult
     from project_backend.app.database.models.task import Task
     from project_backend.app.database.models.metadata import ModelMetadata
+    from project_backend.app.database.models.rollup import TaskFrameRollup
+    from project_backend.app.database.partitions import ensure_partitions
     try:
         async with async_engine.connect() as conn:
             # 设置MySQL字符集
             await conn.execute(text("SET NAMES utf8mb4 COLLATE utf8mb4_unicode_ci"))
             await conn.run_sync(Base.metadata.create_all)
-            logging.info("数据库连接池初始化完成")
+            await conn.run_sync(ensure_partitions)  # 保证当天及后续分区存在
+            await conn.commit()
+        logging.info("数据库连接池初始化完成")
     except Exception as e:
         logging.critical("数据库连接失败: %s", str(e))
         raise
 
+async def prewarm_pool(count: Optional[int] = None):
+    """并发借出再归还 count 个连接（默认常驻连接数），使其留在池中"""
+    count = count or async_engine.sync_engine.pool.size()
+    conns = await asyncio.gather(*(async_engine.connect() for _ in range(count)))
+    for conn in conns:
+        await conn.close()
+    logging.info(f"数据库连接池已预热 {count} 个连接")
+
 async def close_db():
     """释放连接池资源"""
     await async_engine.dispose()
@@ -60,67 +120,242 @@ async def close_db():
 
 # ------------------------- 依赖注入增强 -------------------------
 @asynccontextmanager
-async def get_db() -> AsyncSession:
-    """支持重试机制的数据库会话获取"""
-    max_retries = 3
-    for attempt in range(max_retries):
-        session = None
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """
+    获取数据库会话（正常退出时提交，异常时回滚）
+
+    失效连接由 pool_pre_ping 在借出时检测并重连，这里不再重建会话重试；
+    连接池耗尽时在 DB_POOL_TIMEOUT 后抛出 TimeoutError。
+    进入时即借出连接并记录等待耗时（池事件只在借出成功后触发，得不到等待时间）。
+    """
+    async with AsyncSessionLocal() as session:
         try:
-            session = AsyncSessionLocal()
+            start = time.perf_counter()
+            await session.connection()
+            monitor.record_db_checkout(time.perf_counter() - start)
             yield session
             await session.commit()
-            break
-        except Exception as e:
-            if session:
-                await session.rollback()
-            if attempt == max_retries - 1:
-                logging.error(f"数据库连接失败（重试{max_retries}次）: {str(e)}")
-                raise
-            logging.warning(f"数据库连接重试 {attempt + 1}/{max_retries}")
-            await asyncio.sleep(0.1 * (attempt + 1))  # 指数退避
-        finally:
-            if session:
-                await session.close()
+        except Exception:
+            await session.rollback()
+            raise
 
 # ------------------------- 视频处理专用扩展 -------------------------
+def _chunked(rows: Iterable, size: int) -> Iterator[list]:
+    """按固定大小切分可迭代对象（不一次性物化全部行）"""
+    it = iter(rows)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
 class VideoProcessingDAL:
     """视频处理数据访问层（封装常见操作）"""
     def __init__(self, db: AsyncSession):
         self.db = db
 
+    # 批量写入的列顺序（bulk_ingest_frames 接收的元组即按此顺序）
+    FRAME_COLUMNS = ("id", "task_id", "frame_index", "gender", "confidence", "timestamp")
+
     async def bulk_save_results(self, frame_results: list, batch_size=1000):
-        # 修改为MySQL的UPSERT语法
-        from project_backend.app.database.models.frame import FrameResult
+        """批量保存ORM帧结果（兼容旧接口，内部转为元组走批量写入路径）"""
+        rows = [
+            (r.id or uuid.uuid4(), r.task_id, r.frame_index, r.gender, r.confidence, r.timestamp)
+            for r in frame_results
+        ]
+        return await self.bulk_ingest_frames(rows, batch_size=batch_size)
+
+    async def bulk_ingest_frames(self, rows: Iterable[Sequence], batch_size: int = 5000,
+                                 commit: bool = True) -> int:
+        """
+        按方言选择最快的批量写入方式（单事务）
+
+        参数:
+            rows: (id, task_id, frame_index, gender, confidence, timestamp) 元组序列，
+                  gender 可为 GenderEnum 或 "male"/"female"
+        返回:
+            写入行数
+
+        - PostgreSQL: COPY（asyncpg copy_records_to_table / psycopg cursor.copy，其他驱动回退 executemany）
+        - MySQL: 单条多行 INSERT
+        - 其他: executemany
+        每批同时累加 task_frame_rollups 汇总（同一事务）。
+
+        写入只追加、不去重：主键为 (id, created_at) 且 created_at 由库生成，
+        重放同一批会产生重复帧并重复计入汇总。调用方只能在事务整体回滚后重试
+        （写回缓冲即如此），不要对已提交的批次重放。
+        """
+        from project_backend.app.database.models.frame import GenderEnum
+
+        def normalize(row):
+            gender = row[3] if isinstance(row[3], GenderEnum) else GenderEnum(row[3])
+            return (row[0], row[1], row[2], gender, row[4], row[5])
+
+        dialect = self.db.bind.dialect
+        total = 0
+        for batch in _chunked(map(normalize, rows), batch_size):
+            if dialect.name == "postgresql" and dialect.driver in ("asyncpg", "psycopg"):
+                await self._copy_frames(batch, dialect.driver)
+            elif dialect.name == "mysql":
+                await self._insert_frames_mysql(batch)
+            else:
+                from project_backend.app.database.models.frame import FrameResult
+                await self.db.execute(
+                    insert(FrameResult),
+                    [dict(zip(self.FRAME_COLUMNS, row)) for row in batch]
+                )
+            await self._accumulate_rollups(batch)
+            total += len(batch)
+
+        if commit:
+            await self.db.commit()
+        return total
 
-        # 分批次处理
-        for i in range(0, len(frame_results), batch_size):
-            batch = frame_results[i:i + batch_size]
-            insert_stmt = mysql_insert(FrameResult).values(
-                [r.to_dict() for r in batch]
+    async def _copy_frames(self, batch: list, driver: str):
+        """PostgreSQL COPY 写入（复用当前会话连接与事务）"""
+        conn = await self.db.connection()
+        raw = await conn.get_raw_connection()
+        records = [(r[0], r[1], r[2], r[3].name, r[4], r[5]) for r in batch]
+        if driver == "asyncpg":
+            await raw.driver_connection.copy_records_to_table(
+                "frame_results", records=records, columns=self.FRAME_COLUMNS
             )
+            return
+        async with raw.driver_connection.cursor() as cursor:
+            async with cursor.copy(
+                f"COPY frame_results ({', '.join(self.FRAME_COLUMNS)}) FROM STDIN"
+            ) as copy:
+                for record in records:
+                    await copy.write_row(record)
+
+    async def _insert_frames_mysql(self, batch: list):
+        """MySQL 单条多行 INSERT（只追加，见 bulk_ingest_frames）"""
+        from project_backend.app.database.models.frame import FrameResult
+
+        await self.db.execute(
+            insert(FrameResult).values([dict(zip(self.FRAME_COLUMNS, row)) for row in batch])
+        )
+
+    # 汇总表中按批累加的计数列
+    ROLLUP_COUNTERS = ("frame_count", "male_count", "female_count", "confidence_sum")
+
+    async def _accumulate_rollups(self, batch: list):
+        """按任务聚合本批帧结果并累加到汇总表（upsert，无需读取原始帧）"""
+        from project_backend.app.database.models.frame import GenderEnum
+        from project_backend.app.database.models.rollup import TaskFrameRollup
+
+        totals = {}
+        for _, task_id, _, gender, confidence, _ in batch:
+            t = totals.setdefault(task_id, dict.fromkeys(self.ROLLUP_COUNTERS, 0))
+            t["frame_count"] += 1
+            t["male_count" if gender is GenderEnum.MALE else "female_count"] += 1
+            t["confidence_sum"] += confidence or 0.0
+        # 固定加锁顺序，避免并发写入时互相死锁
+        values = [{"task_id": task_id, **t} for task_id, t in sorted(totals.items(), key=lambda kv: str(kv[0]))]
 
-            # 冲突处理（假设主键为id）
-            on_duplicate_key_stmt = insert_stmt.on_duplicate_key_update(
-                {k: insert_stmt.inserted[k] for k in batch[0].to_dict().keys() if k != 'id'}
+        dialect = self.db.bind.dialect.name
+        if dialect == "mysql":
+            stmt = mysql_insert(TaskFrameRollup).values(values)
+            stmt = stmt.on_duplicate_key_update({
+                **{k: getattr(TaskFrameRollup, k) + stmt.inserted[k] for k in self.ROLLUP_COUNTERS},
+                "updated_at": func.now()
+            })
+        else:
+            upsert = pg_insert if dialect == "postgresql" else sqlite_insert
+            stmt = upsert(TaskFrameRollup).values(values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["task_id"],
+                set_={
+                    **{k: getattr(TaskFrameRollup, k) + stmt.excluded[k] for k in self.ROLLUP_COUNTERS},
+                    "updated_at": func.now()
+                }
             )
-            await self.db.execute(on_duplicate_key_stmt)
+        await self.db.execute(stmt)
+
+    async def get_task_rollup(self, task_id):
+        """读取任务汇总（不存在返回None）"""
+        from project_backend.app.database.models.rollup import TaskFrameRollup
+
+        return await self.db.get(TaskFrameRollup, task_id)
+
+    async def set_task_archive(self, task_id, archive_path: str):
+        """记录任务列式归档的对象路径"""
+        from project_backend.app.database.models.task import Task
+
+        await self.db.execute(
+            update(Task).where(Task.id == task_id).values(archive_path=archive_path)
+        )
+        await self.db.commit()
+
+    async def create_task(self, result: Optional[dict] = None):
+        """新建待处理任务，返回任务ID"""
+        from project_backend.app.database.models.task import Task, TaskStatus
+
+        task = Task(id=uuid.uuid4(), status=TaskStatus.PENDING, progress=0.0, result=result or {})
+        self.db.add(task)
+        await self.db.commit()
+        return task.id
+
+    async def get_task(self, task_id):
+        from project_backend.app.database.models.task import Task
+
+        return await self.db.get(Task, task_id)
+
+    async def update_task(self, task_id, status=None, progress: Optional[float] = None,
+                          result_updates: Optional[dict] = None):
+        """更新任务状态/进度，result_updates 合并进已有的 result"""
+        from project_backend.app.database.models.task import Task
+
+        task = await self.db.get(Task, task_id)
+        if task is None:
+            raise ValueError(f"任务不存在: {task_id}")
+        if status is not None:
+            task.status = status
+        if progress is not None:
+            task.progress = progress
+        if result_updates:
+            task.result = {**(task.result or {}), **result_updates}  # 新对象，JSON列才会被标记为已修改
+        await self.db.commit()
+
+    async def advance_task_progress(self, task_id, delta: float, commit: bool = True):
+        """原子累加任务进度（多个 worker 并发更新同一任务）"""
+        from project_backend.app.database.models.task import Task
+
+        await self.db.execute(
+            update(Task).where(Task.id == task_id).values(progress=func.coalesce(Task.progress, 0.0) + delta)
+        )
+        if commit:
             await self.db.commit()
 
-    async def get_model_metadata(self, model_name: str):
-        """获取模型元数据（增加缓存机制）"""
+    async def get_model_metadata(self, model_name: str, version: Optional[str] = None):
+        """获取模型元数据（进程内读穿缓存，TTL内不访问数据库）"""
         from project_backend.app.database.models.metadata import ModelMetadata
 
-        # 使用带缓存的查询
-        result = await self.db.execute(
-            select(ModelMetadata)
-            .execution_options(populate_existing=True)  # 强制刷新缓存
-            .where(ModelMetadata.name == model_name)
-        )
-        return result.scalars().first()
+        async def load():
+            stmt = select(ModelMetadata).where(ModelMetadata.name == model_name)
+            if version is not None:
+                stmt = stmt.where(ModelMetadata.version == version)
+            else:
+                stmt = stmt.order_by(ModelMetadata.created_at.desc())
+            result = await self.db.execute(stmt.limit(1))
+            record = result.scalars().first()
+            if record is not None:
+                self.db.expunge(record)  # 脱离会话后再缓存，避免跨会话共享状态
+            return record
+
+        return await metadata_cache.get(model_name, version, load)
+
+    async def register_model_metadata(self, **fields):
+        """登记新模型版本并使该模型名的缓存失效"""
+        from project_backend.app.database.models.metadata import ModelMetadata
+
+        record = ModelMetadata(**fields)
+        self.db.add(record)
+        await self.db.commit()
+        metadata_cache.invalidate(record.name)
+        return record
 
     # 新增分页查询方法
     async def paginated_query(self, model_class, page: int = 1, per_page: int = 100):
-        """MySQL优化分页查询"""
+        """MySQL优化分页查询（OFFSET随页深线性变慢，大表请用 frames_after）"""
         offset_val = (page - 1) * per_page
         result = await self.db.execute(
             select(model_class)
@@ -128,4 +363,47 @@ class VideoProcessingDAL:
             .limit(per_page)
             .offset(offset_val)
         )
-        return result.scalars().all()
\ No newline at end of file
+        return result.scalars().all()
+
+    # 键集（seek）分页：按 (task_id, frame_index, id) 定位，深页与首页代价相同
+    async def frames_after(self, task_id, after: Optional[Tuple[int, uuid.UUID]] = None,
+                           limit: int = 100) -> list:
+        """
+        按帧序号分页读取任务帧结果
+
+        参数:
+            after: 上一页最后一行的 (frame_index, id)，None 表示从头开始
+        """
+        from project_backend.app.database.models.frame import FrameResult
+
+        stmt = select(FrameResult).where(FrameResult.task_id == task_id)
+        if after is not None:
+            frame_index, last_id = after
+            # 展开写法便于优化器使用 (task_id, frame_index, id) 复合索引
+            stmt = stmt.where(or_(
+                FrameResult.frame_index > frame_index,
+                and_(FrameResult.frame_index == frame_index, FrameResult.id > last_id)
+            ))
+        result = await self.db.execute(
+            stmt.order_by(FrameResult.frame_index, FrameResult.id).limit(limit)
+        )
+        return result.scalars().all()
+
+    async def stream_task_frames(self, task_id, chunk_size: int = 1000) -> AsyncIterator[list]:
+        """服务端游标逐块读取任务全部帧结果（不一次性加载）"""
+        from project_backend.app.database.models.frame import FrameResult
+
+        result = await self.db.stream(
+            select(
+                FrameResult.frame_index,
+                FrameResult.gender,
+                FrameResult.confidence,
+                FrameResult.timestamp
+            )
+            .where(FrameResult.task_id == task_id)
+            .order_by(FrameResult.frame_index, FrameResult.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for partition in result.partitions():
+            yield partition
+
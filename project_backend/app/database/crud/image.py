@@ -1,21 +1,109 @@
 # \app\database\crud\image.py
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from sqlalchemy import and_, or_, select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from project_backend.app.database.models.image_record import ImageProcessRecord
 
-def create_image_record(db: Session, input_path: str, output_path: str, user_id: int = None):
-    """创建图像处理记录"""
-    db_record = ImageProcessRecord(
-        input_path=input_path,
-        output_path=output_path,
-        user_id=user_id
+async def create_image_record(db: AsyncSession, input_path: str, output_path: str,
+                              user_id: int = None, status: str = "success") -> int:
+    """创建图像处理记录，返回记录ID（RETURNING/lastrowid，无需refresh往返）"""
+    result = await db.execute(
+        insert(ImageProcessRecord).values(
+            input_path=input_path,
+            output_path=output_path,
+            user_id=user_id,
+            status=status
+        )
     )
-    db.add(db_record)
-    db.commit()
-    db.refresh(db_record)
-    return db_record
+    await db.commit()
+    return result.inserted_primary_key[0]
 
-def get_records_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100):
+async def bulk_create_image_records(db: AsyncSession, records: List[dict]) -> Optional[List[int]]:
+    """
+    批量创建图像处理记录（单条语句多行写入）
+
+    返回:
+        支持 executemany RETURNING 的方言（PostgreSQL/MariaDB/SQLite）返回ID列表，否则返回None
+    """
+    if not records:
+        return []
+    stmt = insert(ImageProcessRecord)
+    if db.bind.dialect.insert_executemany_returning:
+        result = await db.execute(stmt.returning(ImageProcessRecord.id), records)
+        ids = list(result.scalars())
+    else:
+        await db.execute(stmt, records)
+        ids = None
+    await db.commit()
+    return ids
+
+class ImageRecordBatcher:
+    """
+    图像处理记录批量收集器
+
+    用法:
+        async with ImageRecordBatcher(session, batch_size=50) as batcher:
+            await batcher.add(input_path=..., output_path=...)
+    每收集 batch_size 条写入一次，退出上下文时写入剩余记录。
+    """
+
+    def __init__(self, db: AsyncSession, batch_size: int = 50):
+        self.db = db
+        self.batch_size = batch_size
+        self._pending: List[dict] = []
+        self.ids: List[int] = []
+
+    async def add(self, input_path: str, output_path: str, user_id: int = None, status: str = "success"):
+        self._pending.append({
+            "input_path": input_path,
+            "output_path": output_path,
+            "user_id": user_id,
+            "status": status
+        })
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        pending, self._pending = self._pending, []
+        ids = await bulk_create_image_records(self.db, pending)
+        if ids:
+            self.ids.extend(ids)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.flush()
+
+async def get_records_by_user(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100):
     """查询用户的所有处理记录"""
-    return db.query(ImageProcessRecord).filter(
-        ImageProcessRecord.user_id == user_id
-    ).offset(skip).limit(limit).all()
\ No newline at end of file
+    result = await db.execute(
+        select(ImageProcessRecord)
+        .where(ImageProcessRecord.user_id == user_id)
+        .offset(skip)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+async def get_records_by_user_after(db: AsyncSession, user_id: int, after: tuple = None, limit: int = 100):
+    """
+    键集分页查询用户记录（按创建时间倒序）
+
+    参数:
+        after: 上一页最后一条的 (created_at, id)，None 表示第一页
+    """
+    stmt = select(ImageProcessRecord).where(ImageProcessRecord.user_id == user_id)
+    if after is not None:
+        created_at, last_id = after
+        stmt = stmt.where(or_(
+            ImageProcessRecord.created_at < created_at,
+            and_(ImageProcessRecord.created_at == created_at, ImageProcessRecord.id < last_id)
+        ))
+    result = await db.execute(
+        stmt.order_by(
+            ImageProcessRecord.created_at.desc(),
+            ImageProcessRecord.id.desc()
+        ).limit(limit)
+    )
+    return result.scalars().all()
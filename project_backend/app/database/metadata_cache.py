@@ -0,0 +1,101 @@
+# app/database/metadata_cache.py
+"""
+ModelMetadata 进程内读穿缓存
+
+按 (name, version) 缓存查询结果（含“不存在”的负缓存），到期后重新读库；
+读库失败同样按负缓存TTL缓存并直接抛出，数据库不可用期间不反复等待连接超时；
+注册新模型或 ModelManager 重载模型时显式失效。
+"""
+import asyncio
+import time
+import threading
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from project_backend.app.config.settings import settings
+
+CacheKey = Tuple[str, Optional[str]]
+
+_MISSING = object()  # 负缓存标记（数据库中不存在）
+
+
+class _Failure:
+    """负缓存标记（读库失败），命中时重新抛出原异常"""
+    __slots__ = ("error",)
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class ModelMetadataCache:
+    """带TTL与负缓存的读穿缓存（缓存对象为只读的脱离会话实例）"""
+
+    def __init__(self):
+        self._entries: Dict[CacheKey, Tuple[float, object]] = {}
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._generation = 0  # 每次失效递增，丢弃失效前发起的读库结果
+
+    async def get(self, name: str, version: Optional[str], loader: Callable[[], Awaitable]):
+        """
+        读取缓存，未命中时调用 loader 读库并回填
+
+        参数:
+            version: None 表示该名称下的任意（最新）版本
+        """
+        key = (name, version)
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                if isinstance(entry[1], _Failure):
+                    raise entry[1].error.with_traceback(None)
+                return None if entry[1] is _MISSING else entry[1]
+
+            # 同一键并发未命中只读库一次
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise  # 当前协程自身被取消
+                # 发起读库的请求被取消（如客户端断开），由当前协程重新读库
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generation
+        try:
+            value = await loader()
+            ttl = settings.MODEL_METADATA_CACHE_TTL if value is not None else settings.MODEL_METADATA_NEGATIVE_TTL
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[key] = (time.monotonic() + ttl, _MISSING if value is None else value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()  # 唤醒等待者，由其自行重试
+            raise
+        except Exception as e:
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[key] = (time.monotonic() + settings.MODEL_METADATA_NEGATIVE_TTL, _Failure(e))
+            future.set_exception(e)
+            future.exception()  # 标记已取回，避免无人等待时的告警
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, name: Optional[str] = None):
+        """失效指定模型名的所有版本；name 为 None 时清空全部"""
+        with self._lock:
+            self._generation += 1
+            if name is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == name]:
+                    del self._entries[key]
+
+
+# 单例实例
+metadata_cache = ModelMetadataCache()
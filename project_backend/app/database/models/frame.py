@@ -1,6 +1,7 @@
 # app/database/models/frame.py
-from sqlalchemy import Column, Float, ForeignKey, Integer, Enum
-from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+import uuid
+from sqlalchemy import Column, DateTime, Float, Integer, Enum, Uuid, Index, DDL, event
+from sqlalchemy.sql import func
 from project_backend.app.database.declarative_base import Base
 from sqlalchemy.orm import relationship
 from enum import Enum as PyEnum
@@ -11,11 +12,49 @@ class GenderEnum(PyEnum):
 
 class FrameResult(Base):
     __tablename__ = "frame_results"
+    __table_args__ = (
+        # 键集分页/导出按 (task_id, frame_index, id) 顺序扫描；
+        # PostgreSQL 附带结果列构成覆盖索引，避免回表
+        Index(
+            "ix_frame_results_task_frame",
+            "task_id", "frame_index", "id",
+            postgresql_include=["gender", "confidence", "timestamp"]
+        ),
+        # 按 created_at 每天一个分区，保留期外整分区删除（见 app/database/partitions.py）；
+        # MySQL 分区在 manual_migrate.py 中建表后转换
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    id = Column(PG_UUID(as_uuid=True), primary_key=True, index=True)  # 使用UUID
-    task_id = Column(PG_UUID(as_uuid=True), ForeignKey("tasks.id",ondelete="CASCADE"))  # 关联主任务表
+    # Uuid：PostgreSQL映射原生UUID，MySQL映射CHAR(32)
+    id = Column(Uuid, primary_key=True, index=True, default=uuid.uuid4)  # 使用UUID
+    # 分区键须包含在主键中，故主键为 (id, created_at)；created_at 由库生成，
+    # 主键无法对重放去重，帧写入只追加（见 VideoProcessingDAL.bulk_ingest_frames）
+    created_at = Column(
+        DateTime,
+        primary_key=True,
+        default=func.now(),
+        server_default=func.now(),
+        comment="写入时间（分区键）"
+    )
+    # 不建数据库外键：MySQL分区表不支持外键，且帧结果随分区过期删除而非级联删除
+    task_id = Column(Uuid, nullable=False, comment="关联主任务ID")
     frame_index = Column(Integer, comment="视频帧序号")
     gender = Column(Enum(GenderEnum), comment="性别分类结果")
     confidence = Column(Float, comment="置信度")
     timestamp = Column(Float, comment="帧对应的时间戳（秒）")
-    task = relationship("Task", back_populates="frames")  # 新增
\ No newline at end of file
+    task = relationship(
+        "Task",
+        primaryjoin="foreign(FrameResult.task_id) == Task.id",
+        back_populates="frames",
+        viewonly=True
+    )
+
+
+# PostgreSQL 建表时同时建兜底分区：日分区缺失（定时任务漏跑、create_all 新建的库）时写入不失败，
+# 补建日分区时再从兜底分区迁出（见 partitions.ensure_partitions）
+event.listen(
+    FrameResult.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS frame_results_default PARTITION OF frame_results DEFAULT")
+    .execute_if(dialect="postgresql")
+)
@@ -1,13 +1,18 @@
 # \app\database\models\image_record.py
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from datetime import datetime
 from project_backend.app.database.declarative_base import Base
 
 class ImageProcessRecord(Base):
     __tablename__ = "image_process_records"
+    __table_args__ = (
+        # 用户记录键集分页 (user_id, created_at, id)
+        Index("ix_image_process_records_user_created", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id", nullable=True))  # 关联用户（可选）
+    # 关联用户（可选）；库中没有 users 表，不建外键，由复合索引支撑按用户查询
+    user_id = Column(Integer, nullable=True)
     input_path = Column(String(500), nullable=False)
     output_path = Column(String(500), nullable=False)
     status = Column(String(50), default="pending")  # 如: pending, success, failed
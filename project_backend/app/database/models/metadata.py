@@ -1,8 +1,8 @@
 # app/models/metadata.py
-from sqlalchemy import Column, String, JSON, Float, DateTime, UniqueConstraint, CheckConstraint
+import uuid
+from sqlalchemy import Column, String, JSON, Float, DateTime, UniqueConstraint, CheckConstraint, Uuid
 from sqlalchemy.sql import func
 from project_backend.app.database.declarative_base import Base
-from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 class ModelMetadata(Base):
     __tablename__ = "model_metadata"
     __table_args__ = (
@@ -11,7 +11,7 @@ class ModelMetadata(Base):
     )
 
     # 独立UUID主键
-    id = Column(PG_UUID(as_uuid=True), primary_key=True)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     name = Column(String(50), nullable=False, comment="模型名称（如 'gender_classifier'）")
     version = Column(String(20), nullable=False, comment="语义化版本（如 'v1.0.0'）")
     parameters = Column(JSON, comment="训练超参数（如学习率、批大小）")
@@ -0,0 +1,24 @@
+# app/database/models/rollup.py
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, Uuid
+from sqlalchemy.sql import func
+from project_backend.app.database.declarative_base import Base
+
+class TaskFrameRollup(Base):
+    """任务级帧结果汇总（随批量写入增量累加，看板查询无需扫描原始帧）"""
+    __tablename__ = "task_frame_rollups"
+
+    task_id = Column(Uuid, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    frame_count = Column(Integer, nullable=False, default=0, comment="帧结果总数")
+    male_count = Column(Integer, nullable=False, default=0, comment="male 帧数")
+    female_count = Column(Integer, nullable=False, default=0, comment="female 帧数")
+    confidence_sum = Column(Float, nullable=False, default=0.0, comment="置信度累计（均值=累计/帧数）")
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        comment="最近累加时间"
+    )
+
+    @property
+    def mean_confidence(self) -> float:
+        return self.confidence_sum / self.frame_count if self.frame_count else 0.0
@@ -1,8 +1,8 @@
 # \app\database\models\task.py
+import uuid
 from enum import Enum as PyEnum
-from sqlalchemy import Column, JSON, DateTime, Enum
+from sqlalchemy import Column, JSON, DateTime, Enum, Float, String, Uuid
 from sqlalchemy.sql import func
-from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import relationship
 from project_backend.app.database.declarative_base import Base
 
@@ -16,12 +16,12 @@ class TaskStatus(str, PyEnum):
 class Task(Base):
     __tablename__ = "tasks"
 
-    # UUID主键（PostgreSQL原生支持）
+    # UUID主键（跨方言：PostgreSQL原生UUID，MySQL为CHAR(32)）
     id = Column(
-        PG_UUID(as_uuid=True),
+        Uuid,
         primary_key=True,
         index=True,
-        server_default=func.uuid_generate_v4()  # 自动生成UUID
+        default=uuid.uuid4  # 应用侧生成UUID
     )
 
     # 状态字段（显式声明枚举类型名称）
@@ -34,6 +34,12 @@ class Task(Base):
     # 处理结果（存储JSON格式）
     result = Column(JSON, comment="模型处理结果")
 
+    # 处理进度（0~1，离线视频分析各段按已处理帧数原子累加）
+    progress = Column(Float, comment="处理进度")
+
+    # 帧结果列式归档（Parquet）在对象存储中的路径（bucket/key）
+    archive_path = Column(String(512), comment="帧结果归档对象路径")
+
     # 时间戳（自动管理）
     created_at = Column(
         DateTime(timezone=True),
@@ -41,10 +47,10 @@ class Task(Base):
         comment="创建时间"
     )
 
-    # 关联的帧结果（级联删除）
+    # 关联的帧结果（无数据库外键，原始帧随分区保留期删除，不做级联删除）
     frames = relationship(
         "FrameResult",
+        primaryjoin="Task.id == foreign(FrameResult.task_id)",
         back_populates="task",
-        cascade="all, delete-orphan",
-        passive_deletes=True
+        viewonly=True
     )
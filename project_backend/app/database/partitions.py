@@ -0,0 +1,235 @@
+# app/database/partitions.py
+"""
+frame_results 按天范围分区管理
+
+- PostgreSQL: 声明式分区（模型中 PARTITION BY RANGE (created_at)），每天一个子表 frame_results_pYYYYMMDD，
+  DEFAULT 分区 frame_results_default 兜底（日分区缺失时写入不失败，补建日分区时迁出对应行）
+- MySQL: RANGE (TO_DAYS(created_at))，每天一个分区 pYYYYMMDD，末尾 pmax 兜底，新分区从 pmax 拆出
+
+保留期外的数据整分区删除（DROP TABLE / DROP PARTITION），不做逐行 DELETE。
+所有函数接收同步 Connection，异步场景通过 AsyncConnection.run_sync 调用。
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from project_backend.app.config.settings import settings
+
+TABLE = "frame_results"
+LEGACY_TABLE = "frame_results_legacy"
+MAXVALUE_PARTITION = "pmax"
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+def _partition_name(day: date) -> str:
+    return f"p{day:%Y%m%d}"
+
+
+def _partition_day(name: str) -> Optional[date]:
+    """从分区名末尾的 YYYYMMDD 解析日期（pmax 等返回 None）"""
+    try:
+        return datetime.strptime(name[-8:], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def _days(start: date, end: date) -> List[date]:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+# ------------------------- 分区查询 -------------------------
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name == "postgresql":
+        relkind = conn.scalar(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"), {"t": TABLE}
+        )
+        return relkind == "p"
+    if conn.dialect.name == "mysql":
+        return bool(conn.scalar(text(
+            "SELECT COUNT(*) FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND PARTITION_NAME IS NOT NULL"
+        ), {"t": TABLE}))
+    return False
+
+
+def list_partitions(conn: Connection) -> List[Tuple[str, date]]:
+    """返回按日期排序的 (分区名, 日期)，不含兜底分区"""
+    if conn.dialect.name == "postgresql":
+        names = conn.scalars(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:t)"
+        ), {"t": TABLE}).all()
+    elif conn.dialect.name == "mysql":
+        names = conn.scalars(text(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND PARTITION_NAME IS NOT NULL"
+        ), {"t": TABLE}).all()
+    else:
+        return []
+    parts = [(name, _partition_day(name)) for name in names]
+    return sorted((p for p in parts if p[1] is not None), key=lambda p: p[1])
+
+
+# ------------------------- 分区维护 -------------------------
+def ensure_partitions(conn: Connection, start: Optional[date] = None,
+                      days_ahead: Optional[int] = None) -> List[str]:
+    """预建 start（默认今天）至今天+days_ahead 的日分区，返回新建的分区名"""
+    if not is_partitioned(conn):
+        return []
+    today = date.today()
+    days_ahead = settings.FRAME_PARTITION_PRECREATE_DAYS if days_ahead is None else days_ahead
+    existing = {day for _, day in list_partitions(conn)}
+    wanted = [d for d in _days(start or today, today + timedelta(days=days_ahead)) if d not in existing]
+    if not wanted:
+        return []
+
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+        for day in wanted:
+            _attach_postgresql(conn, day)
+    else:
+        # MySQL 范围分区只能在末尾追加：从 pmax 拆出晚于现有最后分区的日期
+        last = max(existing) if existing else None
+        wanted = [d for d in wanted if last is None or d > last]
+        if not wanted:
+            return []
+        conn.execute(text(
+            f"ALTER TABLE {TABLE} REORGANIZE PARTITION {MAXVALUE_PARTITION} INTO ("
+            + _mysql_partition_defs(wanted) + ")"
+        ))
+
+    names = [_partition_name(d) for d in wanted]
+    logging.info(f"frame_results 新建分区: {', '.join(names)}")
+    return names
+
+
+def _attach_postgresql(conn: Connection, day: date):
+    """
+    新建日分区：兜底分区中已有该日的行时无法直接 PARTITION OF，
+    故先建独立表、从兜底分区迁入该日的行，再挂载为分区
+    """
+    name = f"{TABLE}_{_partition_name(day)}"
+    bounds = {"lo": day, "hi": day + timedelta(days=1)}
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)"))
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE created_at >= :lo AND created_at < :hi RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    conn.execute(text(
+        f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{bounds['lo']}') TO ('{bounds['hi']}')"
+    ))
+
+
+def drop_partitions_before(conn: Connection, cutoff: date) -> List[str]:
+    """整分区删除 cutoff 之前的数据，返回删除的分区名"""
+    expired = [name for name, day in list_partitions(conn) if day < cutoff]
+    if not expired:
+        return []
+    if conn.dialect.name == "postgresql":
+        for name in expired:
+            conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+    else:
+        conn.execute(text(f"ALTER TABLE {TABLE} DROP PARTITION {', '.join(expired)}"))
+    logging.info(f"frame_results 删除过期分区: {', '.join(expired)}")
+    return expired
+
+
+def rotate_partitions(conn: Connection, retention_days: Optional[int] = None) -> List[str]:
+    """保留期维护：预建后续分区并删除过期分区（由定时任务每天调用）"""
+    retention_days = settings.FRAME_RESULT_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = date.today() - timedelta(days=retention_days)
+    ensure_partitions(conn)
+    if conn.dialect.name == "postgresql" and is_partitioned(conn):
+        # 兜底分区只承接日分区缺失期间的少量行，逐行删除过期数据
+        conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at < :cutoff"), {"cutoff": cutoff})
+    return drop_partitions_before(conn, cutoff)
+
+
+def _mysql_partition_defs(days: List[date]) -> str:
+    defs = [
+        f"PARTITION {_partition_name(d)} VALUES LESS THAN (TO_DAYS('{d + timedelta(days=1)}'))"
+        for d in days
+    ]
+    defs.append(f"PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN MAXVALUE")
+    return ", ".join(defs)
+
+
+# ------------------------- 迁移 -------------------------
+def partition_frame_results(conn: Connection) -> bool:
+    """
+    将 frame_results 转换为分区表（幂等，已分区则只预建分区）
+
+    旧表中的帧没有写入时间，按所属任务的 created_at 回填；
+    早于保留期的旧数据不再迁移（PostgreSQL）或落入首个分区随下次维护删除（MySQL）。
+    返回是否执行了转换。
+    """
+    if is_partitioned(conn):
+        ensure_partitions(conn)
+        return False
+    if conn.dialect.name == "postgresql":
+        _partition_postgresql(conn)
+    elif conn.dialect.name == "mysql":
+        _partition_mysql(conn)
+    else:
+        logging.warning(f"{conn.dialect.name} 不支持分区，frame_results 保持普通表")
+        return False
+    logging.info("frame_results 已转换为按天分区表")
+    return True
+
+
+def _retention_start(first: Optional[datetime]) -> date:
+    floor = date.today() - timedelta(days=settings.FRAME_RESULT_RETENTION_DAYS)
+    return max(first.date(), floor) if first else date.today()
+
+
+def _partition_postgresql(conn: Connection):
+    """PostgreSQL 无法原地分区：旧表改名后新建分区表并回填"""
+    from project_backend.app.database.models.frame import FrameResult
+
+    table = FrameResult.__table__
+    conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {LEGACY_TABLE}"))
+    # 主键/索引名随表名保留，先移除以免与新表冲突
+    conn.execute(text(f"ALTER TABLE {LEGACY_TABLE} DROP CONSTRAINT IF EXISTS {TABLE}_pkey"))
+    for index in table.indexes:
+        conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    table.create(conn, checkfirst=True)
+
+    first = conn.scalar(text(
+        f"SELECT MIN(t.created_at) FROM {LEGACY_TABLE} f JOIN tasks t ON t.id = f.task_id"
+    ))
+    start = _retention_start(first)
+    ensure_partitions(conn, start=start)
+    conn.execute(text(
+        f"INSERT INTO {TABLE} (id, task_id, frame_index, gender, confidence, timestamp, created_at) "
+        f"SELECT f.id, f.task_id, f.frame_index, f.gender, f.confidence, f.timestamp, "
+        f"COALESCE(t.created_at, now()) "
+        f"FROM {LEGACY_TABLE} f LEFT JOIN tasks t ON t.id = f.task_id "
+        f"WHERE t.created_at IS NULL OR t.created_at >= :start"
+    ), {"start": start})
+    conn.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+
+
+def _partition_mysql(conn: Connection):
+    """MySQL 原地转换：补列、去外键、主键加入分区键后重建为分区表"""
+    inspector = inspect(conn)
+    if "created_at" not in {c["name"] for c in inspector.get_columns(TABLE)}:
+        conn.execute(text(
+            f"ALTER TABLE {TABLE} ADD COLUMN created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP"
+        ))
+        conn.execute(text(
+            f"UPDATE {TABLE} f JOIN tasks t ON t.id = f.task_id SET f.created_at = t.created_at"
+        ))
+    for fk in inspector.get_foreign_keys(TABLE):
+        conn.execute(text(f"ALTER TABLE {TABLE} DROP FOREIGN KEY {fk['name']}"))
+    if set(inspector.get_pk_constraint(TABLE)["constrained_columns"]) != {"id", "created_at"}:
+        conn.execute(text(f"ALTER TABLE {TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)"))
+
+    first = conn.scalar(text(f"SELECT MIN(created_at) FROM {TABLE}"))
+    days = _days(_retention_start(first), date.today() + timedelta(days=settings.FRAME_PARTITION_PRECREATE_DAYS))
+    conn.execute(text(
+        f"ALTER TABLE {TABLE} PARTITION BY RANGE (TO_DAYS(created_at)) ("
+        + _mysql_partition_defs(days) + ")"
+    ))
@@ -0,0 +1,180 @@
+# app/database/result_writer.py
+"""
+帧结果异步写回（write-behind）缓冲
+
+流处理端点只做内存追加，不等待数据库；单个后台任务按批量大小或时间间隔
+批量写入。会话结束时登记的任务状态，在该会话此前追加的帧全部写入的那一批中一并更新。数据库变慢时缓冲有上限，超出部分按策略丢弃或溢写到磁盘，
+待数据库恢复后再回灌。
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Deque, List, Optional, Tuple
+from sqlalchemy import insert, update
+from project_backend.app.config.settings import settings
+from project_backend.app.database.base import VideoProcessingDAL, get_db
+from project_backend.app.database.models.frame import GenderEnum
+from project_backend.app.database.models.task import Task, TaskStatus
+from project_backend.app.utils.metrics import monitor
+
+
+class FrameResultWriter:
+    """帧结果写回缓冲（单后台任务刷新）"""
+
+    def __init__(self):
+        self._rows: Deque[tuple] = deque()  # 元组列顺序见 VideoProcessingDAL.FRAME_COLUMNS
+        self._pending_tasks: List[dict] = []
+        self._closing: List[Tuple[int, dict]] = []  # (登记时已入队行数, 任务状态更新)
+        self._enqueued = 0  # 累计入队行数
+        self._dequeued = 0  # 累计出队行数（写入、丢弃或溢写）
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._spill_dir = Path(settings.RESULT_SPILL_DIR)
+
+    # ------------------------- 生产者接口 -------------------------
+    def open_task(self) -> uuid.UUID:
+        """为一次流会话登记任务记录（随下一批帧结果一起写入）"""
+        task_id = uuid.uuid4()
+        self._pending_tasks.append({"id": task_id, "status": TaskStatus.PROCESSING})
+        return task_id
+
+    def close_task(self, task_id: uuid.UUID, status: TaskStatus):
+        """流会话结束：登记任务终态（随该会话最后一批帧结果写入）"""
+        self._closing.append((self._enqueued, {"id": task_id, "status": status}))
+
+    def append(self, task_id: uuid.UUID, frame_index: int, label: str,
+               confidence: float, timestamp: float):
+        """追加一条帧结果（不阻塞、不等待数据库）"""
+        if len(self._rows) >= settings.RESULT_BUFFER_MAX_ROWS:
+            self._handle_overflow()
+        self._rows.append(
+            (uuid.uuid4(), task_id, frame_index, GenderEnum(label), confidence, timestamp)
+        )
+        self._enqueued += 1
+        if len(self._rows) >= settings.RESULT_FLUSH_BATCH_SIZE and self._wakeup:
+            self._wakeup.set()
+
+    def _handle_overflow(self):
+        """缓冲已满：丢弃最旧的一批，或溢写到磁盘"""
+        batch = [self._rows.popleft() for _ in range(min(settings.RESULT_FLUSH_BATCH_SIZE, len(self._rows)))]
+        self._dequeued += len(batch)
+        if settings.RESULT_OVERFLOW_POLICY == "spill":
+            try:
+                self._spill(batch)
+                monitor.record_result_overflow(len(batch), policy="spill")
+                return
+            except OSError as e:
+                logging.error(f"帧结果溢写失败，改为丢弃: {str(e)}")
+        monitor.record_result_overflow(len(batch), policy="drop")
+
+    # ------------------------- 生命周期 -------------------------
+    def start(self):
+        """启动后台刷新任务"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止后台任务并尽量刷完剩余数据"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._rows or self._pending_tasks or self._closing:
+            if not await self._flush_once():
+                break
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.RESULT_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            while self._rows or self._pending_tasks or self._closing:
+                if not await self._flush_once():
+                    break
+                if len(self._rows) < settings.RESULT_FLUSH_BATCH_SIZE:
+                    break
+            if not self._rows:
+                self._reload_spill()
+            monitor.record_result_backlog(len(self._rows))
+
+    # ------------------------- 刷新逻辑 -------------------------
+    async def _flush_once(self) -> bool:
+        """写入一批（单事务多行插入），失败时退回缓冲头部"""
+        tasks, self._pending_tasks = self._pending_tasks, []
+        batch = [self._rows.popleft() for _ in range(min(settings.RESULT_FLUSH_BATCH_SIZE, len(self._rows)))]
+        self._dequeued += len(batch)
+        # 登记之前追加的帧已全部出队的会话，本批一并更新任务终态
+        closing = [item for item in self._closing if item[0] <= self._dequeued]
+        self._closing = [item for item in self._closing if item[0] > self._dequeued]
+
+        start = time.perf_counter()
+        try:
+            async with get_db() as session:
+                if tasks:
+                    await session.execute(insert(Task), tasks)
+                # 与任务记录同一事务，退出 get_db 时提交
+                await VideoProcessingDAL(session).bulk_ingest_frames(batch, batch_size=len(batch) or 1, commit=False)
+                if closing:
+                    await session.execute(update(Task), [update_ for _, update_ in closing])
+        except Exception as e:
+            logging.warning(f"帧结果批量写入失败（{len(batch)}行），稍后重试: {str(e)}")
+            self._pending_tasks = tasks + self._pending_tasks
+            self._rows.extendleft(reversed(batch))
+            self._dequeued -= len(batch)
+            self._closing = closing + self._closing
+            if len(self._rows) > settings.RESULT_BUFFER_MAX_ROWS:
+                self._handle_overflow()
+            return False
+
+        monitor.record_result_flush(time.perf_counter() - start, len(batch))
+        return True
+
+    # ------------------------- 磁盘溢写 -------------------------
+    def _spill(self, batch: List[tuple]):
+        self._spill_dir.mkdir(parents=True, exist_ok=True)
+        path = self._spill_dir / f"frame_results-{time.time_ns()}.jsonl"
+        with open(path, "w", encoding="utf-8") as f:
+            for row_id, task_id, frame_index, gender, confidence, timestamp in batch:
+                f.write(json.dumps(
+                    [str(row_id), str(task_id), frame_index, gender.value, confidence, timestamp]
+                ) + "\n")
+
+    def _reload_spill(self):
+        """数据库空闲时回灌一个溢写文件（整文件解析成功才入队并删除，损坏文件改名为 .bad 不再重试）"""
+        if not self._spill_dir.is_dir():
+            return
+        for path in sorted(self._spill_dir.glob("frame_results-*.jsonl"))[:1]:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    rows = []
+                    for line in f:
+                        row_id, task_id, frame_index, gender, confidence, timestamp = json.loads(line)
+                        rows.append((
+                            uuid.UUID(row_id), uuid.UUID(task_id), frame_index,
+                            GenderEnum(gender), confidence, timestamp
+                        ))
+            except OSError as e:
+                logging.error(f"溢写文件读取失败 {path}: {str(e)}")
+                return
+            except (ValueError, TypeError) as e:
+                logging.error(f"溢写文件损坏，已隔离 {path}: {str(e)}")
+                path.rename(path.with_suffix(".bad"))
+                return
+            path.unlink()
+            self._rows.extend(rows)
+            self._enqueued += len(rows)
+
+
+# 单例实例
+frame_result_writer = FrameResultWriter()
@@ -1,16 +1,19 @@
 # \main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from prometheus_fastapi_instrumentator import Instrumentator
 from project_backend.app.routes.vision import router as vision_router
 from project_backend.app.routes.stream import router as stream_router
 #from project_backend.app.database.base import init_db, close_db
+from project_backend.app.database.base import prewarm_pool
 from project_backend.app.ml_models.model_manager import startup_event, shutdown_event
 from project_backend.app.ml_models.model_manager import model_manager
 from project_backend.app.config.settings import settings
 from project_backend.app.config.prometheus import init_monitoring
+from project_backend.app.utils.metrics import monitor
 from project_backend.app.routes.video import router as video_router
+from project_backend.app.services.overload_governor import overload_governor
+from project_backend.app.database.result_writer import frame_result_writer
 import uvicorn
 import logging
 
@@ -23,13 +26,23 @@ async def lifespan(app: FastAPI):
         # 服务启动初始化
         logging.info("Initializing resources...")
         #await init_db()  # 数据库连接池验证
+        if settings.DB_POOL_PREWARM:
+            try:
+                await prewarm_pool()  # 预热常驻连接，首批请求不承担建连耗时
+            except Exception as e:
+                logging.warning(f"数据库连接池预热失败: {str(e)}")
         await startup_event()  # 初始化流处理器
         model_manager.load_model()  # 模型预加载
+        overload_governor.start()  # 过载调控器（推理队列监测）
+        if settings.RESULT_PERSISTENCE_ENABLED:
+            frame_result_writer.start()  # 帧结果写回缓冲
         yield
     finally:
         # 服务关闭清理
         logging.info("Releasing resources...")
         #await close_db()  # 关闭数据库连接池
+        await overload_governor.stop()
+        await frame_result_writer.stop()  # 刷完剩余帧结果
         await shutdown_event()  # 关闭流处理器
         model_manager.release_model()  # 释放模型资源
 
@@ -70,10 +83,7 @@ async def add_security_headers(request, call_next):
     return response
 
 # ------------------------- 监控与健康检查 -------------------------
-# Prometheus指标监控
-instrumentator = Instrumentator(
-    excluded_handlers=["/health", "/docs", "/openapi.json"]
-)
+# Prometheus指标监控（唯一 /metrics 出口）
 init_monitoring(app)
 
 # 健康检查端点
@@ -86,6 +96,19 @@ async def health_check():
         "model_status": model_manager.get_model_status()
     }
 
+# 客户端统计调试端点（完整表按需查看，不进入Prometheus）
+@app.get("/debug/clients", include_in_schema=False)
+async def debug_client_stats(limit: int = 100):
+    """按平均速率降序返回进程内客户端统计表"""
+    if not settings.DEBUG_MODE:
+        raise HTTPException(status_code=404, detail="Not Found")
+    rows = monitor.client_stats.snapshot()
+    ranked = sorted(rows.items(), key=lambda item: item[1]["rate_bps"], reverse=True)
+    return {
+        "total": len(rows),
+        "clients": [{"client_id": cid, **row} for cid, row in ranked[:limit]]
+    }
+
 # ------------------------- 服务信息端点 -------------------------
 @app.get("/api/v1/service-info", tags=["Service Info"])
 async def get_service_info():
@@ -0,0 +1,100 @@
+# \app\ml_models\face_pipeline.py
+"""
+两阶段人脸性别识别
+
+1. YOLO 人脸检测器找出帧内全部人脸（按置信度取前 MAX_FACES_PER_FRAME 个）
+2. 各人脸按 FACE_CROP_MARGIN 外扩裁剪，整批送入 ONNX 分类器做一次前向
+3. 每张人脸输出独立的 bbox / 性别 / 置信度
+
+分类耗时随人脸数近似常数增长（一次批量前向），而非逐张调用。
+"""
+import logging
+from typing import List
+import numpy as np
+from ultralytics import YOLO
+from project_backend.app.config.settings import settings
+from project_backend.app.ml_models.onnx_inference import ONNXGenderClassifier
+
+
+class FaceGenderPipeline:
+    """人脸检测 + 批量性别分类（输入为 BGR 帧，在推理执行器线程中同步调用）"""
+
+    def __init__(self, detector: YOLO, classifier: ONNXGenderClassifier,
+                 max_faces: int = None, min_confidence: float = None, margin: float = None):
+        self.detector = detector
+        self.classifier = classifier
+        self.max_faces = max_faces or settings.MAX_FACES_PER_FRAME
+        self.min_confidence = settings.FACE_DETECT_CONFIDENCE if min_confidence is None else min_confidence
+        self.margin = settings.FACE_CROP_MARGIN if margin is None else margin
+
+    @classmethod
+    def from_settings(cls, device) -> "FaceGenderPipeline":
+        detector = YOLO(settings.FACE_DETECTOR_PATH)
+        detector.to(device)
+        classifier = ONNXGenderClassifier(settings.GENDER_CLASSIFIER_PATH)
+        logging.info(f"两阶段人脸识别已加载：检测 {settings.FACE_DETECTOR_PATH}，"
+                     f"分类 {classifier.name}（{'逐张' if classifier.fixed_batch else '批量'}前向）")
+        return cls(detector, classifier)
+
+    def detect(self, frame: np.ndarray) -> np.ndarray:
+        """返回 (N, 5) 数组：x1, y1, x2, y2, 检测置信度（降序，N ≤ max_faces）"""
+        results = self.detector(frame, imgsz=640, conf=self.min_confidence,
+                                max_det=self.max_faces, verbose=False)
+        return self._boxes(results[0] if results else None)
+
+    def _boxes(self, result) -> np.ndarray:
+        boxes = result.boxes if result is not None else None
+        if boxes is None or len(boxes) == 0:
+            return np.empty((0, 5), np.float32)
+        xyxy = boxes.xyxy.cpu().numpy()
+        conf = boxes.conf.cpu().numpy()
+        order = np.argsort(-conf)[:self.max_faces]
+        return np.hstack([xyxy[order], conf[order, None]]).astype(np.float32)
+
+    def crop(self, frame: np.ndarray, boxes: np.ndarray) -> List[np.ndarray]:
+        """按外扩比例裁剪人脸（视图，不复制像素）"""
+        height, width = frame.shape[:2]
+        crops = []
+        for x1, y1, x2, y2, _ in boxes:
+            dx, dy = (x2 - x1) * self.margin / 2, (y2 - y1) * self.margin / 2
+            left, top = max(0, int(x1 - dx)), max(0, int(y1 - dy))
+            right, bottom = min(width, int(np.ceil(x2 + dx))), min(height, int(np.ceil(y2 + dy)))
+            crops.append(frame[top:max(bottom, top + 1), left:max(right, left + 1)])
+        return crops
+
+    def process(self, frame: np.ndarray) -> List[dict]:
+        """检测 → 裁剪 → 批量分类，输出格式与 StreamProcessor._format_results 一致"""
+        boxes = self.detect(frame)
+        if len(boxes) == 0:
+            return []
+        predictions = self.classifier.predict_batch(self.crop(frame, boxes))
+        return self._format(boxes, predictions)
+
+    def process_batch(self, frames: List[np.ndarray]) -> List[List[dict]]:
+        """多帧一次检测前向，全部人脸裁剪合并为一次分类前向（离线视频分析用）"""
+        if not frames:
+            return []
+        results = self.detector(frames, imgsz=640, conf=self.min_confidence,
+                                max_det=self.max_faces, verbose=False)
+        frame_boxes = [self._boxes(result) for result in results]
+        crops = [crop for frame, boxes in zip(frames, frame_boxes) for crop in self.crop(frame, boxes)]
+        predictions = self.classifier.predict_batch(crops)
+
+        outputs, offset = [], 0
+        for boxes in frame_boxes:
+            outputs.append(self._format(boxes, predictions[offset:offset + len(boxes)]))
+            offset += len(boxes)
+        return outputs
+
+    @staticmethod
+    def _format(boxes: np.ndarray, predictions: List[dict]) -> List[dict]:
+        return [
+            {
+                "bbox": box[:4].tolist(),
+                "confidence": pred["confidence"],
+                "label": pred["gender"],
+                "det_confidence": float(box[4]),
+                "model_type": "gender"
+            }
+            for box, pred in zip(boxes, predictions)
+        ]
@@ -10,7 +10,9 @@ from project_backend.app.config.settings import settings
 from project_backend.app.ml_models.mock_model import MockGenderClassifier
 from project_backend.app.config.prometheus import MODEL_LOAD_STATUS
 from project_backend.app.ml_models.video_processor import VideoProcessor
+from project_backend.app.ml_models.face_pipeline import FaceGenderPipeline
 from project_backend.app.ml_models.gender_model import GenderClassifier
+from project_backend.app.database.metadata_cache import metadata_cache
 
 class SecurityError(Exception):
     """自定义模型安全异常"""
@@ -136,6 +138,7 @@ class ModelManager:
                     model_name = self.current_model.name
 
                 MODEL_LOAD_STATUS.labels(model_name=model_name).set(1)
+                metadata_cache.invalidate()  # 模型变更后元数据需重新读取
                 logging.info(f"成功加载模型（第{self._load_count}次）：{model_name}")
 
             except Exception as e:
@@ -205,11 +208,18 @@ class StreamProcessor:
     def __init__(self):
         self._device = torch.device("cuda" if torch.cuda.is_available() and not settings.FORCE_CPU else "cpu")
         self._model = None
+        self._face_pipeline: Optional[FaceGenderPipeline] = None  # 配置人脸检测模型时启用两阶段识别
         self._warmup_count = 10  # GPU预热帧数
 
     async def initialize(self):
         """初始化视频流模型"""
         try:
+            if settings.FACE_DETECTOR_PATH:
+                self._face_pipeline = FaceGenderPipeline.from_settings(self._device)
+                VideoProcessor.register_pipeline('gender', self._face_pipeline.process)
+                logging.info(f"视频流处理器已初始化（两阶段人脸识别，设备：{self._device}）")
+                return
+
             # 加载YOLO模型
             self._model = YOLO(settings.MODEL_PATH)
             self._model.to(self._device)
@@ -220,29 +230,50 @@ class StreamProcessor:
                 for _ in range(self._warmup_count):
                     self._model(dummy_input)
 
-            VideoProcessor.register_pipeline('gender', lambda frame: self.process_frame(frame))
+            VideoProcessor.register_pipeline('gender', self._detect)
             logging.info(f"视频流处理器已初始化（设备：{self._device}）")
 
         except Exception as e:
             logging.critical(f"视频流处理器初始化失败：{str(e)}")
             raise
 
+    @property
+    def initialized(self) -> bool:
+        return self._model is not None or self._face_pipeline is not None
+
     @torch.inference_mode()
+    def detect_batch(self, frames: list) -> list:
+        """批量检测多帧 BGR 图像（离线视频分析用，同步调用），返回每帧的结果列表"""
+        if self._face_pipeline is not None:
+            return self._face_pipeline.process_batch(frames)
+        results = self._model(frames, imgsz=640, verbose=False)
+        return [self._format_results([result]) for result in results]
+
     async def process_frame(self, frame: bytes) -> list:
-        """处理视频帧"""
+        """处理视频帧（推理提交到共享执行器，不阻塞事件循环）"""
         try:
-            # 转换帧数据
-            img = self._bytes_to_cv2(frame)
-
-            # 执行推理
-            results = self._model(img, imgsz=640, verbose=False)
-
-            # 格式化结果
-            return self._format_results(results)
+            return await VideoProcessor.run_inference(self._infer, frame)
         except Exception as e:
             logging.error(f"帧处理失败：{str(e)}")
             return []
 
+    def _infer(self, frame: bytes) -> list:
+        """同步推理：解码 + 检测（在执行器线程中运行）"""
+        if self._face_pipeline is not None:
+            import cv2
+            import numpy as np
+            img = cv2.imdecode(np.frombuffer(frame, np.uint8), cv2.IMREAD_COLOR)  # 两阶段管道使用BGR输入
+            return self._face_pipeline.process(img)
+        # 转换帧数据
+        img = self._bytes_to_cv2(frame)
+        return self._detect(img)
+
+    @torch.inference_mode()
+    def _detect(self, img) -> list:
+        """对已解码图像执行推理并格式化结果"""
+        results = self._model(img, imgsz=640, verbose=False)
+        return self._format_results(results)
+
     def _bytes_to_cv2(self, image_data: bytes):
         """字节流转OpenCV图像"""
         import cv2
@@ -1,8 +1,10 @@
 # \app\ml_models\onnx_inference.py
+import cv2
 import onnxruntime
 import numpy as np
 from PIL import Image
 from io import BytesIO
+from typing import List
 from project_backend.app.config.settings import settings
 from pathlib import Path
 
@@ -29,6 +31,8 @@ class ONNXGenderClassifier:
             sess_options=sess_options
         )
         self.input_name = self.session.get_inputs()[0].name
+        # 导出时 batch 维为固定值 1 的模型无法批量前向
+        self.fixed_batch = self.session.get_inputs()[0].shape[0] == 1
 
     def predict(self, image_data: bytes) -> dict:
         """完整推理流程"""
@@ -50,23 +54,46 @@ class ONNXGenderClassifier:
         # 调整维度顺序为 CHW 并添加 batch 维度
         return np.transpose(image_array, (2, 0, 1))[np.newaxis, ...]
 
+    def predict_batch(self, images: List[np.ndarray]) -> List[dict]:
+        """多张 BGR 图像（如人脸裁剪）一次前向推理，结果与输入一一对应"""
+        if not images:
+            return []
+        batch = self._preprocess_batch(images)
+        if self.fixed_batch:
+            output = np.concatenate([self._inference(batch[i:i + 1])[0] for i in range(len(batch))])
+        else:
+            output = self._inference(batch)[0]
+        return self._postprocess_batch(output)
+
+    def _preprocess_batch(self, images: List[np.ndarray]) -> np.ndarray:
+        """缩放 + BGR→RGB 后写入预分配的 NCHW 数组，与 _preprocess 相同的归一化"""
+        height, width = settings.MODEL_INPUT_SIZE
+        batch = np.empty((len(images), 3, height, width), np.float32)
+        for i, image in enumerate(images):
+            resized = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+            batch[i] = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)
+        batch *= 2.0 / 255.0  # (x / 255 - 0.5) / 0.5
+        batch -= 1.0
+        return batch
+
     def _inference(self, input_tensor: np.ndarray) -> list:
         """执行 ONNX 推理"""
         return self.session.run(None, {self.input_name: input_tensor})
 
     def _postprocess(self, outputs: list) -> dict:
         """后处理适配多场景"""
-        output_data = outputs[0]
+        return self._postprocess_batch(outputs[0])[0]
+
+    def _postprocess_batch(self, output_data: np.ndarray) -> List[dict]:
         # 二分类 sigmoid 输出
-        if output_data.shape == (1, 1):
-            confidence = float(output_data[0][0])
-            gender = "male" if confidence > 0.5 else "female"
-            return {"gender": gender, "confidence": confidence}
+        if output_data.shape[1] == 1:
+            return [
+                {"gender": "male" if p > 0.5 else "female", "confidence": float(p)}
+                for p in output_data[:, 0]
+            ]
         # 多分类 softmax 输出
-        else:
-            probs = output_data[0]
-            class_idx = np.argmax(probs)
-            return {
-                "gender": settings.CLASS_LABELS[class_idx],
-                "confidence": float(probs[class_idx])
-            }
\ No newline at end of file
+        class_idx = np.argmax(output_data, axis=1)
+        return [
+            {"gender": settings.CLASS_LABELS[idx], "confidence": float(probs[idx])}
+            for idx, probs in zip(class_idx, output_data)
+        ]
@@ -1,10 +1,13 @@
 # app/ml_models/video_processor.py
 import cv2
+import time
 import torch
 import asyncio
+import threading
 import concurrent.futures
 import numpy as np
-from typing import Dict, Callable
+from collections import deque
+from typing import Dict, Callable, Any
 from fastapi import WebSocketDisconnect
 
 class VideoProcessor:
@@ -12,6 +15,11 @@ class VideoProcessor:
     _pipelines: Dict[str, Callable] = {}  # 注册的处理管道
     _gpu_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
 
+    # 推理执行器负载统计（供过载调控器采样）
+    _stats_lock = threading.Lock()
+    _pending = 0  # 已提交但尚未完成的推理任务数
+    _latencies = deque(maxlen=512)  # 最近推理耗时（秒）
+
     # === 类方法 ===
     @classmethod
     def register_pipeline(cls, name: str, processor_func: Callable):
@@ -25,6 +33,38 @@ class VideoProcessor:
         """获取注册的处理管道"""
         return cls._pipelines.get(name)
 
+    # === 推理执行器 ===
+    @classmethod
+    async def run_inference(cls, func: Callable, *args) -> Any:
+        """提交推理任务到共享执行器（统计排队深度与耗时）"""
+        with cls._stats_lock:
+            cls._pending += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(cls._gpu_executor, func, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with cls._stats_lock:
+                cls._pending -= 1
+                cls._latencies.append(elapsed)
+
+    @classmethod
+    def queue_depth(cls) -> int:
+        """当前排队+执行中的推理任务数"""
+        with cls._stats_lock:
+            return cls._pending
+
+    @classmethod
+    def latency_percentile(cls, q: float = 0.95) -> float:
+        """最近推理耗时的分位数（无样本时返回0）"""
+        with cls._stats_lock:
+            samples = sorted(cls._latencies)
+        if not samples:
+            return 0.0
+        idx = min(len(samples) - 1, int(q * len(samples)))
+        return samples[idx]
+
     # === 核心处理方法 ===
     @classmethod
     async def process_frame(cls, client_id: str, frame_data: bytes):
@@ -35,9 +75,7 @@ class VideoProcessor:
                 raise RuntimeError("未注册性别检测管道")
 
             # 异步调度处理
-            loop = asyncio.get_event_loop()
-            return await loop.run_in_executor(
-                cls._gpu_executor,
+            return await cls.run_inference(
                 cls._process_gender_pipeline,
                 frame_data
             )
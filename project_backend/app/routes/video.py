@@ -1,13 +1,33 @@
 # app/routes/video.py
-from fastapi import APIRouter, WebSocket, HTTPException
+from fastapi import APIRouter, WebSocket, HTTPException, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from jwt.exceptions import PyJWTError  # 修正导入方式
 import jwt
 from datetime import datetime, timezone
+import asyncio
 import base64
 import json
+import os
 import logging
+import time
+import uuid
 import numpy as np
+from typing import Optional
 from ..ml_models.model_manager import stream_processor  # 正确导入流处理器
+from ..services.quality_controller import quality_controller
+from ..services.limiters import bandwidth_limiter
+from ..services.tracker import StreamTracker
+from ..services.scene_change import SceneChangeDetector
+from ..services.result_delta import DeltaEncoder
+from ..utils.metrics import monitor
+from ..database.result_writer import frame_result_writer
+from ..database.base import AsyncSessionLocal, VideoProcessingDAL
+from ..database.models.task import TaskStatus
+from ..tasks.process_tasks import archive_task_frames_task
+from ..tasks.video_tasks import analyze_video
+from ..utils.object_store import object_store
+from ..utils.image_pipeline import get_executor
+from ..config.constants import ALLOWED_VIDEO_TYPES
 from ..config.settings import settings
 
 router = APIRouter(prefix="/api/v1/video", tags=["Video Stream"])
@@ -35,11 +55,46 @@ async def verify_token(token: str):
         logging.error(f"令牌解析异常: {str(e)}")
         raise HTTPException(status_code=403, detail="无效令牌")
 
+async def send_measured(websocket: WebSocket, client_id: str, payload: dict):
+    """发送JSON响应并将实际出站字节计入带宽统计"""
+    message = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    await websocket.send_text(message)
+    bandwidth_limiter.record(client_id, len(message.encode("utf-8")), direction="out")
+
+async def send_result(websocket: WebSocket, client_id: str, payload: dict, encoder: Optional[DeltaEncoder]):
+    """下发帧结果：增量模式下只发送相对上次的变化，无变化时不发送"""
+    if encoder is None:
+        monitor.record_stream_message("legacy")
+        await send_measured(websocket, client_id, payload)
+        return
+    message = encoder.encode(payload)
+    if message is None:
+        monitor.record_stream_message("suppressed")
+        return
+    monitor.record_stream_message(message["type"])
+    await send_measured(websocket, client_id, message)
+
+def with_directive(client_id: str, response: dict, last_directive: dict):
+    """质量档位变化时随响应下发，由客户端降低采集分辨率/帧率；返回 (响应, 最新档位)"""
+    directive = quality_controller.get_directive(client_id)
+    if directive != last_directive:
+        return {**response, "quality": directive}, directive
+    return response, last_directive
+
+def skipped_response(last_response: Optional[dict]) -> dict:
+    """未推理帧的应答：复用上一帧结果；尚无结果时应答空结果，客户端每帧都能收到回复"""
+    if last_response is None:
+        return {"predictions": [], "skipped": True, "timestamp": datetime.now(timezone.utc).isoformat()}
+    return {**last_response, "skipped": True}
+
 @router.websocket("/stream")
 async def video_stream_endpoint(websocket: WebSocket):
     """增强版视频流处理端点"""
     await websocket.accept()
     client_id = "unknown"
+    encoder: Optional[DeltaEncoder] = None
+    task_id = None
+    task_status = TaskStatus.COMPLETED
 
     try:
         # ================= 认证阶段 =================
@@ -60,7 +115,10 @@ async def video_stream_endpoint(websocket: WebSocket):
                 await websocket.close(code=1008)
                 return
 
-            await websocket.send_json({"status": "success", "client_id": client_id})
+            # 客户端声明 "delta": true 时按增量协议下发结果
+            if msg_data.get("delta"):
+                encoder = DeltaEncoder()
+            await websocket.send_json({"status": "success", "client_id": client_id, "delta": encoder is not None})
             logging.info(f"客户端 {client_id} 认证成功")
 
         except json.JSONDecodeError:
@@ -69,31 +127,84 @@ async def video_stream_endpoint(websocket: WebSocket):
             return
 
         # ================= 流处理阶段 =================
+        # 逐帧结果写回缓冲（不等待数据库）
+        task_id = frame_result_writer.open_task() if settings.RESULT_PERSISTENCE_ENABLED else None
+        stream_start = time.monotonic()
+        frame_index = 0
+        last_response = None
+        last_directive = quality_controller.get_directive(client_id)
+        tracker = StreamTracker()  # 每K帧检测一次，其余帧跟踪外推
+        scene_detector = SceneChangeDetector()
         while True:
             message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
 
             # 处理二进制数据
-            if isinstance(message, bytes):
-                frame_data = message
+            if message.get("bytes") is not None:
+                frame_data = message["bytes"]
+                nbytes = len(frame_data)
             else:
+                text = message.get("text") or ""
+                nbytes = len(text)
                 try:
-                    msg = json.loads(message)
+                    msg = json.loads(text)
                     if msg.get("type") == "frame":
                         frame_data = base64.b64decode(msg["data"])
                     else:
+                        bandwidth_limiter.record(client_id, nbytes, direction="in")
                         continue
                 except Exception as e:
+                    bandwidth_limiter.record(client_id, nbytes, direction="in")
                     logging.warning(f"无效消息格式: {str(e)}")
                     continue
 
+            # 带宽超限：通知质量调控器降级，本帧不做推理（被拒绝的帧不计入全局速率）
+            if not bandwidth_limiter.admit(client_id, nbytes):
+                quality_controller.throttle(client_id, reason="bandwidth_limit")
+                skipped, last_directive = with_directive(client_id, skipped_response(last_response), last_directive)
+                await send_result(websocket, client_id, skipped, encoder)
+                continue
+
+            # 过载跳帧：按当前帧率档位丢弃多余帧，复用上一帧结果应答
+            if not quality_controller.admit_frame(client_id):
+                skipped, last_directive = with_directive(client_id, skipped_response(last_response), last_directive)
+                await send_result(websocket, client_id, skipped, encoder)
+                continue
+
+            # 画面静止：复用上一帧结果，不做检测与跟踪（缩略图解码在图像处理线程池执行，不阻塞事件循环）
+            change = await asyncio.get_running_loop().run_in_executor(
+                get_executor(), scene_detector.measure, frame_data
+            )
+            if change < scene_detector.threshold and last_response is not None:
+                monitor.record_stream_frame(client_id, "unchanged")
+                skipped, last_directive = with_directive(
+                    client_id, {**last_response, "skipped": True}, last_directive
+                )
+                await send_result(websocket, client_id, skipped, encoder)
+                continue
+
             try:
-                # 使用流处理器处理原始字节
-                results = await stream_processor.process_frame(frame_data)
+                if tracker.needs_detection(force=change >= settings.SCENE_CUT_THRESHOLD):
+                    # 使用流处理器处理原始字节，检测结果关联到稳定的 track_id
+                    results = tracker.update(await stream_processor.process_frame(frame_data))
+                    monitor.record_stream_frame(client_id, "detect")
+                else:
+                    results = tracker.predict()
+                    monitor.record_stream_frame(client_id, "track")
+                frame_index += 1
+                if task_id is not None:
+                    offset = time.monotonic() - stream_start
+                    for pred in results:
+                        frame_result_writer.append(
+                            task_id, frame_index, pred["label"], pred["confidence"], offset
+                        )
 
                 # 构建标准化响应
                 response = {
                     "predictions": [
                         {
+                            "track_id": pred["track_id"],
                             "label": pred["label"],
                             "confidence": pred["confidence"],
                             "bbox": [
@@ -106,7 +217,10 @@ async def video_stream_endpoint(websocket: WebSocket):
                     ],
                     "timestamp": datetime.now(timezone.utc).isoformat()
                 }
-                await websocket.send_json(response)
+                last_response = response
+
+                response, last_directive = with_directive(client_id, response, last_directive)
+                await send_result(websocket, client_id, response, encoder)
 
             except Exception as e:
                 logging.error(f"处理失败: {str(e)}", exc_info=True)
@@ -117,6 +231,139 @@ async def video_stream_endpoint(websocket: WebSocket):
 
     except Exception as e:
         logging.error(f"连接异常 ({client_id}): {str(e)}", exc_info=True)
+        task_status = TaskStatus.FAILED
     finally:
+        if task_id is not None:
+            frame_result_writer.close_task(task_id, task_status)  # 随最后一批帧结果写入终态
+        quality_controller.remove_client(client_id)
+        bandwidth_limiter.release(client_id)
+        monitor.remove_client(client_id)
         await websocket.close()
         logging.info(f"连接关闭 ({client_id})")
+
+
+# ------------------------- 任务帧结果查询 -------------------------
+def _parse_cursor(cursor: str):
+    """游标格式 "<frame_index>:<frame_id>" """
+    try:
+        frame_index, frame_id = cursor.split(":", 1)
+        return int(frame_index), uuid.UUID(frame_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+@router.get("/tasks/{task_id}/frames")
+async def list_task_frames(
+        task_id: uuid.UUID,
+        cursor: str = Query(None, description="上一页返回的 next_cursor"),
+        limit: int = Query(100, ge=1, le=1000)
+):
+    """键集分页读取任务帧结果"""
+    after = _parse_cursor(cursor) if cursor else None
+    async with AsyncSessionLocal() as session:
+        frames = await VideoProcessingDAL(session).frames_after(task_id, after=after, limit=limit)
+
+    next_cursor = f"{frames[-1].frame_index}:{frames[-1].id}" if len(frames) == limit else None
+    return {
+        "frames": [
+            {
+                "frame_index": f.frame_index,
+                "gender": f.gender.value if f.gender else None,
+                "confidence": f.confidence,
+                "timestamp": f.timestamp
+            } for f in frames
+        ],
+        "next_cursor": next_cursor
+    }
+
+@router.get("/tasks/{task_id}/summary")
+async def get_task_summary(task_id: uuid.UUID):
+    """任务汇总（读取增量维护的汇总表，不扫描原始帧）"""
+    async with AsyncSessionLocal() as session:
+        rollup = await VideoProcessingDAL(session).get_task_rollup(task_id)
+    if rollup is None:
+        raise HTTPException(status_code=404, detail="任务不存在或暂无帧结果")
+    return {
+        "task_id": str(task_id),
+        "frame_count": rollup.frame_count,
+        "gender_counts": {"male": rollup.male_count, "female": rollup.female_count},
+        "mean_confidence": rollup.mean_confidence,
+        "updated_at": rollup.updated_at.isoformat() if rollup.updated_at else None
+    }
+
+@router.post("/tasks/{task_id}/archive", status_code=202)
+async def archive_task(task_id: uuid.UUID):
+    """提交列式归档任务（Parquet上传至对象存储，完成后写入 Task.archive_path）"""
+    job = archive_task_frames_task.delay(str(task_id))
+    return {"task_id": str(task_id), "job_id": job.id}
+
+@router.get("/tasks/{task_id}/frames/export")
+async def export_task_frames(task_id: uuid.UUID):
+    """以NDJSON流式导出任务全部帧结果（服务端游标，内存占用与任务大小无关）"""
+    async def generate():
+        async with AsyncSessionLocal() as session:
+            async for rows in VideoProcessingDAL(session).stream_task_frames(task_id):
+                yield "".join(
+                    json.dumps({
+                        "frame_index": frame_index,
+                        "gender": gender.value if gender else None,
+                        "confidence": confidence,
+                        "timestamp": timestamp
+                    }) + "\n"
+                    for frame_index, gender, confidence, timestamp in rows
+                )
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{task_id}.ndjson"'}
+    )
+
+
+# ------------------------- 离线视频分析 -------------------------
+@router.post("/jobs", status_code=202)
+async def submit_video_job(
+        file: UploadFile = File(..., description=f"允许格式：{ALLOWED_VIDEO_TYPES}"),
+        stride: int = Query(settings.VIDEO_FRAME_STRIDE, ge=1, description="每N帧分析一帧"),
+        segment_seconds: float = Query(settings.VIDEO_SEGMENT_SECONDS, gt=0, description="分段时长（秒），各段并行处理")
+):
+    """上传视频并提交离线分析任务（视频流式写入对象存储，进度见 GET /jobs/{task_id}）"""
+    if file.content_type not in ALLOWED_VIDEO_TYPES:
+        raise HTTPException(status_code=415, detail=f"仅支持 {ALLOWED_VIDEO_TYPES} 格式")
+
+    # 表单解析后上传内容已在临时文件中，直接取得大小
+    size = file.file.seek(0, os.SEEK_END)
+    file.file.seek(0)
+    if size > settings.MAX_VIDEO_FILE_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"文件大小超过 {settings.MAX_VIDEO_FILE_SIZE // 1024 // 1024}MB 限制"
+        )
+
+    suffix = os.path.splitext(file.filename or "")[1] or ".mp4"
+    object_key = f"{settings.UPLOAD_PREFIX}/videos/{uuid.uuid4().hex}{suffix}"
+    try:
+        await asyncio.to_thread(object_store.put_stream, object_key, file.file, size, file.content_type)
+    finally:
+        await file.close()
+
+    async with AsyncSessionLocal() as session:
+        task_id = await VideoProcessingDAL(session).create_task(
+            result={"object_key": object_key, "filename": file.filename}
+        )
+    job = analyze_video.delay(str(task_id), object_key, stride, segment_seconds)
+    return {"task_id": str(task_id), "job_id": job.id, "object_key": object_key}
+
+@router.get("/jobs/{task_id}")
+async def get_video_job(task_id: uuid.UUID):
+    """离线分析任务状态与进度（帧结果见 /tasks/{task_id}/frames 与 /tasks/{task_id}/summary）"""
+    async with AsyncSessionLocal() as session:
+        task = await VideoProcessingDAL(session).get_task(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return {
+        "task_id": str(task.id),
+        "status": task.status.value,
+        "progress": min(task.progress or 0.0, 1.0),
+        "result": task.result,
+        "created_at": task.created_at.isoformat() if task.created_at else None
+    }
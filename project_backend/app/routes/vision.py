@@ -1,17 +1,25 @@
 # \app\routes\vision.py
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
-from project_backend.app.utils.image_utils import process_image
+from project_backend.app.utils.image_pipeline import DEFAULT_PIPELINE, ImageTooLargeError, run_pipeline
 #from project_backend.app.database import crud
 #from project_backend.app.database.base import get_db
 from project_backend.app.ml_models.model_manager import model_manager
+from project_backend.app.database.base import AsyncSessionLocal, VideoProcessingDAL
+from project_backend.app.services.inference_gate import InferenceBusyError, InferenceGate, classify_gate
 from project_backend.app.config.settings import settings
-import tempfile
-import contextlib
-import os
+from project_backend.app.utils.object_store import object_store
+from project_backend.app.utils.upload import read_image_upload
+from project_backend.app.tasks.celery_config import app as celery_app
+from project_backend.app.tasks.batch_tasks import classify_batch, edge_detection_batch
+from celery.result import AsyncResult
+from pathlib import Path
+import asyncio
 import logging
+import mimetypes
+import uuid
 
 router = APIRouter(tags=["计算机视觉"], prefix="/api/v1")
 
@@ -24,10 +32,10 @@ class ClassificationResult(BaseModel):
     model_version: str = Field(..., example="v2.1.0", description="模型版本")
 
 
-class EdgeDetectionResult(BaseModel):
-    """边缘检测响应模型"""
-    result_url: str = Field(..., example="/results/edge_123.jpg", description="处理结果URL")
-    #record_id: int = Field(..., example=42, description="数据库记录ID")
+class JobSubmission(BaseModel):
+    """异步任务提交响应模型"""
+    job_id: str = Field(..., description="Celery任务ID")
+    object_key: str = Field(..., example="uploads/3f2a.jpg", description="原图在对象存储中的key")
 
 
 # ------------------------- 图像分类接口 -------------------------
@@ -36,7 +44,7 @@ class EdgeDetectionResult(BaseModel):
     summary="图像性别分类",
     description="""### 核心功能
 - 接收JPEG/PNG格式图像
-- 使用ONNX模型进行推理
+- 使用ONNX模型进行推理（共享推理执行器，相同图像的并发请求合并为一次推理）
 - 返回性别分类结果及置信度
 
 ### 安全要求
@@ -46,7 +54,7 @@ class EdgeDetectionResult(BaseModel):
     responses={
         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {
             "description": "文件过大",
-            "content": {"application/json": {"example": {"detail": "文件超过8MB限制"}}}
+            "content": {"application/json": {"example": {"detail": "文件大小超过 8MB 限制"}}}
         },
         status.HTTP_415_UNSUPPORTED_MEDIA_TYPE: {
             "description": "文件类型错误",
@@ -55,6 +63,10 @@ class EdgeDetectionResult(BaseModel):
         status.HTTP_500_INTERNAL_SERVER_ERROR: {
             "description": "服务器内部错误",
             "content": {"application/json": {"example": {"detail": "模型推理错误"}}}
+        },
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "description": "在途推理数已达上限（响应头 Retry-After 给出重试秒数）",
+            "content": {"application/json": {"example": {"detail": "classify_image 推理繁忙，请 1 秒后重试"}}}
         }
     }
 )
@@ -70,26 +82,29 @@ async def classify_image(
                 detail=f"仅支持 {settings.ALLOWED_IMAGE_TYPES} 格式"
             )
 
-        # 验证文件大小
-        image_data = await file.read()
-        await file.close()
-        if len(image_data) > settings.MAX_FILE_SIZE:
-            raise HTTPException(
-                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail=f"文件大小超过 {settings.MAX_FILE_SIZE // 1024 // 1024}MB 限制"
-            )
+        # 分块读取：超过大小上限立即中止，文件头尺寸超限（解压炸弹）在解码前拒绝
+        image_data = await read_image_upload(file)
 
-        # 获取模型实例
+        # 获取模型实例（读缓冲区以 memoryview 直接交给模型，不再复制）
         model = model_manager.get_model()
-        result = model.predict(image_data)
+        # 推理提交到共享执行器；相同内容的并发请求合并为一次推理
+        key = InferenceGate.content_key(image_data, model.version)
+        result = await classify_gate.run(key, model.predict, image_data)
 
-        return JSONResponse(
-            content=result,
-            headers={"X-Model-Version": model.version}
-        )
+        headers = {"X-Model-Version": model.version}
+        metadata = await _model_metadata(model)
+        if metadata is not None and metadata.accuracy is not None:
+            headers["X-Model-Accuracy"] = f"{metadata.accuracy:.4f}"
+        return JSONResponse(content=result, headers=headers)
 
     except HTTPException:
         raise
+    except InferenceBusyError as e:
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logging.error(f"Classification failed: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -98,67 +113,128 @@ async def classify_image(
         )
 
 
+async def _model_metadata(model):
+    """当前模型的登记元数据（进程内缓存，TTL内不访问数据库；数据库不可用时不影响分类结果）"""
+    try:
+        async with AsyncSessionLocal() as session:
+            return await VideoProcessingDAL(session).get_model_metadata(model.name, model.version)
+    except Exception as e:
+        logging.warning(f"读取模型元数据失败: {str(e)}")
+        return None
+
+
 # ------------------------- 边缘检测接口 -------------------------
 @router.post(
     "/edge-detection",
     summary="图像边缘检测",
     description="""### 处理流程
 1. 接收上传图像文件
-2. 执行Canny边缘检测算法
-3. 保存结果到存储系统
-4. 记录处理元数据到数据库
+2. 内存中解码并执行算子流水线（默认灰度 + Canny(100, 200)）
+3. 结果按 encode 算子指定的格式直接作为响应体返回（全程不落盘）
+4. 超大图像按文件头预估内存：JPEG 降采样解码，超过像素阈值时分块并行处理
 
 ### 输出说明
-- 结果文件保留24小时
-- 支持PNG/JPG两种输出格式
+- 大批量离线处理请使用 /edge-detection/jobs
 """,
-    response_model=EdgeDetectionResult,
+    response_class=Response,
     responses={
-        status.HTTP_201_CREATED: {
+        status.HTTP_200_OK: {
             "description": "处理成功",
-            "content": {"application/json": {"example": {
-                "result_url": "/results/edge_123.jpg",
-                "record_id": 42
-            }}}
+            "content": {"image/jpeg": {}, "image/png": {}, "image/webp": {}}
         }
     }
 )
 async def edge_detection(
         file: UploadFile = File(...,
                                 description="支持JPEG/PNG格式，建议分辨率不超过1920x1080"),
-        #db: Session = Depends(get_db)
+        ops: str = Query(DEFAULT_PIPELINE,
+                         description="算子流水线，如 resize=640x480;blur=5;autocanny;encode=png（见 utils/image_pipeline.py）")
 ):
-    with contextlib.ExitStack() as stack:
-        try:
-            # 保存上传文件
-            tmp_file = stack.enter_context(
-                tempfile.NamedTemporaryFile(delete=False, suffix=".jpg")
-            )
-            await file.seek(0)
-            tmp_file.write(await file.read())
-            tmp_path = tmp_file.name
-
-            # 处理图像
-            output_path = process_image(
-                tmp_path,
-                target_size=settings.MODEL_INPUT_SIZE
-            )
-            stack.callback(lambda: os.unlink(output_path))
+    image_data = await read_image_upload(file)
+
+    try:
+        # OpenCV 计算放到图像处理线程池，避免阻塞事件循环
+        result, content_type = await run_pipeline(image_data, ops)
+    except ImageTooLargeError as e:
+        raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logging.error(f"Edge detection failed: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"处理失败: {str(e)}"
+        )
 
-            # 数据库事务
-            #db.begin()
-            #record = crud.image.create_image_record(db, tmp_path, output_path)
-            #db.commit()
+    ext = mimetypes.guess_extension(content_type) or ".jpg"
+    return Response(
+        content=result,
+        media_type=content_type,
+        headers={"Content-Disposition": f'inline; filename="{Path(file.filename or "image").stem}_edges{ext}"'}
+    )
 
-            return JSONResponse(
-                content={"result_url": output_path},
-                status_code=status.HTTP_201_CREATED
-            )
 
-        except Exception as e:
-            #db.rollback()
-            logging.error(f"Edge detection failed: {str(e)}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"处理失败: {str(e)}"
-            )
\ No newline at end of file
+# ------------------------- 异步边缘检测接口 -------------------------
+@router.post(
+    "/edge-detection/jobs",
+    summary="提交异步边缘检测任务",
+    description="原图由API一次性上传到对象存储，任务消息只携带对象key",
+    response_model=JobSubmission,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def submit_edge_detection(
+        file: UploadFile = File(..., description="支持JPEG/PNG格式")
+):
+    object_key = await _upload_for_job(file)
+    job = edge_detection_batch.delay(object_key, file.filename or object_key)
+    return {"job_id": job.id, "object_key": object_key}
+
+
+@router.get("/edge-detection/jobs/{job_id}", summary="查询异步边缘检测任务状态")
+async def get_edge_detection_job(job_id: str):
+    return _job_status(job_id)
+
+
+# ------------------------- 异步分类接口 -------------------------
+@router.post(
+    "/classify/jobs",
+    summary="提交异步性别分类任务",
+    description="由批量worker合并处理，适合大批量离线分类",
+    response_model=JobSubmission,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def submit_classification(
+        file: UploadFile = File(..., description="支持JPEG/PNG格式")
+):
+    object_key = await _upload_for_job(file)
+    job = classify_batch.delay(object_key)
+    return {"job_id": job.id, "object_key": object_key}
+
+
+@router.get("/classify/jobs/{job_id}", summary="查询异步性别分类任务状态")
+async def get_classification_job(job_id: str):
+    return _job_status(job_id)
+
+
+async def _upload_for_job(file: UploadFile) -> str:
+    """校验上传文件并一次性写入对象存储，返回对象key"""
+    if file.content_type not in settings.ALLOWED_IMAGE_TYPES:
+        raise HTTPException(
+            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"仅支持 {settings.ALLOWED_IMAGE_TYPES} 格式"
+        )
+    image_data = await read_image_upload(file)
+
+    suffix = Path(file.filename or "").suffix or ".jpg"
+    object_key = f"{settings.UPLOAD_PREFIX}/{uuid.uuid4().hex}{suffix}"
+    await asyncio.to_thread(object_store.put_bytes, object_key, image_data, file.content_type)
+    return object_key
+
+
+def _job_status(job_id: str) -> dict:
+    result = AsyncResult(job_id, app=celery_app)
+    return {
+        "job_id": job_id,
+        "state": result.state,
+        "result": result.result if result.successful() else None
+    }
@@ -0,0 +1,63 @@
+# \app\services\frame_archive.py
+"""
+帧结果列式归档
+
+服务端游标按块读取任务帧结果，每块写成一个 Parquet 行组（内存占用与任务大小无关），
+写完后上传到 MinIO 并把对象路径记录到 Task.archive_path，离线分析直接按列读取归档文件。
+"""
+import asyncio
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Optional, Sequence
+import pyarrow as pa
+import pyarrow.parquet as pq
+from project_backend.app.config.settings import settings
+from project_backend.app.database.base import AsyncSessionLocal, VideoProcessingDAL
+from project_backend.app.utils.object_store import object_store
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("frame_index", pa.int32()),
+    ("gender", pa.string()),  # 低基数列，Parquet 默认字典编码
+    ("confidence", pa.float32()),
+    ("timestamp", pa.float64()),
+])
+
+PARQUET_CONTENT_TYPE = "application/vnd.apache.parquet"
+
+
+def _to_record_batch(rows: Sequence) -> pa.RecordBatch:
+    """(frame_index, gender, confidence, timestamp) 行块转为列式批"""
+    frame_index, gender, confidence, timestamp = zip(*rows)
+    return pa.RecordBatch.from_arrays([
+        pa.array(frame_index, pa.int32()),
+        pa.array([g.value if g else None for g in gender], pa.string()),
+        pa.array(confidence, pa.float32()),
+        pa.array(timestamp, pa.float64()),
+    ], schema=ARCHIVE_SCHEMA)
+
+
+async def export_task_frames(task_id: uuid.UUID, chunk_size: Optional[int] = None) -> str:
+    """
+    导出任务帧结果为 Parquet 并上传对象存储
+
+    返回:
+        对象完整路径（bucket/key），同时写入 Task.archive_path
+    """
+    chunk_size = chunk_size or settings.FRAME_ARCHIVE_CHUNK_ROWS
+    object_name = f"{settings.FRAME_ARCHIVE_PREFIX}/{task_id}.parquet"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        local_path = Path(tmp_dir) / "frames.parquet"
+        async with AsyncSessionLocal() as session:
+            dal = VideoProcessingDAL(session)
+            with pq.ParquetWriter(local_path, ARCHIVE_SCHEMA, compression="zstd") as writer:
+                async for rows in dal.stream_task_frames(task_id, chunk_size=chunk_size):
+                    writer.write_batch(_to_record_batch(rows))
+
+            # MinIO 客户端为同步接口，放到线程中上传
+            archive_path = await asyncio.to_thread(
+                object_store.upload_file, object_name, str(local_path), PARQUET_CONTENT_TYPE
+            )
+            await dal.set_task_archive(task_id, archive_path)
+    return archive_path
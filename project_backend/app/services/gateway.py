@@ -1,36 +1,48 @@
 # \app\services\gateway.py
 import asyncio
+import heapq
 import time
+import json
 import jwt
+from dataclasses import dataclass
 from fastapi import WebSocket, status
 from threading import Lock
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 from project_backend.app.config.settings import settings
 from project_backend.app.utils.metrics import monitor  # 使用单例监控实例
-from project_backend.app.services.quality_controller import DynamicQualityController
-from project_backend.app.services.limiters import TokenBucketLimiter, BandwidthLimiter
+from project_backend.app.services.quality_controller import quality_controller
+from project_backend.app.services.limiters import TokenBucketLimiter, bandwidth_limiter
 
 from project_backend.app.ml_models.video_processor import VideoProcessor
 
+@dataclass
+class ConnectionState:
+    """连接活跃状态（每收到一帧刷新 last_active）"""
+    websocket: WebSocket
+    connected_at: float
+    last_active: float
+
+
 class StreamGateway:
     """实时视频流控网关（监控集成优化版）"""
 
     def __init__(self):
         # 连接核心状态
-        self.active_connections: Dict[str, Tuple[WebSocket, float]] = {}
+        self.active_connections: Dict[str, ConnectionState] = {}
         self.connection_lock = Lock()
+        # 超时截止时间小顶堆 (deadline, client_id)，惰性更新：
+        # 活跃连接不逐帧入堆，出堆时再按 last_active 重新计算截止时间
+        self._deadlines: List[Tuple[float, str]] = []
 
         # 流量控制模块
         self.frame_limiter = TokenBucketLimiter(
             capacity=settings.MAX_FPS,
             refill_rate=settings.MAX_FPS
         )
-        self.bandwidth_limiter = BandwidthLimiter(
-            max_bps=settings.MAX_BANDWIDTH_MBPS * 1_000_000
-        )
+        self.bandwidth_limiter = bandwidth_limiter  # 实测速率，与其他入口共享全局窗口
 
         # 质量调控模块
-        self.quality_controller = DynamicQualityController()
+        self.quality_controller = quality_controller
 
         # 后台任务初始化
         self._init_background_tasks()
@@ -47,14 +59,20 @@ class StreamGateway:
             return
 
         # 注册连接
+        now = time.time()
         with self.connection_lock:
-            self.active_connections[client_id] = (websocket, time.time())
+            self.active_connections[client_id] = ConnectionState(websocket, now, now)
+            heapq.heappush(self._deadlines, (now + settings.CONNECTION_TIMEOUT, client_id))
             monitor.increment_connection()  # 线程安全计数
 
         try:
             while True:
-                # 准入控制
-                admission_result = self._check_admission(client_id)
+                # 接收帧数据（被拒绝的帧同样计入客户端实测入站流量）
+                frame_data, receive_time = await self._receive_frame(websocket)
+                self._touch(client_id, receive_time)
+
+                # 准入控制（拒绝即丢帧）
+                admission_result = self._check_admission(client_id, len(frame_data))
                 if not admission_result["allowed"]:
                     monitor.record_limiter_decision(
                         limiter_type=admission_result["type"],
@@ -62,14 +80,6 @@ class StreamGateway:
                     )
                     continue
 
-                # 接收帧数据
-                frame_data, receive_time = await self._receive_frame(websocket)
-                monitor.record_bandwidth(
-                    client_id=client_id,
-                    bytes=len(frame_data),
-                    direction="in"
-                )
-
                 # 处理流水线
                 start_time = time.time()
                 processed = await self._processing_pipeline(client_id, frame_data)
@@ -79,21 +89,43 @@ class StreamGateway:
                 )
 
                 # 发送响应
-                await self._send_response(websocket, processed)
-                monitor.record_bandwidth(
-                    client_id=client_id,
-                    bytes=len(processed),
-                    direction="out"
-                )
+                sent_bytes = await self._send_response(websocket, processed)
+                self.bandwidth_limiter.record(client_id, sent_bytes, direction="out")
 
         except Exception as e:
             monitor.record_processing_error()
-            await self._safe_close(websocket, code=status.WS_1011_INTERNAL_ERROR)
+            conn = self._unregister(client_id)
+            if conn:
+                await self._safe_close(conn, code=status.WS_1011_INTERNAL_ERROR)
         finally:
-            with self.connection_lock:
-                if client_id in self.active_connections:
-                    del self.active_connections[client_id]
-                    monitor.decrement_connection()
+            self._unregister(client_id)
+            self.bandwidth_limiter.release(client_id)
+            monitor.remove_client(client_id)
+
+    def _touch(self, client_id: str, timestamp: float):
+        """刷新连接活跃时间（O(1)，不触碰超时堆）"""
+        conn = self.active_connections.get(client_id)
+        if conn:
+            conn.last_active = timestamp
+
+    def _unregister(self, client_id: str):
+        """移除连接记录（幂等，返回被移除的连接状态）"""
+        with self.connection_lock:
+            conn = self.active_connections.pop(client_id, None)
+            if conn:
+                monitor.decrement_connection()
+            return conn
+
+    async def _receive_frame(self, websocket: WebSocket) -> Tuple[bytes, float]:
+        """接收一帧二进制数据（返回数据与接收时间）"""
+        frame_data = await websocket.receive_bytes()
+        return frame_data, time.time()
+
+    async def _send_response(self, websocket: WebSocket, payload) -> int:
+        """发送处理结果（返回实际发送的字节数）"""
+        message = json.dumps(payload, ensure_ascii=False)
+        await websocket.send_text(message)
+        return len(message.encode("utf-8"))
 
     async def _perform_handshake(self, websocket: WebSocket, client_id: str) -> bool:
         """安全握手协议（带监控）"""
@@ -119,20 +151,16 @@ class StreamGateway:
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return False
 
-    def _check_admission(self, client_id: str) -> dict:
+    def _check_admission(self, client_id: str, nbytes: int) -> dict:
         """综合准入检查（返回决策详情）"""
-        # 帧率限制检查
+        # 帧率限制检查（被丢弃的帧只计入客户端自身速率）
         if not self.frame_limiter.consume(client_id, tokens=1):
+            self.bandwidth_limiter.record(client_id, nbytes, direction="in", shared=False)
             return {"allowed": False, "type": "frame_rate"}
 
-        # 带宽配额检查
-        if not self.bandwidth_limiter.check_quota(client_id):
-            self.quality_controller.downgrade(client_id)
-            monitor.record_quality_change(
-                client_id=client_id,
-                action="downgrade",
-                reason="bandwidth_limit"
-            )
+        # 带宽配额检查（实测速率超限时通知质量调控器降级）
+        if not self.bandwidth_limiter.admit(client_id, nbytes):
+            self.quality_controller.throttle(client_id, reason="bandwidth_limit")
             return {"allowed": False, "type": "bandwidth"}
 
         return {"allowed": True, "type": "passed"}
@@ -149,7 +177,7 @@ class StreamGateway:
 
         # 质量调整阶段
         adjust_start = time.time()
-        adjusted_frame = self.quality_controller.adjust(client_id, validated_frame)
+        adjusted_frame = self.quality_controller.apply_profile(client_id, validated_frame)
         monitor.record_processing_latency(
             phase="quality_adjust",
             latency_seconds=time.time() - adjust_start
@@ -174,22 +202,34 @@ class StreamGateway:
         """心跳检测（带连接状态监控）"""
         while True:
             await asyncio.sleep(settings.HEARTBEAT_INTERVAL)
-            stale = []
-            now = time.time()
+            stale = self._collect_stale(time.time())
 
-            with self.connection_lock:
-                for client_id, (ws, last_active) in self.active_connections.items():
-                    if now - last_active > settings.CONNECTION_TIMEOUT:
-                        stale.append(client_id)
-
-                for client_id in stale:
-                    await self._safe_close(self.active_connections[client_id][0])
-                    del self.active_connections[client_id]
-                    monitor.decrement_connection()
-                    monitor.record_connection_duration(
-                        duration=now - last_active,
-                        client_type="stale"
-                    )
+            # 锁外并发关闭，单个连接关闭缓慢不阻塞其他连接
+            if stale:
+                await asyncio.gather(
+                    *(self._safe_close(conn, client_type="stale") for conn in stale)
+                )
+
+    def _collect_stale(self, now: float) -> List[ConnectionState]:
+        """弹出所有已到期的截止时间，返回确实超时的连接（O(到期数)）"""
+        stale = []
+        with self.connection_lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                _, client_id = heapq.heappop(self._deadlines)
+                conn = self.active_connections.get(client_id)
+                if conn is None:
+                    continue  # 已正常断开，丢弃过期条目
+
+                deadline = conn.last_active + settings.CONNECTION_TIMEOUT
+                if deadline > now:
+                    # 期间有活动：按最新活跃时间重新入堆
+                    heapq.heappush(self._deadlines, (deadline, client_id))
+                    continue
+
+                del self.active_connections[client_id]
+                monitor.decrement_connection()
+                stale.append(conn)
+        return stale
 
     async def _report_system_metrics(self):
         """系统级指标上报"""
@@ -201,28 +241,19 @@ class StreamGateway:
                     current=len(self.active_connections)
                 )
 
-    async def _safe_close(self, websocket: WebSocket, code: int = status.WS_1000_NORMAL_CLOSURE):
+    async def _safe_close(
+            self,
+            conn: ConnectionState,
+            code: int = status.WS_1000_NORMAL_CLOSURE,
+            client_type: str = "normal"
+    ):
         """安全关闭连接（带连接时长统计）"""
         try:
-            start_time = self.active_connections.get(id(websocket), (None, 0))[1]
-            if start_time:
-                monitor.record_connection_duration(
-                    duration=time.time() - start_time,
-                    client_type="normal"
-                )
-            await websocket.close(code=code)
+            monitor.record_connection_duration(
+                duration=time.time() - conn.connected_at,
+                client_type=client_type
+            )
+            await conn.websocket.close(code=code)
         except Exception:
             pass
 
-
-# 辅助类接口定义
-class DynamicQualityController:
-    def adjust(self, client_id: str, frame_data: bytes) -> bytes:
-        """质量调整接口"""
-        return frame_data
-
-
-class BandwidthLimiter:
-    def check_quota(self, client_id: str) -> bool:
-        """带宽配额检查接口"""
-        return True
\ No newline at end of file
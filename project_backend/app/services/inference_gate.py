@@ -0,0 +1,70 @@
+# \app\services\inference_gate.py
+import asyncio
+import hashlib
+import math
+from typing import Any, Callable, Dict
+from project_backend.app.config.settings import settings
+from project_backend.app.utils.metrics import monitor
+from project_backend.app.ml_models.video_processor import VideoProcessor
+
+
+class InferenceBusyError(Exception):
+    """路由在途推理数已达上限"""
+
+    def __init__(self, route: str, retry_after: int):
+        super().__init__(f"{route} 推理繁忙，请 {retry_after} 秒后重试")
+        self.retry_after = retry_after
+
+
+class InferenceGate:
+    """
+    单路由推理入口（共享推理执行器之上）
+
+    特性：
+    - 推理提交到 VideoProcessor 共享执行器，不阻塞事件循环
+    - 相同内容（哈希）的并发请求合并为一次推理，结果共享
+    - 路由级在途推理数上限，超出时抛出 InferenceBusyError（由路由转为 503 + Retry-After）
+    - 发起请求被取消（客户端断开）时推理继续，其余等待者不受影响
+    """
+
+    def __init__(self, route: str, max_inflight: int):
+        self.route = route
+        self.max_inflight = max_inflight
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def content_key(data, *salt: str) -> str:
+        """请求内容哈希（salt 用于区分模型版本等）"""
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        return ":".join(salt + (digest,))
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    def retry_after(self) -> int:
+        """按推理P95延迟估算的重试等待秒数"""
+        return max(settings.INFERENCE_RETRY_AFTER, math.ceil(VideoProcessor.latency_percentile(0.95)))
+
+    async def run(self, key: str, func: Callable, *args) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            monitor.record_inference_request(self.route, "coalesced")
+        else:
+            if len(self._inflight) >= self.max_inflight:
+                monitor.record_inference_request(self.route, "rejected")
+                raise InferenceBusyError(self.route, self.retry_after())
+            task = asyncio.ensure_future(VideoProcessor.run_inference(func, *args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._release(key, t))
+            monitor.record_inference_request(self.route, "executed")
+        return await asyncio.shield(task)
+
+    def _release(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # 所有等待者都已取消时避免"exception was never retrieved"告警
+
+
+# 单例实例
+classify_gate = InferenceGate("classify_image", settings.CLASSIFY_MAX_INFLIGHT)
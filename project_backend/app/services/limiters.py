@@ -84,20 +84,58 @@ class TokenBucketLimiter:
                     self.buckets[client_id]['capacity'] = new_capacity
 
 
+class SlidingWindowMeter:
+    """
+    滑动窗口字节速率计（分桶环形缓冲）
+
+    将窗口划分为固定数量的时间桶，写入与查询均为 O(桶数)，
+    不随流量大小增长内存
+    """
+
+    def __init__(self, window_seconds: float, buckets: int = 10):
+        self.window = window_seconds
+        self.bucket_span = window_seconds / buckets
+        self.counts = [0] * buckets
+        self.stamps = [-1] * buckets  # 每个桶对应的时间片编号
+
+    def _slot(self, now: float):
+        tick = int(now / self.bucket_span)
+        idx = tick % len(self.counts)
+        if self.stamps[idx] != tick:
+            self.stamps[idx] = tick
+            self.counts[idx] = 0
+        return idx
+
+    def add(self, nbytes: int, now: float):
+        """记录一次传输"""
+        self.counts[self._slot(now)] += nbytes
+
+    def rate(self, now: float, span: float = None) -> float:
+        """最近 span 秒内的平均速率（bit/s），默认整个窗口"""
+        span = min(span or self.window, self.window)
+        oldest = int(now / self.bucket_span) - max(1, round(span / self.bucket_span)) + 1
+        total = sum(
+            count for count, tick in zip(self.counts, self.stamps)
+            if tick >= oldest
+        )
+        return total * 8 / span
+
+
 class BandwidthLimiter:
     """
-    带宽分配管理器（实时配置同步）
+    带宽限制器（基于实测字节速率）
 
     特性：
-    - 全局带宽池分配
-    - 优先级抢占机制
-    - 突发流量缓冲
+    - 客户端级与全局滑动窗口速率统计（入站帧 + 出站响应）
+    - 持续速率不超过配额，短时突发允许 BANDWIDTH_BURST_FACTOR 倍
+    - 实时配置同步
     """
 
+    BURST_SPAN = 1.0  # 突发判定窗口（秒）
+
     def __init__(self):
-        self._max_bps = settings.MAX_BANDWIDTH_MBPS * 1_000_000
-        self.used_bps: float = 0.0
-        self.client_usage: Dict[str, float] = {}
+        self.global_meter = SlidingWindowMeter(settings.BANDWIDTH_WINDOW_SECONDS)
+        self.client_meters: Dict[str, SlidingWindowMeter] = {}
         self.lock = threading.Lock()
 
     @property
@@ -105,41 +143,84 @@ class BandwidthLimiter:
         """动态获取最新带宽配置"""
         return settings.MAX_BANDWIDTH_MBPS * 1_000_000
 
-    def allocate(self, client_id: str, required_bps: float) -> bool:
-        """申请带宽分配"""
+    @property
+    def client_max_bps(self):
+        """单客户端带宽上限"""
+        return min(settings.MAX_CLIENT_BANDWIDTH_MBPS, settings.MAX_BANDWIDTH_MBPS) * 1_000_000
+
+    def _client_meter(self, client_id: str) -> SlidingWindowMeter:
+        meter = self.client_meters.get(client_id)
+        if meter is None:
+            meter = self.client_meters[client_id] = SlidingWindowMeter(settings.BANDWIDTH_WINDOW_SECONDS)
+        return meter
+
+    def record(self, client_id: str, nbytes: int, direction: str = "in", shared: bool = True):
+        """记录实际传输字节（入站帧或出站响应）；shared=False 时只计入客户端自身速率"""
+        now = time.monotonic()
         with self.lock:
-            client_current = self.client_usage.get(client_id, 0.0)
+            self._client_meter(client_id).add(nbytes, now)
+            if shared:
+                self.global_meter.add(nbytes, now)
+        monitor.record_bandwidth(
+            client_id=client_id,
+            bytes=nbytes,
+            direction=direction
+        )
 
-            # 计算新总带宽
-            new_total = self.used_bps - client_current + required_bps
-            if new_total > self.max_bps:
-                return False
+    @staticmethod
+    def _within(meter: SlidingWindowMeter, limit_bps: float, now: float) -> bool:
+        """持续速率不超限，且突发速率不超过突发上限"""
+        return (
+            meter.rate(now) <= limit_bps
+            and meter.rate(now, BandwidthLimiter.BURST_SPAN) <= limit_bps * settings.BANDWIDTH_BURST_FACTOR
+        )
 
-            self.used_bps = new_total
-            self.client_usage[client_id] = required_bps
-            monitor.record_bandwidth(
-                client_id=client_id,
-                bytes=required_bps,
-                direction="allocate"
-            )
-            return True
+    def _check(self, client_id: str, now: float) -> bool:
+        # 先判定客户端自身配额：超限客户端只影响自己
+        meter = self.client_meters.get(client_id)
+        if meter is not None and not self._within(meter, self.client_max_bps, now):
+            return False
+        return self._within(self.global_meter, self.max_bps, now)
+
+    def check_quota(self, client_id: str) -> bool:
+        """检查客户端及全局实测速率是否在配额内"""
+        with self.lock:
+            allowed = self._check(client_id, time.monotonic())
+        monitor.record_limiter_decision(limiter_type="bandwidth", allowed=allowed)
+        return allowed
+
+    def admit(self, client_id: str, nbytes: int) -> bool:
+        """
+        入站帧准入（计量与判定一步完成）
+
+        帧字节总是计入客户端自身速率；只有准入的帧才计入全局速率，
+        被拒绝的帧不会挤占其他客户端的全局配额
+        """
+        now = time.monotonic()
+        with self.lock:
+            self._client_meter(client_id).add(nbytes, now)
+            allowed = self._check(client_id, now)
+            if allowed:
+                self.global_meter.add(nbytes, now)
+        monitor.record_bandwidth(client_id=client_id, bytes=nbytes, direction="in")
+        monitor.record_limiter_decision(limiter_type="bandwidth", allowed=allowed)
+        return allowed
+
+    def get_client_rate(self, client_id: str) -> float:
+        """客户端当前实测速率（bit/s）"""
+        with self.lock:
+            meter = self.client_meters.get(client_id)
+            return meter.rate(time.monotonic()) if meter else 0.0
 
     def release(self, client_id: str):
-        """释放带宽"""
+        """连接关闭时释放客户端统计"""
         with self.lock:
-            if client_id in self.client_usage:
-                self.used_bps -= self.client_usage[client_id]
-                del self.client_usage[client_id]
-                monitor.record_bandwidth(
-                    client_id=client_id,
-                    bytes=0,
-                    direction="release"
-                )
+            self.client_meters.pop(client_id, None)
 
     def get_available(self) -> float:
-        """获取可用带宽"""
+        """获取全局可用带宽（bit/s）"""
         with self.lock:
-            return max(0, self.max_bps - self.used_bps)
+            return max(0.0, self.max_bps - self.global_meter.rate(time.monotonic()))
 
 
 class ConcurrencyLimiter:
@@ -0,0 +1,106 @@
+# \app\services\overload_governor.py
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from project_backend.app.config.settings import settings
+from project_backend.app.utils.metrics import monitor
+from project_backend.app.ml_models.video_processor import VideoProcessor
+from project_backend.app.services.quality_controller import quality_controller, DynamicQualityController
+
+
+class OverloadGovernor:
+    """
+    系统过载调控器（基于推理队列深度与P95延迟）
+
+    特性：
+    - 超过上阈值时逐级降级当前负载最重的客户端
+    - 低于下阈值且持续若干采样周期后逐级恢复（迟滞，防止抖动）
+    - 恢复顺序与降级顺序相反（后降级的先恢复）
+    """
+
+    def __init__(self, controller: DynamicQualityController = quality_controller):
+        self.controller = controller
+        self._degraded: List[str] = []  # 降级栈（每次降级压入一个客户端）
+        self._last_frame_counts: Dict[str, int] = {}
+        self._calm_samples = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """启动后台采样任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止后台采样任务"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.OVERLOAD_CHECK_INTERVAL)
+            try:
+                self.evaluate()
+            except Exception as e:
+                logging.error(f"过载调控采样失败: {str(e)}", exc_info=True)
+
+    def evaluate(self) -> Optional[str]:
+        """
+        执行一次采样决策
+
+        返回:
+            "downgrade" / "upgrade" / None
+        """
+        depth = VideoProcessor.queue_depth()
+        p95_ms = VideoProcessor.latency_percentile(0.95) * 1000
+        loads = self._sample_client_loads()
+        self._degraded = [cid for cid in self._degraded if cid in self.controller.client_profiles]
+
+        decision = None
+        if depth > settings.OVERLOAD_QUEUE_HIGH or p95_ms > settings.OVERLOAD_P95_HIGH_MS:
+            self._calm_samples = 0
+            if self._downgrade_heaviest(loads):
+                decision = "downgrade"
+        elif depth <= settings.OVERLOAD_QUEUE_LOW and p95_ms <= settings.OVERLOAD_P95_LOW_MS:
+            self._calm_samples += 1
+            if self._calm_samples >= settings.OVERLOAD_RECOVERY_SAMPLES and self._degraded:
+                self._calm_samples = 0
+                client_id = self._degraded.pop()
+                self.controller.force_upgrade(client_id)
+                decision = "upgrade"
+        else:
+            # 处于迟滞区间：维持现状
+            self._calm_samples = 0
+
+        monitor.record_overload_state(depth, len(set(self._degraded)))
+        if decision:
+            logging.info(f"过载调控: {decision} (queue={depth}, p95={p95_ms:.1f}ms)")
+        return decision
+
+    def _sample_client_loads(self) -> Dict[str, int]:
+        """统计各客户端自上次采样以来的准入帧数"""
+        loads = {}
+        counts = {}
+        for client_id, profile in list(self.controller.client_profiles.items()):
+            counts[client_id] = profile.frame_count
+            loads[client_id] = profile.frame_count - self._last_frame_counts.get(client_id, 0)
+        self._last_frame_counts = counts
+        return loads
+
+    def _downgrade_heaviest(self, loads: Dict[str, int]) -> bool:
+        """降级负载最重且仍可降级的客户端"""
+        for client_id in sorted(loads, key=loads.get, reverse=True):
+            if loads[client_id] <= 0:
+                break
+            if self.controller.force_downgrade(client_id):
+                self._degraded.append(client_id)
+                return True
+        return False
+
+
+# 单例实例
+overload_governor = OverloadGovernor()
@@ -7,6 +7,10 @@ ResolutionType = Literal["1080p", "720p", "480p", "360p"]
 FrameRateType = Literal["30fps", "24fps", "15fps", "10fps"]
 CodecType = Literal["h264", "h265", "vp9"]
 
+FRAMERATES = ["30fps", "24fps", "15fps", "10fps"]  # 由高到低的帧率档位
+# 服务端跳帧令牌桶容量（帧）：允许到达间隔抖动，按档位帧率匀速发送的客户端不被误丢帧
+FRAME_BURST = 2.0
+
 
 class ClientProfile:
     """客户端质量档案（内存数据库存储）"""
@@ -18,6 +22,10 @@ class ClientProfile:
         self.codec: CodecType = "h264"
         self.last_adjusted = time.time()
         self._quality_lock = False  # 防止频繁调整
+        self.frame_count = 0  # 已准入帧数（供过载调控器估算负载）
+        self.frame_tokens = FRAME_BURST  # 跳帧令牌桶剩余令牌
+        self.last_frame_at = 0.0  # 上一次收到帧的时间（单调时钟，令牌补充基准）
+        self.overload_level = 0  # 因系统过载被强制降级的级数
 
 
 class DynamicQualityController:
@@ -44,6 +52,7 @@ class DynamicQualityController:
         """获取或创建客户端质量档案"""
         if client_id not in self.client_profiles:
             self.client_profiles[client_id] = ClientProfile(client_id)
+            monitor.set_client_tier(client_id, self.client_profiles[client_id].resolution)
         return self.client_profiles[client_id]
 
     def adjust(self, client_id: str, network_stats: dict) -> Optional[dict]:
@@ -73,7 +82,7 @@ class DynamicQualityController:
         if action:
             profile.last_adjusted = time.time()
             self._apply_adjustment(profile, action)
-            monitor.record_quality_change(client_id, action)
+            monitor.record_quality_change(client_id, action["action"], action.get("reason", "network"))
             return action
 
     def _calculate_target_bitrate(self, stats: dict) -> float:
@@ -130,10 +139,10 @@ class DynamicQualityController:
         return None
 
     def _adjust_framerate(self, current: str, delta: int) -> str:
-        """调整帧率（示例逻辑）"""
-        current_fps = int(current.replace("fps", ""))
-        new_fps = max(10, min(30, current_fps + delta))
-        return f"{new_fps}fps"
+        """按档位表升降一级帧率（delta 只取符号），结果始终是 FRAMERATES 中的档位"""
+        idx = FRAMERATES.index(current)
+        idx = min(len(FRAMERATES) - 1, idx + 1) if delta < 0 else max(0, idx - 1)
+        return FRAMERATES[idx]
 
     def _estimate_current_bitrate(self, profile: ClientProfile) -> float:
         """估算当前配置的码率需求"""
@@ -145,18 +154,96 @@ class DynamicQualityController:
         """应用调整到客户端档案"""
         if "resolution" in action:
             profile.resolution = action["resolution"]
+            monitor.set_client_tier(profile.client_id, profile.resolution)
         if "framerate" in action:
             profile.framerate = action["framerate"]
 
     def force_downgrade(self, client_id: str, level: int = 1):
         """外部触发强制降级（如系统过载）"""
         profile = self.get_client_profile(client_id)
+        action = None
         for _ in range(level):
             action = self._generate_downgrade(profile, "system_overload")
             if action:
                 self._apply_adjustment(profile, action)
+                profile.overload_level += 1
+                monitor.record_quality_change(client_id, action["action"], "system_overload")
+        return action
+
+    def force_upgrade(self, client_id: str, level: int = 1):
+        """撤销过载降级（只恢复force_downgrade施加的级数）"""
+        profile = self.client_profiles.get(client_id)
+        if profile is None:
+            return None
+        action = None
+        for _ in range(min(level, profile.overload_level)):
+            action = self._generate_upgrade(profile)
+            if action:
+                self._apply_adjustment(profile, action)
+                monitor.record_quality_change(client_id, action["action"], "overload_recovered")
+            profile.overload_level -= 1
+        return action
+
+    def throttle(self, client_id: str, reason: str = "bandwidth") -> Optional[dict]:
+        """外部触发的限流降级（如实测带宽超限），沿用10秒防抖"""
+        profile = self.get_client_profile(client_id)
+        if time.time() - profile.last_adjusted < 10:
+            return None
+        action = self._generate_downgrade(profile, reason)
+        if action:
+            profile.last_adjusted = time.time()
+            self._apply_adjustment(profile, action)
+            monitor.record_quality_change(client_id, action["action"], reason)
         return action
 
+    def apply_profile(self, client_id: str, frame_data: bytes) -> bytes:
+        """按客户端当前分辨率档位缩放帧（源帧不高于档位时原样返回）"""
+        import cv2
+
+        profile = self.get_client_profile(client_id)
+        target_height = int(profile.resolution.rstrip("p"))
+        frame = cv2.imdecode(np.frombuffer(frame_data, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None or frame.shape[0] <= target_height:
+            return frame_data
+        scale = target_height / frame.shape[0]
+        resized = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", resized)
+        return buf.tobytes() if ok else frame_data
+
+    def admit_frame(self, client_id: str) -> bool:
+        """
+        按客户端当前帧率档位决定是否处理该帧（服务端跳帧）
+
+        令牌桶按档位帧率补充、容量 FRAME_BURST：长期准入速率等于档位帧率，
+        单帧提前到达（网络抖动）时消耗积累的令牌而不被丢弃
+
+        返回:
+            True 表示处理，False 表示跳过
+        """
+        profile = self.get_client_profile(client_id)
+        fps = int(profile.framerate.replace("fps", ""))
+        now = time.monotonic()
+        profile.frame_tokens = min(FRAME_BURST, profile.frame_tokens + (now - profile.last_frame_at) * fps)
+        profile.last_frame_at = now
+        if profile.frame_tokens < 1.0:
+            return False
+        profile.frame_tokens -= 1.0
+        profile.frame_count += 1
+        return True
+
+    def get_directive(self, client_id: str) -> dict:
+        """当前质量档位（下发给客户端以降低采集分辨率/帧率）"""
+        profile = self.get_client_profile(client_id)
+        return {
+            "type": "quality",
+            "resolution": profile.resolution,
+            "framerate": profile.framerate
+        }
+
+    def remove_client(self, client_id: str):
+        """连接关闭时清理客户端档案"""
+        self.client_profiles.pop(client_id, None)
+
 
 # 单例实例
 quality_controller = DynamicQualityController()
\ No newline at end of file
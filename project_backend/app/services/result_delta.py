@@ -0,0 +1,73 @@
+# \app\services\result_delta.py
+import time
+from typing import Dict, Optional
+from project_backend.app.config.settings import settings
+
+# 增量中不参与比较的响应字段
+_FRAME_FIELDS = ("predictions", "timestamp", "skipped")
+
+
+def _compact(pred: dict) -> dict:
+    """增量消息中的预测项（坐标保留1位小数，置信度3位）"""
+    return {
+        "track_id": pred["track_id"],
+        "label": pred["label"],
+        "confidence": round(pred["confidence"], 3),
+        "bbox": [round(float(v), 1) for v in pred["bbox"]]
+    }
+
+
+class DeltaEncoder:
+    """
+    单连接的结果增量编码（客户端认证时声明 "delta": true 启用）
+
+    特性：
+    - 每 STREAM_KEYFRAME_INTERVAL 秒下发一次全量结果（type=full），供客户端校准
+    - 其余帧只下发相对上次已发送状态的变化（type=delta）：
+      updated=标签变化、置信度变化超过 DELTA_CONFIDENCE_STEP 或框移动超过 DELTA_BBOX_TOLERANCE 的轨迹，
+      removed=已消失的 track_id
+    - 没有任何变化时不发送（encode 返回 None）
+    """
+
+    def __init__(self):
+        self._sent: Dict[int, dict] = {}  # track_id -> 客户端当前持有的预测
+        self._last_full = float("-inf")
+        self._seq = 0
+
+    def encode(self, response: dict) -> Optional[dict]:
+        current = {p["track_id"]: _compact(p) for p in response["predictions"]}
+        extra = {k: v for k, v in response.items() if k not in _FRAME_FIELDS}  # 如质量档位指令
+        now = time.monotonic()
+
+        if now - self._last_full >= settings.STREAM_KEYFRAME_INTERVAL:
+            self._last_full = now
+            self._sent = current
+            self._seq += 1
+            return {"type": "full", "seq": self._seq, "timestamp": response["timestamp"],
+                    "predictions": list(current.values()), **extra}
+
+        updated = [p for tid, p in current.items() if self._changed(self._sent.get(tid), p)]
+        removed = [tid for tid in self._sent if tid not in current]
+        if not updated and not removed and not extra:
+            return None
+
+        for pred in updated:
+            self._sent[pred["track_id"]] = pred
+        for tid in removed:
+            del self._sent[tid]
+        self._seq += 1
+        delta = {"type": "delta", "seq": self._seq, "timestamp": response["timestamp"]}
+        if updated:
+            delta["updated"] = updated
+        if removed:
+            delta["removed"] = removed
+        delta.update(extra)
+        return delta
+
+    @staticmethod
+    def _changed(sent: Optional[dict], pred: dict) -> bool:
+        if sent is None or sent["label"] != pred["label"]:
+            return True
+        if abs(sent["confidence"] - pred["confidence"]) > settings.DELTA_CONFIDENCE_STEP:
+            return True
+        return max(abs(a - b) for a, b in zip(sent["bbox"], pred["bbox"])) > settings.DELTA_BBOX_TOLERANCE
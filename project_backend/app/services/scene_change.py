@@ -0,0 +1,50 @@
+# \app\services\scene_change.py
+from typing import Optional
+import cv2
+import numpy as np
+from project_backend.app.config.settings import settings
+
+
+class SceneChangeDetector:
+    """
+    单连接的画面变化检测（每个视频流一个实例）
+
+    特性：
+    - JPEG 帧按 1/8 尺度解码为灰度，再缩成 SCENE_THUMB_SIZE 见方的缩略图（远低于一次推理的开销）
+    - 变化量为缩略图与参考帧的平均绝对差（0~1）
+    - 参考帧只在变化量达到阈值时更新（即最近一次实际处理的帧），缓慢漂移也会累积触发
+    """
+
+    def __init__(self, threshold: Optional[float] = None):
+        self.threshold = settings.SCENE_CHANGE_THRESHOLD if threshold is None else threshold
+        self._reference: Optional[np.ndarray] = None
+
+    @staticmethod
+    def thumbnail(frame_data: bytes) -> Optional[np.ndarray]:
+        image = cv2.imdecode(np.frombuffer(frame_data, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if image is None:
+            return None
+        size = settings.SCENE_THUMB_SIZE
+        return cv2.resize(image, (size, size), interpolation=cv2.INTER_AREA)
+
+    def measure(self, frame_data: bytes) -> float:
+        """
+        计算本帧相对参考帧的变化量
+
+        返回:
+            0~1；无参考帧或无法解码时返回 1.0（按画面变化处理）
+        """
+        thumb = self.thumbnail(frame_data)
+        if thumb is None:
+            return 1.0
+        if self._reference is None:
+            self._reference = thumb
+            return 1.0
+        change = float(cv2.absdiff(thumb, self._reference).mean()) / 255.0
+        if change >= self.threshold:
+            self._reference = thumb
+        return change
+
+    def reset(self):
+        """丢弃参考帧（下一帧必然按变化处理）"""
+        self._reference = None
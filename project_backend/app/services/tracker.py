@@ -0,0 +1,182 @@
+# \app\services\tracker.py
+import itertools
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Optional
+import numpy as np
+from project_backend.app.config.settings import settings
+
+# α-β 滤波增益（恒速模型的稳态卡尔曼增益近似，时间单位为帧）
+_ALPHA = 0.7
+_BETA = 0.3
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """两组 xyxy 框的两两 IoU，形状 (len(a), len(b))"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+@dataclass
+class Track:
+    track_id: int
+    state: np.ndarray  # cx, cy, w, h
+    velocity: np.ndarray = field(default_factory=lambda: np.zeros(2, np.float32))  # 中心点每帧位移
+    male_prob: float = 0.5  # 指数平滑后的男性概率
+    label: str = "unknown"  # 平滑后的性别标签
+    confidence: float = 0.0
+    history: deque = field(default_factory=lambda: deque(maxlen=settings.TRACK_VOTE_WINDOW))  # 最近各帧男性概率
+    misses: int = 0  # 连续未匹配的检测轮数
+    last_frame: int = 0
+
+    def predicted(self, frame: int) -> np.ndarray:
+        """按恒速模型外推到指定帧的 cx, cy, w, h"""
+        state = self.state.copy()
+        state[:2] += self.velocity * (frame - self.last_frame)
+        return state
+
+    def correct(self, measured: np.ndarray, frame: int):
+        """用检测框修正状态（α-β 滤波）"""
+        dt = max(1, frame - self.last_frame)
+        predicted = self.predicted(frame)
+        residual = measured - predicted
+        self.state = predicted + _ALPHA * residual
+        self.velocity = self.velocity + _BETA * residual[:2] / dt
+        self.last_frame = frame
+        self.misses = 0
+
+    def box_at(self, frame: int) -> np.ndarray:
+        cx, cy, w, h = self.predicted(frame)
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], np.float32)
+
+    def observe_gender(self, label: str, confidence: float):
+        p = _male_prob(label, confidence)
+        self.history.append(p)
+        a = settings.TRACK_GENDER_EMA
+        self.male_prob = p if len(self.history) == 1 else a * p + (1 - a) * self.male_prob
+        if settings.TRACK_SMOOTHING == "vote":
+            self._vote()
+        else:
+            self._ema()
+
+    def _ema(self):
+        """指数平滑 + 迟滞：概率越过 0.5±TRACK_LABEL_HYSTERESIS 才切换标签"""
+        margin = 0.0 if self.label == "unknown" else settings.TRACK_LABEL_HYSTERESIS
+        if self.label != "male" and self.male_prob > 0.5 + margin:
+            self.label = "male"
+        elif self.label != "female" and self.male_prob < 0.5 - margin:
+            self.label = "female"
+        elif self.label == "unknown":
+            self.label = "male"  # 恰为 0.5
+        self.confidence = self.male_prob if self.label == "male" else 1.0 - self.male_prob
+
+    def _vote(self):
+        """滑动窗口多数表决（平票保持原标签），置信度取获胜一方的平均值"""
+        male_votes = [p for p in self.history if p >= 0.5]
+        female_votes = [1.0 - p for p in self.history if p < 0.5]
+        if len(male_votes) != len(female_votes):
+            self.label = "male" if len(male_votes) > len(female_votes) else "female"
+        elif self.label == "unknown":
+            self.label = "male" if self.male_prob >= 0.5 else "female"
+        votes = male_votes if self.label == "male" else female_votes
+        self.confidence = sum(votes) / len(votes)
+
+
+def _male_prob(label: str, confidence: float) -> float:
+    return confidence if label == "male" else 1.0 - confidence
+
+
+def _to_state(box) -> np.ndarray:
+    x1, y1, x2, y2 = (float(v) for v in box[:4])
+    return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1], np.float32)
+
+
+class StreamTracker:
+    """
+    单连接的帧间目标跟踪（每个视频流一个实例）
+
+    特性：
+    - 每 TRACK_DETECT_INTERVAL 帧运行一次检测，其余帧按恒速模型外推框位置，不做推理
+    - 检测帧以 IoU 贪心匹配已有轨迹，匹配成功沿用 track_id，未匹配的检测新建轨迹
+    - 连续 TRACK_MAX_MISSES 轮检测未匹配的轨迹删除
+    - 性别按轨迹平滑（TRACK_SMOOTHING：ema 指数平滑+迟滞 / vote 滑动窗口多数表决），单帧误判不会使标签跳变
+    """
+
+    def __init__(self, detect_interval: Optional[int] = None):
+        self.detect_interval = detect_interval or settings.TRACK_DETECT_INTERVAL
+        self.tracks: List[Track] = []
+        self._ids = itertools.count(1)
+        self._frame = 0  # 当前帧序号
+        self._last_detection: Optional[int] = None
+
+    def needs_detection(self, force: bool = False) -> bool:
+        """下一帧是否需要运行检测（force 用于场景切换等外部触发）"""
+        return (
+            force
+            or self._last_detection is None
+            or not self.tracks
+            or self._frame + 1 - self._last_detection >= self.detect_interval
+        )
+
+    def update(self, detections: List[dict]) -> List[dict]:
+        """检测帧：关联检测结果与轨迹，返回带 track_id 的平滑结果"""
+        self._frame += 1
+        self._last_detection = self._frame
+        frame = self._frame
+
+        det_boxes = np.array([d["bbox"][:4] for d in detections], np.float32).reshape(-1, 4)
+        track_boxes = np.array([t.box_at(frame) for t in self.tracks], np.float32).reshape(-1, 4)
+        ious = iou_matrix(track_boxes, det_boxes)
+
+        matched_tracks, matched_dets = set(), set()
+        for flat in np.argsort(-ious, axis=None):
+            ti, di = divmod(int(flat), ious.shape[1])
+            if ious[ti, di] < settings.TRACK_IOU_THRESHOLD:
+                break
+            if ti in matched_tracks or di in matched_dets:
+                continue
+            matched_tracks.add(ti)
+            matched_dets.add(di)
+            track, det = self.tracks[ti], detections[di]
+            track.correct(_to_state(det["bbox"]), frame)
+            track.observe_gender(det["label"], det["confidence"])
+
+        for di, det in enumerate(detections):
+            if di not in matched_dets:
+                track = Track(next(self._ids), _to_state(det["bbox"]), last_frame=frame)
+                track.observe_gender(det["label"], det["confidence"])
+                self.tracks.append(track)
+                matched_tracks.add(len(self.tracks) - 1)
+
+        for ti, track in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                track.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= settings.TRACK_MAX_MISSES]
+        return self._results(frame)
+
+    def predict(self) -> List[dict]:
+        """非检测帧：外推轨迹位置，返回上次平滑后的结果"""
+        self._frame += 1
+        return self._results(self._frame)
+
+    def _results(self, frame: int) -> List[dict]:
+        results = []
+        for track in self.tracks:
+            if track.misses:
+                continue  # 上轮检测未命中的轨迹不输出（保留待下轮匹配）
+            results.append({
+                "bbox": track.box_at(frame).tolist(),
+                "label": track.label,
+                "confidence": track.confidence,
+                "track_id": track.track_id,
+                "model_type": "gender"
+            })
+        return results
@@ -0,0 +1,111 @@
+# app\tasks\batch_tasks.py
+"""
+批量消费的图像任务（celery-batches）
+
+同一队列中积压的消息按 CELERY_BATCH_SIZE 条或 CELERY_BATCH_INTERVAL 秒合并为一次调用：
+图像在内存中 cv2.imdecode 解码，批内用线程池并行处理（OpenCV/对象存储IO释放GIL），
+处理记录一次批量写入。每条消息仍有独立的任务ID与结果。
+
+worker 单独消费 vision_batch 队列，且预取数需不小于批大小，否则攒不满一批：
+    celery -A project_backend.app.tasks.celery_config worker -Q vision_batch --prefetch-multiplier=16
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+from asgiref.sync import async_to_sync
+from celery_batches import Batches, SimpleRequest
+from project_backend.app.tasks.celery_config import app as celery_app
+from project_backend.app.config.settings import settings
+from project_backend.app.database.base import AsyncSessionLocal
+from project_backend.app.database.crud.image import bulk_create_image_records
+from project_backend.app.ml_models.model_manager import model_manager
+from project_backend.app.utils.image_utils import process_image_bytes
+from project_backend.app.utils.metrics import monitor
+from project_backend.app.utils.object_store import object_store
+
+# 批内并行线程池（进程级复用）
+_executor = ThreadPoolExecutor(max_workers=settings.CELERY_BATCH_THREADS, thread_name_prefix="batch")
+
+
+def _run_batch(task_name: str, requests: List[SimpleRequest], handler) -> list:
+    """并行处理一批消息并逐条回写结果，返回各条结果（失败为异常对象）"""
+    start = time.perf_counter()
+
+    def safe(request):
+        try:
+            return handler(*request.args)
+        except Exception as exc:
+            logging.error(f"{task_name} 处理失败 {request.id}: {str(exc)}")
+            return exc
+
+    results = list(_executor.map(safe, requests))
+    failed = 0
+    for request, result in zip(requests, results):
+        if isinstance(result, Exception):
+            failed += 1
+            celery_app.backend.mark_as_failure(request.id, result, request=request)
+        else:
+            celery_app.backend.mark_as_done(request.id, result, request=request)
+
+    duration = time.perf_counter() - start
+    monitor.record_task_batch(task_name, len(requests), duration, failed)
+    logging.info(f"{task_name}: {len(requests)} 条/批，{len(requests) / duration:.1f} 条/秒，失败 {failed}")
+    return results
+
+
+# ------------------------- 边缘检测 -------------------------
+def _edge_one(object_key: str, original_filename: str = None) -> dict:
+    """单张图像：对象存储取回 → 内存解码 → Canny → 内存编码 → 写回对象存储"""
+    result = process_image_bytes(object_store.get_bytes(object_key))
+    result_key = f"{settings.RESULT_PREFIX}/{Path(object_key).stem}_edges.jpg"
+    object_store.put_bytes(result_key, result, content_type="image/jpeg")
+    return {"status": "success", "result_key": result_key}
+
+
+@celery_app.task(
+    base=Batches,
+    name="app.tasks.batch_tasks.edge_detection_batch",
+    flush_every=settings.CELERY_BATCH_SIZE,
+    flush_interval=settings.CELERY_BATCH_INTERVAL
+)
+def edge_detection_batch(requests: List[SimpleRequest]):
+    """批量边缘检测（单条消息参数：object_key, original_filename）"""
+    results = _run_batch("edge_detection_batch", requests, _edge_one)
+
+    records = [
+        {"input_path": request.args[0], "output_path": result["result_key"], "status": "success"}
+        for request, result in zip(requests, results)
+        if not isinstance(result, Exception)
+    ]
+    if records:
+        async def save_records():
+            async with AsyncSessionLocal() as session:
+                return await bulk_create_image_records(session, records)
+
+        try:
+            async_to_sync(save_records)()
+        except Exception as e:
+            logging.error(f"批量写入处理记录失败（{len(records)}条）: {str(e)}")
+
+
+# ------------------------- 性别分类 -------------------------
+def _classify_one(object_key: str) -> dict:
+    result = model_manager.get_model().predict(object_store.get_bytes(object_key))
+    if "error" in result:
+        raise RuntimeError(result["error"])  # predict 内部捕获的异常按失败计
+    return result
+
+
+@celery_app.task(
+    base=Batches,
+    name="app.tasks.batch_tasks.classify_batch",
+    flush_every=settings.CELERY_BATCH_SIZE,
+    flush_interval=settings.CELERY_BATCH_INTERVAL
+)
+def classify_batch(requests: List[SimpleRequest]):
+    """批量性别分类（单条消息参数：object_key）"""
+    if model_manager.current_model is None:
+        model_manager.load_model()  # worker 进程首次使用时加载
+    _run_batch("classify_batch", requests, _classify_one)
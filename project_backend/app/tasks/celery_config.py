@@ -1,5 +1,8 @@
 # app\tasks\celery_config.py
+import logging
+import os
 from celery import Celery
+from celery.signals import worker_init, worker_process_shutdown
 from project_backend.app.config.settings import settings
 
 # ------------------------- 基础配置 -------------------------
@@ -7,22 +10,24 @@ app = Celery(
     "vision_tasks",
     broker=settings.BROKER_URL,
     backend=settings.RESULT_BACKEND,
-    include=["app.tasks.process_tasks"],
+    include=["app.tasks.process_tasks", "app.tasks.batch_tasks", "app.tasks.maintenance", "app.tasks.video_tasks"],
     broker_connection_retry=True
 )
 
 # ------------------------- 高级配置 -------------------------
 app.conf.update(
-    # 序列化配置
-    task_serializer="pickle",
-    result_serializer="pickle",
-    accept_content=["pickle", "json"],
+    # 序列化配置（消息只携带对象存储key等小参数，图像本身经对象存储传递）
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
 
     # 队列路由
     task_routes={
         "app.tasks.process_tasks.edge_detection_task": {
             "queue": "vision_high_priority"
         },
+        "app.tasks.batch_tasks.*": {"queue": "vision_batch"},  # 批量消费，需独立worker
+        "app.tasks.video_tasks.*": {"queue": "vision_video"},  # 离线视频分析，需加载检测模型的独立worker
         "app.tasks.process_tasks.*": {"queue": "vision_default"}
     },
 
@@ -34,7 +39,6 @@ app.conf.update(
     # 性能优化
     worker_prefetch_multiplier=1,  # 公平调度
     worker_max_tasks_per_child=100,  # 防止内存泄漏
-    task_compression="zlib",
 
     # 监控集成
     worker_send_task_events=True,
@@ -46,6 +50,11 @@ app.conf.update(
             "task": "app.tasks.maintenance.clean_temp_files",
             "schedule": 3600.0,  # 每小时执行
             "options": {"queue": "system_maintenance"}
+        },
+        "rotate_frame_partitions": {
+            "task": "app.tasks.maintenance.rotate_frame_partitions",
+            "schedule": 86400.0,  # 每天执行：预建分区并删除过期分区
+            "options": {"queue": "system_maintenance"}
         }
     }
 )
@@ -64,4 +73,23 @@ else:
         worker_concurrency=settings.CELERY_WORKERS * 2,
         broker_connection_max_retries=3,
         result_chord_retry_interval=10
-    )
\ No newline at end of file
+    )
+
+
+# ------------------------- 指标出口 -------------------------
+@worker_init.connect
+def _start_metrics_server(**kwargs):
+    """worker 主进程暴露 /metrics，聚合各 prefork 子进程写入多进程目录的指标"""
+    if not settings.WORKER_METRICS_PORT:
+        return
+    from project_backend.app.config.prometheus import is_multiprocess, start_worker_metrics_server
+    if not is_multiprocess():
+        logging.warning("未设置 PROMETHEUS_MULTIPROC_DIR，prefork 子进程的任务指标不会导出")
+    start_worker_metrics_server(settings.WORKER_METRICS_PORT)
+
+
+@worker_process_shutdown.connect
+def _mark_process_dead(pid=None, **kwargs):
+    """子进程退出时清理其多进程指标文件"""
+    from project_backend.app.config.prometheus import mark_worker_dead
+    mark_worker_dead(pid or os.getpid())
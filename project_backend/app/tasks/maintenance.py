@@ -0,0 +1,17 @@
+# app\tasks\maintenance.py
+from celery import shared_task
+from asgiref.sync import async_to_sync
+from project_backend.app.database.base import async_engine
+from project_backend.app.database.partitions import rotate_partitions
+import logging
+
+@shared_task(name="app.tasks.maintenance.rotate_frame_partitions")
+def rotate_frame_partitions():
+    """帧结果分区保留期维护（整分区删除，不做逐行DELETE）"""
+    async def rotate():
+        async with async_engine.begin() as conn:
+            return await conn.run_sync(rotate_partitions)
+
+    dropped = async_to_sync(rotate)()
+    logging.info(f"帧结果分区维护完成，删除 {len(dropped)} 个过期分区")
+    return {"dropped": dropped}
@@ -1,52 +1,61 @@
 from celery import shared_task
-from project_backend.app.utils.image_utils import process_image
+from project_backend.app.tasks.celery_config import app as celery_app  # 确保 shared_task 绑定到已配置的应用
+from project_backend.app.utils.image_utils import process_image_bytes
 from project_backend.app.database.crud.image import create_image_record
 from project_backend.app.database.base import AsyncSessionLocal
+from project_backend.app.services.frame_archive import export_task_frames
+from project_backend.app.utils.object_store import object_store
+from project_backend.app.config.settings import settings
 from asgiref.sync import async_to_sync
-import tempfile
-import os
 import logging
+import uuid
+from pathlib import Path
 
 @shared_task(bind=True, max_retries=3)
-def edge_detection_task(self, image_data: bytes, original_filename: str):
-    """异步边缘检测任务"""
-    input_path, output_path = None, None
-    try:
-        # 创建临时文件
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp_file:
-            tmp_file.write(image_data)
-            input_path = tmp_file.name
+def edge_detection_task(self, object_key: str, original_filename: str):
+    """
+    异步边缘检测任务
 
-        # 处理图像
-        output_path = process_image(input_path)
+    参数:
+        object_key: API 已上传到对象存储的原图key（消息体只携带引用，不携带图像字节）
+    """
+    try:
+        # 从对象存储取回原图，内存中处理后写回（不落盘）
+        result = process_image_bytes(object_store.get_bytes(object_key))
+        result_key = f"{settings.RESULT_PREFIX}/{Path(object_key).stem}_edges.jpg"
+        object_store.put_bytes(result_key, result, content_type="image/jpeg")
 
         # 数据库记录（异步上下文）
         async def save_record():
             async with AsyncSessionLocal() as session:
-                record = await create_image_record(
+                return await create_image_record(
                     session,
-                    input_path=input_path,
-                    output_path=output_path,
-                    filename=original_filename
+                    input_path=object_key,
+                    output_path=result_key
                 )
-                return record.id
 
         record_id = async_to_sync(save_record)()
 
         return {
             "status": "success",
-            "result_path": output_path,
+            "result_key": result_key,
             "record_id": record_id
         }
 
     except Exception as exc:
         logging.error(f"Edge detection failed: {str(exc)}")
         self.retry(countdown=60 * self.request.retries, exc=exc)
-    finally:
-        # 清理临时文件
-        for path in [input_path, output_path]:
-            if path and os.path.exists(path):
-                try:
-                    os.unlink(path)
-                except Exception as e:
-                    logging.warning(f"清理临时文件失败: {e}")
+
+
+@shared_task(bind=True, max_retries=3)
+def archive_task_frames_task(self, task_id: str):
+    """导出任务帧结果为Parquet并上传对象存储"""
+    try:
+        archive_path = async_to_sync(export_task_frames)(uuid.UUID(task_id))
+        return {
+            "status": "success",
+            "archive_path": archive_path
+        }
+    except Exception as exc:
+        logging.error(f"Frame archive failed: {str(exc)}")
+        self.retry(countdown=60 * (self.request.retries + 1), exc=exc)
@@ -0,0 +1,206 @@
+# app\tasks\video_tasks.py
+"""
+离线视频分析任务
+
+analyze_video 读取视频帧数与帧率，按分段时长切分，各段作为独立任务分发到 vision_video 队列并行处理，
+全部完成后由 finalize_video_job 汇总并将任务标记为 completed（celery chord）：
+
+    analyze_video ─┬─ analyze_video_segment(帧 0 ~ 1500)    ─┐
+                   ├─ analyze_video_segment(帧 1500 ~ 3000) ─┼─ finalize_video_job
+                   └─ ...                                    ─┘
+
+每段：seek 到段起点 → 按步长取帧（间隔小时跳过的帧只 grab 不解码，间隔大时直接 seek）
+→ 攒满 VIDEO_INFER_BATCH 帧批量检测 → 帧结果经 bulk_ingest_frames 批量写入，同一事务内原子累加 Task.progress。
+段任务不自动重试（帧结果与汇总表为增量写入，重跑会重复计数），任一段失败则任务标记为 failed。
+
+worker 单独消费 vision_video 队列（每个进程加载一份检测模型）：
+    celery -A project_backend.app.tasks.celery_config worker -Q vision_video --concurrency=2
+"""
+import logging
+import math
+import os
+import tempfile
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+import cv2
+import numpy as np
+from asgiref.sync import async_to_sync
+from celery import chord
+from project_backend.app.tasks.celery_config import app as celery_app
+from project_backend.app.config.settings import settings
+from project_backend.app.database.base import AsyncSessionLocal, VideoProcessingDAL
+from project_backend.app.database.models.task import TaskStatus
+from project_backend.app.ml_models.model_manager import stream_processor
+from project_backend.app.utils.object_store import object_store
+
+# 可写入帧结果表的标签
+_GENDERS = {"male", "female"}
+# 每处理多少批帧至少更新一次进度（检测结果较少、迟迟攒不满写入批时）
+_PROGRESS_EVERY_BATCHES = 10
+
+
+@contextmanager
+def _local_video(object_key: str) -> Iterator[str]:
+    """对象存储中的视频下载到临时文件（VideoCapture 需可 seek 的本地文件）"""
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(object_key)[1] or ".mp4")
+    os.close(fd)
+    try:
+        object_store.download_file(object_key, path)
+        yield path
+    finally:
+        os.unlink(path)
+
+
+def _probe(path: str) -> Tuple[float, int]:
+    """返回 (帧率, 总帧数)"""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise ValueError("无法打开视频文件")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+    if frame_count <= 0:
+        raise ValueError("无法读取视频帧数")
+    return fps, frame_count
+
+
+def _sample_frames(cap: cv2.VideoCapture, start: int, end: int, stride: int) -> Iterator[Tuple[int, np.ndarray]]:
+    """产出 [start, end) 内按步长采样的 (帧序号, BGR帧)；采样点全局按步长对齐，段间不重不漏"""
+    index = -(-start // stride) * stride
+    cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+    position = index
+    while index < end:
+        if index - position > settings.VIDEO_SEEK_MIN_GAP:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            position = index
+        while position < index:
+            if not cap.grab():
+                return
+            position += 1
+        ok, frame = cap.read()
+        if not ok:
+            return
+        position += 1
+        yield index, frame
+        index += stride
+
+
+def _sample_count(start: int, end: int, stride: int) -> int:
+    first = -(-start // stride) * stride
+    return max(0, math.ceil((end - first) / stride))
+
+
+async def _update_task(task_id: uuid.UUID, **fields):
+    async with AsyncSessionLocal() as session:
+        await VideoProcessingDAL(session).update_task(task_id, **fields)
+
+
+async def _write_frames(task_id: uuid.UUID, rows: list, progress_delta: float):
+    """帧结果批量写入与进度累加（同一事务）"""
+    async with AsyncSessionLocal() as session:
+        dal = VideoProcessingDAL(session)
+        if rows:
+            await dal.bulk_ingest_frames(rows, commit=False)
+        await dal.advance_task_progress(task_id, progress_delta)
+
+
+# ------------------------- 任务入口 -------------------------
+@celery_app.task(name="app.tasks.video_tasks.analyze_video")
+def analyze_video(task_id: str, object_key: str, stride: int, segment_seconds: float):
+    """切分视频并分发各段任务"""
+    task_uuid = uuid.UUID(task_id)
+    try:
+        with _local_video(object_key) as path:
+            fps, frame_count = _probe(path)
+        segment_frames = max(stride, int(segment_seconds * fps))
+        segments = [(start, min(start + segment_frames, frame_count))
+                    for start in range(0, frame_count, segment_frames)]
+        total_samples = _sample_count(0, frame_count, stride)
+
+        async_to_sync(_update_task)(
+            task_uuid, status=TaskStatus.PROCESSING, progress=0.0,
+            result_updates={"fps": fps, "frame_count": frame_count, "stride": stride, "segments": len(segments)}
+        )
+        callback = finalize_video_job.s(task_id).on_error(fail_video_job.si(task_id))
+        chord([
+            analyze_video_segment.s(task_id, object_key, start, end, stride, total_samples)
+            for start, end in segments
+        ])(callback)
+        logging.info(f"视频任务 {task_id}: {frame_count} 帧 @ {fps:.1f}fps，步长 {stride}，分 {len(segments)} 段")
+        return {"segments": len(segments), "samples": total_samples}
+    except Exception as exc:
+        logging.error(f"视频任务 {task_id} 分发失败: {str(exc)}", exc_info=True)
+        async_to_sync(_update_task)(task_uuid, status=TaskStatus.FAILED, result_updates={"error": str(exc)})
+        raise
+
+
+@celery_app.task(name="app.tasks.video_tasks.analyze_video_segment")
+def analyze_video_segment(task_id: str, object_key: str, start: int, end: int,
+                          stride: int, total_samples: int) -> dict:
+    """处理一个时间段：取帧 → 批量检测 → 批量写入"""
+    if not stream_processor.initialized:
+        async_to_sync(stream_processor.initialize)()  # worker 进程首次使用时加载模型
+
+    task_uuid = uuid.UUID(task_id)
+    rows: list = []
+    frames: List[np.ndarray] = []
+    indices: List[int] = []
+    stats = {"start": start, "end": end, "samples": 0, "detections": 0}
+    pending = {"samples": 0, "batches": 0}  # 尚未计入进度的采样帧数/批数
+
+    def flush():
+        async_to_sync(_write_frames)(task_uuid, rows, pending["samples"] / max(total_samples, 1))
+        rows.clear()
+        pending["samples"] = pending["batches"] = 0
+
+    def infer(fps: float):
+        for index, predictions in zip(indices, stream_processor.detect_batch(frames)):
+            for pred in predictions:
+                if pred["label"] in _GENDERS:
+                    rows.append((uuid.uuid4(), task_uuid, index, pred["label"], pred["confidence"], index / fps))
+                    stats["detections"] += 1
+        stats["samples"] += len(frames)
+        pending["samples"] += len(frames)
+        pending["batches"] += 1
+        frames.clear()
+        indices.clear()
+        if len(rows) >= settings.VIDEO_WRITE_BATCH or pending["batches"] >= _PROGRESS_EVERY_BATCHES:
+            flush()
+
+    with _local_video(object_key) as path:
+        cap = cv2.VideoCapture(path)
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+            for index, frame in _sample_frames(cap, start, end, stride):
+                frames.append(frame)
+                indices.append(index)
+                if len(frames) >= settings.VIDEO_INFER_BATCH:
+                    infer(fps)
+            if frames:
+                infer(fps)
+        finally:
+            cap.release()
+    flush()
+    return stats
+
+
+@celery_app.task(name="app.tasks.video_tasks.finalize_video_job")
+def finalize_video_job(segment_stats: List[dict], task_id: str):
+    """全部段完成：汇总并标记任务完成"""
+    summary = {
+        "samples": sum(s["samples"] for s in segment_stats),
+        "detections": sum(s["detections"] for s in segment_stats)
+    }
+    async_to_sync(_update_task)(
+        uuid.UUID(task_id), status=TaskStatus.COMPLETED, progress=1.0, result_updates=summary
+    )
+    return summary
+
+
+@celery_app.task(name="app.tasks.video_tasks.fail_video_job")
+def fail_video_job(task_id: str):
+    """任一段失败：标记任务失败（已写入的帧结果保留）"""
+    async_to_sync(_update_task)(uuid.UUID(task_id), status=TaskStatus.FAILED)
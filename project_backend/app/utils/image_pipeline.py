@@ -0,0 +1,468 @@
+# \app\utils\image_pipeline.py
+"""
+可组合的图像算子流水线
+
+流水线用分号分隔的算子描述，例如（也是 DEFAULT_PIPELINE 的形式）：
+    resize=640x480;gray;blur=5;canny=100,200;encode=jpg,95
+
+支持的算子：
+    resize=WxH | resize=N   缩放到指定尺寸 / 长边缩放到N像素
+    gray | color=rgb|hsv|lab|gray   颜色空间转换（输入为BGR）
+    blur=K                  K×K 高斯模糊（K为奇数）
+    canny=LO,HI             Canny边缘检测
+    autocanny[=SIGMA]       按中值自动取阈值的Canny（默认SIGMA=0.33）
+    sharpen[=AMOUNT]        反锐化掩模锐化（默认AMOUNT=1.0）
+    encode=FMT[,QUALITY]    输出格式 jpg/png/webp 及质量（仅可作为最后一个算子）
+
+中间结果写入线程私有的缓冲池（按形状复用，算子间乒乓交替），避免每个算子都分配新数组。
+执行放在进程级线程池中；OpenCV 内部线程数固定为 OPENCV_THREADS，避免与线程池叠加超订。
+
+大图内存有界：解码前只解析文件头估算峰值内存（含缩放算子的输出），超过 IMAGE_MEMORY_LIMIT_MB 时
+JPEG 降采样解码（1/2、1/4、1/8），其他格式直接拒绝；解码后超过 IMAGE_TILE_THRESHOLD_PIXELS 的图像
+切成带重叠边的分块并行处理再拼接（重叠宽度由各算子的邻域半径累加得到）。
+"""
+import asyncio
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import cv2
+import numpy as np
+from project_backend.app.config.settings import settings
+from project_backend.app.utils.image_probe import probe_image
+
+DEFAULT_PIPELINE = "gray;canny=100,200;encode=jpg,95"
+
+CONTENT_TYPES = {".jpg": "image/jpeg", ".png": "image/png", ".webp": "image/webp"}
+
+# 整图处理时解码结果之外的中间缓冲份数（估算峰值内存用）
+_WHOLE_IMAGE_BUFFERS = 4
+# 分块时每个线程的缓冲份数
+_TILE_BUFFERS = 4
+
+
+class ImageTooLargeError(ValueError):
+    """图像即使降采样解码也会超出内存上限"""
+
+
+# ------------------------- 缓冲池 -------------------------
+class BufferPool:
+    """按 (shape, dtype) 复用中间结果数组（LRU 限制条目数）"""
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._buffers: "OrderedDict[tuple, List[np.ndarray]]" = OrderedDict()
+
+    def get(self, shape, dtype, avoid: Tuple[np.ndarray, ...] = ()) -> np.ndarray:
+        """取一个与 avoid 中数组不重叠的缓冲区（不存在则新建）"""
+        key = (tuple(shape), np.dtype(dtype).str)
+        slots = self._buffers.setdefault(key, [])
+        self._buffers.move_to_end(key)
+        for buf in slots:
+            if not any(np.may_share_memory(buf, a) for a in avoid):
+                return buf
+        buf = np.empty(shape, dtype)
+        slots.append(buf)
+        while len(self._buffers) > self.max_entries:
+            self._buffers.popitem(last=False)
+        return buf
+
+
+_thread_state = threading.local()
+
+
+def _buffer_pool() -> BufferPool:
+    pool = getattr(_thread_state, "pool", None)
+    if pool is None:
+        pool = _thread_state.pool = BufferPool()
+    return pool
+
+
+# ------------------------- 算子 -------------------------
+# 逐像素/邻域算子带 halo 属性（输出每个像素依赖的输入邻域半径），可分块执行；
+# 无 halo 的算子（resize）只能整图执行。
+Operator = Callable[[np.ndarray, BufferPool], np.ndarray]
+
+
+def _with_halo(op: Operator, halo: int) -> Operator:
+    op.halo = halo
+    return op
+
+
+def _resize(arg: str) -> Operator:
+    # 参数来自请求，解析时即限制输出尺寸（输出像素数不超过 MAX_IMAGE_PIXELS）
+    if "x" in arg:
+        w, h = (int(v) for v in arg.lower().split("x"))
+        if w <= 0 or h <= 0 or w * h > settings.MAX_IMAGE_PIXELS:
+            raise ValueError(f"resize 尺寸须为正且不超过 {settings.MAX_IMAGE_PIXELS} 像素")
+        size_of = lambda width, height: (w, h)
+    else:
+        longest = int(arg)
+        if longest <= 0 or longest * longest > settings.MAX_IMAGE_PIXELS:
+            raise ValueError(f"resize 长边须为正且不超过 {math.isqrt(settings.MAX_IMAGE_PIXELS)} 像素")
+
+        def size_of(width, height):
+            scale = longest / max(width, height)
+            return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def op(src, pool):
+        w, h = size_of(src.shape[1], src.shape[0])
+        if (w, h) == (src.shape[1], src.shape[0]):
+            return src
+        dst = pool.get((h, w) + src.shape[2:], src.dtype, (src,))
+        interpolation = cv2.INTER_AREA if w < src.shape[1] else cv2.INTER_LINEAR
+        return cv2.resize(src, (w, h), dst=dst, interpolation=interpolation)
+    op.size_of = size_of  # 输出尺寸（估算峰值内存用）
+    return op
+
+
+_COLOR_CODES = {
+    "gray": (cv2.COLOR_BGR2GRAY, 1),
+    "rgb": (cv2.COLOR_BGR2RGB, 3),
+    "hsv": (cv2.COLOR_BGR2HSV, 3),
+    "lab": (cv2.COLOR_BGR2LAB, 3),
+}
+
+
+def _color(arg: str) -> Operator:
+    if arg not in _COLOR_CODES:
+        raise ValueError(f"不支持的颜色空间: {arg}")
+    code, channels = _COLOR_CODES[arg]
+
+    def op(src, pool):
+        if src.ndim == 2:
+            if channels == 1:
+                return src
+            raise ValueError(f"单通道图像无法转换为 {arg}")
+        shape = src.shape[:2] if channels == 1 else src.shape[:2] + (channels,)
+        return cv2.cvtColor(src, code, dst=pool.get(shape, src.dtype, (src,)))
+    return _with_halo(op, 0)
+
+
+def _to_gray(src, pool):
+    """Canny 等算子需要单通道输入"""
+    if src.ndim == 2:
+        return src
+    return cv2.cvtColor(src, cv2.COLOR_BGR2GRAY, dst=pool.get(src.shape[:2], src.dtype, (src,)))
+
+
+def _blur(arg: str) -> Operator:
+    k = int(arg)
+    if k <= 0 or k % 2 == 0:
+        raise ValueError("blur 核大小须为正奇数")
+
+    def op(src, pool):
+        return cv2.GaussianBlur(src, (k, k), 0, dst=pool.get(src.shape, src.dtype, (src,)))
+    return _with_halo(op, k // 2)
+
+
+# Canny：3×3 Sobel + 非极大值抑制 + 滞后阈值连接，取较宽的邻域
+_CANNY_HALO = 4
+
+
+def _fixed_canny(low: float, high: float) -> Operator:
+    def op(src, pool):
+        gray = _to_gray(src, pool)
+        return cv2.Canny(gray, low, high, edges=pool.get(gray.shape, np.uint8, (src, gray)))
+    return _with_halo(op, _CANNY_HALO)
+
+
+def _canny(arg: str) -> Operator:
+    low, high = (float(v) for v in arg.split(","))
+    return _fixed_canny(low, high)
+
+
+def _auto_thresholds(image: np.ndarray, sigma: float) -> Tuple[float, float]:
+    median = float(np.median(image))
+    return max(0.0, (1.0 - sigma) * median), min(255.0, (1.0 + sigma) * median)
+
+
+def _autocanny(arg: str) -> Operator:
+    sigma = float(arg) if arg else 0.33
+
+    def op(src, pool):
+        gray = _to_gray(src, pool)
+        low, high = _auto_thresholds(gray, sigma)
+        return cv2.Canny(gray, low, high, edges=pool.get(gray.shape, np.uint8, (src, gray)))
+
+    # 分块执行时阈值须取自整图：用缩略图上的中值固定阈值
+    op.bind = lambda sample: _fixed_canny(*_auto_thresholds(_to_gray(sample, BufferPool()), sigma))
+    return _with_halo(op, _CANNY_HALO)
+
+
+def _sharpen(arg: str) -> Operator:
+    amount = float(arg) if arg else 1.0
+
+    def op(src, pool):
+        blurred = cv2.GaussianBlur(src, (0, 0), 3, dst=pool.get(src.shape, src.dtype, (src,)))
+        dst = pool.get(src.shape, src.dtype, (src, blurred))
+        return cv2.addWeighted(src, 1.0 + amount, blurred, -amount, 0, dst=dst)
+    return _with_halo(op, 10)  # sigma=3 的高斯核半径
+
+
+OPERATORS: Dict[str, Callable[[str], Operator]] = {
+    "resize": _resize,
+    "color": _color,
+    "gray": lambda arg: _color("gray"),
+    "blur": _blur,
+    "canny": _canny,
+    "autocanny": _autocanny,
+    "sharpen": _sharpen,
+}
+
+
+# ------------------------- 流水线 -------------------------
+@dataclass(frozen=True)
+class ImagePipeline:
+    operators: Tuple[Operator, ...]
+    ext: str = ".jpg"
+    encode_params: Tuple[int, ...] = field(default=(int(cv2.IMWRITE_JPEG_QUALITY), 95))
+
+    @property
+    def content_type(self) -> str:
+        return CONTENT_TYPES[self.ext]
+
+    def apply(self, image: np.ndarray) -> np.ndarray:
+        """依次执行算子（返回值可能是缓冲池中的数组，需在同一线程内用完）"""
+        pool = _buffer_pool()
+        for op in self.operators:
+            image = op(image, pool)
+        return image
+
+    def encode(self, image: np.ndarray) -> bytes:
+        success, buffer = cv2.imencode(self.ext, image, list(self.encode_params))
+        if not success:
+            raise RuntimeError("图像编码失败")
+        return buffer.tobytes()
+
+    def estimate_peak_bytes(self, width: int, height: int, channels: int = 3) -> int:
+        """
+        估算整条流水线的峰值内存
+
+        缩放算子整图执行，输出尺寸可能远大于输入（resize=WxH 放大）：
+        每次缩放后的处理与原始解码结果同时驻留，按两者之和计
+        """
+        decoded = width * height * channels
+        peak = estimate_peak_bytes(width, height, channels)
+        for op in self.operators:
+            size_of = getattr(op, "size_of", None)
+            if size_of is not None:
+                width, height = size_of(width, height)
+                peak = max(peak, decoded + estimate_peak_bytes(width, height, channels))
+        return peak
+
+    def run(self, image: Union[bytes, np.ndarray]) -> bytes:
+        """解码（如需）→ 算子（大图分块）→ 编码"""
+        if not isinstance(image, np.ndarray):
+            image = decode_bounded(image, self)
+        elif self.estimate_peak_bytes(image.shape[1], image.shape[0]) > settings.IMAGE_MEMORY_LIMIT_MB * 1024 * 1024:
+            raise ImageTooLargeError(f"图像 {image.shape[1]}x{image.shape[0]} 处理后超出内存上限")
+        if _needs_tiling(image.shape[1], image.shape[0]) and self._split_global() is not None:
+            return self.encode(self.apply_tiled(image))
+        return self.encode(self.apply(image))
+
+    # ----------------- 分块执行 -----------------
+    def _split_global(self) -> Optional[Tuple[Tuple[Operator, ...], Tuple[Operator, ...]]]:
+        """拆分为前导整图算子（resize）与可分块算子；可分块算子之后仍有整图算子时返回 None"""
+        i = 0
+        while i < len(self.operators) and not hasattr(self.operators[i], "halo"):
+            i += 1
+        prefix, rest = self.operators[:i], self.operators[i:]
+        if any(not hasattr(op, "halo") for op in rest):
+            return None
+        return prefix, rest
+
+    def apply_tiled(self, image: np.ndarray) -> np.ndarray:
+        """前导整图算子后，按重叠分块并行执行其余算子并拼接"""
+        prefix, rest = self._split_global()
+        pool = _buffer_pool()
+        for op in prefix:
+            image = op(image, pool)
+        if not _needs_tiling(image.shape[1], image.shape[0]):  # 前导缩放后已足够小
+            for op in rest:
+                image = op(image, pool)
+            return image
+
+        rest = _bind_global(rest, image)
+        halo = sum(op.halo for op in rest)
+        tile = settings.IMAGE_TILE_SIZE
+        height, width = image.shape[:2]
+        origins = [(y, x) for y in range(0, height, tile) for x in range(0, width, tile)]
+
+        def process(y: int, x: int) -> np.ndarray:
+            y0, x0 = max(0, y - halo), max(0, x - halo)
+            y1, x1 = min(height, y + tile + halo), min(width, x + tile + halo)
+            result = image[y0:y1, x0:x1]
+            tile_pool = _buffer_pool()
+            for op in rest:
+                result = op(result, tile_pool)
+            return result[y - y0:y - y0 + min(tile, height - y), x - x0:x - x0 + min(tile, width - x)]
+
+        # 分块全部在分块线程池执行（不与当前线程的缓冲池混用）；
+        # 首块先行以确定输出通道与类型（在分块线程内复制出缓冲池，防止被其他请求的分块覆盖），
+        # 其余块直接写入输出的互不重叠区域
+        executor = _get_tile_executor()
+        first = executor.submit(lambda: process(*origins[0]).copy()).result()
+        out = np.empty((height, width) + first.shape[2:], first.dtype)
+        out[:first.shape[0], :first.shape[1]] = first
+
+        def fill(origin):
+            y, x = origin
+            core = process(y, x)
+            out[y:y + core.shape[0], x:x + core.shape[1]] = core
+
+        list(executor.map(fill, origins[1:]))
+        return out
+
+
+def _bind_global(operators: Tuple[Operator, ...], image: np.ndarray) -> Tuple[Operator, ...]:
+    """依赖整图统计量的算子（autocanny）在缩略图上求值后固定参数"""
+    if not any(hasattr(op, "bind") for op in operators):
+        return operators
+    scale = min(1.0, 1024 / max(image.shape[:2]))
+    sample = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    pool = BufferPool()
+    bound = []
+    for op in operators:
+        if hasattr(op, "bind"):
+            op = op.bind(sample)
+        bound.append(op)
+        sample = op(sample, pool)
+    return tuple(bound)
+
+
+# ------------------------- 有界解码 -------------------------
+def _needs_tiling(width: int, height: int) -> bool:
+    return width * height > settings.IMAGE_TILE_THRESHOLD_PIXELS
+
+
+def estimate_peak_bytes(width: int, height: int, channels: int = 3) -> int:
+    """估算处理一张图像的峰值内存（解码结果 + 中间缓冲/分块工作集）"""
+    decoded = width * height * channels
+    if not _needs_tiling(width, height):
+        return decoded * (1 + _WHOLE_IMAGE_BUFFERS)
+    tile = settings.IMAGE_TILE_SIZE + 64  # 含重叠边
+    working_set = (settings.IMAGE_TILE_WORKERS + 1) * tile * tile * channels * _TILE_BUFFERS
+    return decoded * 2 + working_set  # 解码结果 + 拼接输出 + 各线程分块缓冲
+
+
+_REDUCED_FLAGS = (
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+)
+
+
+def decode_bounded(data: bytes, pipeline: Optional[ImagePipeline] = None) -> np.ndarray:
+    """
+    内存有界的解码：先解析文件头估算峰值内存，超限时 JPEG 按 DCT 缩放降采样解码
+
+    参数:
+        pipeline: 随后执行的流水线，估算时计入其缩放算子的输出尺寸
+
+    异常:
+        ImageTooLargeError: 降采样后仍超出 IMAGE_MEMORY_LIMIT_MB（或非JPEG超限）
+        ValueError: 文件头无法解析或解码失败
+    """
+    info = probe_image(data)
+    if info is None:
+        raise ValueError("图像数据不完整")
+    limit = settings.IMAGE_MEMORY_LIMIT_MB * 1024 * 1024
+    estimate = pipeline.estimate_peak_bytes if pipeline is not None else estimate_peak_bytes
+
+    flags = cv2.IMREAD_COLOR
+    if estimate(info.width, info.height) > limit:
+        if info.format != "jpeg":
+            raise ImageTooLargeError(f"图像 {info.width}x{info.height} 处理后超出内存上限")
+        for factor, reduced in _REDUCED_FLAGS:
+            if estimate(math.ceil(info.width / factor), math.ceil(info.height / factor)) <= limit:
+                flags = reduced
+                break
+        else:
+            raise ImageTooLargeError(f"图像 {info.width}x{info.height} 按流水线处理即使1/8解码仍超出内存上限")
+
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), flags)
+    if image is None:
+        raise ValueError("无法解码图像数据")
+    return image
+
+
+def _encode_spec(arg: str) -> Tuple[str, Tuple[int, ...]]:
+    fmt, _, quality = arg.partition(",")
+    ext = "." + fmt.lower().replace("jpeg", "jpg")
+    if ext == ".jpg":
+        return ext, (int(cv2.IMWRITE_JPEG_QUALITY), int(quality or 95))
+    if ext == ".webp":
+        return ext, (int(cv2.IMWRITE_WEBP_QUALITY), int(quality or 90))
+    if ext == ".png":
+        return ext, (int(cv2.IMWRITE_PNG_COMPRESSION), int(quality or 3))
+    raise ValueError(f"不支持的输出格式: {fmt}")
+
+
+@lru_cache(maxsize=128)
+def parse_pipeline(spec: str) -> ImagePipeline:
+    """解析流水线描述（相同描述复用同一流水线对象）；格式错误抛出 ValueError"""
+    operators: List[Operator] = []
+    ext, encode_params = ".jpg", (int(cv2.IMWRITE_JPEG_QUALITY), 95)
+    steps = [s.strip() for s in spec.split(";") if s.strip()]
+    for i, step in enumerate(steps):
+        name, _, arg = step.partition("=")
+        name = name.strip().lower()
+        try:
+            if name == "encode":
+                if i != len(steps) - 1:
+                    raise ValueError("encode 只能作为最后一个算子")
+                ext, encode_params = _encode_spec(arg)
+            elif name in OPERATORS:
+                operators.append(OPERATORS[name](arg.strip()))
+            else:
+                raise ValueError(f"未知算子: {name}")
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"算子 '{step}' 无效: {e}") from e
+    return ImagePipeline(tuple(operators), ext, encode_params)
+
+
+# ------------------------- 执行器 -------------------------
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """进程级图像处理线程池（首次使用时创建，并固定OpenCV内部线程数）"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                cv2.setNumThreads(settings.OPENCV_THREADS)
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_WORKERS,
+                    thread_name_prefix="image-pipeline"
+                )
+    return _executor
+
+
+_tile_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_tile_executor() -> ThreadPoolExecutor:
+    """分块专用线程池（与请求级线程池分开，避免请求线程等待自身所在池而死锁）"""
+    global _tile_executor
+    if _tile_executor is None:
+        with _executor_lock:
+            if _tile_executor is None:
+                _tile_executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_TILE_WORKERS,
+                    thread_name_prefix="image-tile"
+                )
+    return _tile_executor
+
+
+async def run_pipeline(image: Union[bytes, np.ndarray], spec: str = DEFAULT_PIPELINE) -> Tuple[bytes, str]:
+    """在图像处理线程池中执行流水线，返回 (编码结果, Content-Type)"""
+    pipeline = parse_pipeline(spec)
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(get_executor(), pipeline.run, image)
+    return result, pipeline.content_type
@@ -0,0 +1,106 @@
+# \app\utils\image_probe.py
+"""
+仅解析文件头获取图像格式与尺寸（不解码像素）
+
+用于在完整解码前估算内存占用：拒绝解压炸弹、决定是否降采样解码或分块处理。
+支持 JPEG / PNG / WebP（与 settings.ALLOWED_IMAGE_TYPES 一致）。
+"""
+import struct
+from dataclasses import dataclass
+from typing import Optional
+
+# 不带长度字段的独立标记（RSTn / SOI / EOI / TEM）
+_JPEG_STANDALONE = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8, 0xD9}
+# 帧头标记（SOFn，不含 DHT/JPG/DAC）
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    format: str  # jpeg / png / webp
+    width: int
+    height: int
+    channels: int = 3
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+    @property
+    def decoded_bytes(self) -> int:
+        """按 8 位 BGR 解码后的数组大小"""
+        return self.pixels * 3
+
+
+def probe_image(header: bytes) -> Optional[ImageInfo]:
+    """
+    从文件头解析格式与尺寸
+
+    返回:
+        ImageInfo；数据不足以定位尺寸字段时返回 None（调用方可读取更多字节后重试）
+    异常:
+        ValueError: 非支持的图像格式或文件头损坏
+    """
+    if header[:3] == b"\xff\xd8\xff":
+        return _probe_jpeg(header)
+    if header[:8] == b"\x89PNG\r\n\x1a\n":
+        if len(header) < 24:
+            return None
+        if header[12:16] != b"IHDR":
+            raise ValueError("PNG文件头损坏")
+        width, height = struct.unpack(">II", header[16:24])
+        return _checked(ImageInfo("png", width, height))
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return _probe_webp(header)
+    if len(header) < 12:
+        return None
+    raise ValueError("不支持的图像格式")
+
+
+def _checked(info: ImageInfo) -> ImageInfo:
+    if info.width <= 0 or info.height <= 0:
+        raise ValueError("图像尺寸无效")
+    return info
+
+
+def _probe_jpeg(data: bytes) -> Optional[ImageInfo]:
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            raise ValueError("JPEG文件头损坏")
+        marker = data[pos + 1]
+        if marker == 0xFF:  # 填充字节
+            pos += 1
+            continue
+        if marker in _JPEG_STANDALONE:
+            pos += 2
+            continue
+        if marker in _JPEG_SOF:
+            if pos + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[pos + 5:pos + 9])
+            return _checked(ImageInfo("jpeg", width, height))
+        if marker == 0xDA:  # SOS 之前未出现帧头
+            raise ValueError("JPEG缺少帧头")
+        (length,) = struct.unpack(">H", data[pos + 2:pos + 4])
+        pos += 2 + length
+    return None
+
+
+def _probe_webp(data: bytes) -> Optional[ImageInfo]:
+    if len(data) < 30:
+        return None
+    chunk = data[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", data[26:30])
+        return _checked(ImageInfo("webp", width & 0x3FFF, height & 0x3FFF))
+    if chunk == b"VP8L":
+        b0, b1, b2, b3 = data[21:25]
+        width = 1 + (b0 | ((b1 & 0x3F) << 8))
+        height = 1 + ((b1 >> 6) | (b2 << 2) | ((b3 & 0x0F) << 10))
+        return _checked(ImageInfo("webp", width, height))
+    if chunk == b"VP8X":
+        width = 1 + int.from_bytes(data[24:27], "little")
+        height = 1 + int.from_bytes(data[27:30], "little")
+        return _checked(ImageInfo("webp", width, height))
+    raise ValueError("WebP文件头损坏")
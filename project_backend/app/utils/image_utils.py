@@ -1,12 +1,47 @@
 # \app\utils\image_utils.py
 import cv2
+import numpy as np
 import tempfile
 import os
 from pathlib import Path
 import logging
+from typing import Optional, Tuple, Union
+from project_backend.app.utils.image_pipeline import DEFAULT_PIPELINE, parse_pipeline
 
-def process_image(input_path: str) -> str:
-    """处理图像并返回输出文件路径"""
+def decode_image(data: bytes) -> np.ndarray:
+    """内存解码图像（不落盘）"""
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("无法解码图像数据")
+    return image
+
+def detect_edges(image: np.ndarray) -> np.ndarray:
+    """Canny边缘检测"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return cv2.Canny(gray, 100, 200)
+
+def encode_image(image: np.ndarray, ext: str = ".jpg", quality: int = 95) -> bytes:
+    """内存编码图像"""
+    success, buffer = cv2.imencode(ext, image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    if not success:
+        raise RuntimeError("图像编码失败")
+    return buffer.tobytes()
+
+def _with_target_size(spec: str, target_size: Optional[Tuple[int, int]]) -> str:
+    """target_size 为 (高度, 宽度)，与 settings.MODEL_INPUT_SIZE 一致"""
+    if not target_size:
+        return spec
+    height, width = target_size
+    return f"resize={width}x{height};{spec}"
+
+def process_image_bytes(image: Union[bytes, np.ndarray], spec: str = DEFAULT_PIPELINE,
+                        target_size: Optional[Tuple[int, int]] = None) -> bytes:
+    """内存版图像处理：输入编码后的图像字节或已解码数组，按流水线描述处理后返回编码结果（不落盘）"""
+    return parse_pipeline(_with_target_size(spec, target_size)).run(image)
+
+def process_image(input_path: str, target_size: Optional[Tuple[int, int]] = None,
+                  spec: str = DEFAULT_PIPELINE) -> str:
+    """处理图像并返回输出文件路径（输出格式由流水线 encode 算子决定）"""
     output_path = None
     try:
         # 验证输入文件
@@ -22,21 +57,13 @@ def process_image(input_path: str) -> str:
             raise ValueError(f"无法解码图像文件: {input_path}")
 
         # 图像处理
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 100, 200)
-
-        # 创建临时文件
-        fd, output_path = tempfile.mkstemp(suffix=".jpg")
-        os.close(fd)  # 立即关闭描述符
-
-        # 保存结果并验证
-        success = cv2.imwrite(
-            output_path,
-            edges,
-            [int(cv2.IMWRITE_JPEG_QUALITY), 95]
-        )
-        if not success or not Path(output_path).exists():
-            raise RuntimeError("图像保存失败")
+        pipeline = parse_pipeline(_with_target_size(spec, target_size))
+        result = pipeline.encode(pipeline.apply(image))
+
+        # 创建临时文件并保存结果
+        fd, output_path = tempfile.mkstemp(suffix=pipeline.ext)
+        with os.fdopen(fd, "wb") as f:
+            f.write(result)
 
         return output_path
 
@@ -3,11 +3,144 @@ from prometheus_client import (
     Gauge,
     Counter,
     Histogram,
-    start_http_server,
-    CollectorRegistry
+    REGISTRY
 )
-from typing import Literal
+from prometheus_client.core import GaugeMetricFamily, HistogramMetricFamily
+from collections import OrderedDict
+from typing import Dict, List, Literal, Optional
 from threading import Lock
+import time
+
+from project_backend.app.config.settings import settings
+
+
+class ClientStatsTable:
+    """
+    进程内客户端统计表（替代以client_id为标签的时间序列）
+
+    特性：
+    - 条目数上限（超出时淘汰最久未活跃的客户端）
+    - 断开连接时显式移除
+    - 按需导出完整表（调试接口）或Top-K（Prometheus）
+    """
+
+    def __init__(self, max_clients: int):
+        self.max_clients = max_clients
+        self._rows: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = Lock()
+
+    def _row(self, client_id: str) -> dict:
+        row = self._rows.get(client_id)
+        if row is None:
+            now = time.time()
+            row = self._rows[client_id] = {
+                "tier": "default",
+                "bytes_in": 0,
+                "bytes_out": 0,
+                "quality_changes": 0,
+                "frames": 0,
+                "frames_unchanged": 0,
+                "first_seen": now,
+                "last_seen": now,
+            }
+            while len(self._rows) > self.max_clients:
+                self._rows.popitem(last=False)
+        else:
+            self._rows.move_to_end(client_id)
+        return row
+
+    def add_bytes(self, client_id: str, nbytes: int, direction: str):
+        with self._lock:
+            row = self._row(client_id)
+            row[f"bytes_{direction}"] += nbytes
+            row["last_seen"] = time.time()
+
+    def add_quality_change(self, client_id: str):
+        with self._lock:
+            self._row(client_id)["quality_changes"] += 1
+
+    def add_frame(self, client_id: str, unchanged: bool):
+        with self._lock:
+            row = self._row(client_id)
+            row["frames"] += 1
+            row["frames_unchanged"] += unchanged
+
+    def set_tier(self, client_id: str, tier: str):
+        with self._lock:
+            self._row(client_id)["tier"] = tier
+
+    def remove(self, client_id: str):
+        with self._lock:
+            self._rows.pop(client_id, None)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """复制当前全表（附带平均速率 bit/s 与画面静止跳帧比例）"""
+        now = time.time()
+        with self._lock:
+            rows = {cid: dict(row) for cid, row in self._rows.items()}
+        for row in rows.values():
+            elapsed = max(now - row["first_seen"], 1.0)
+            row["rate_bps"] = (row["bytes_in"] + row["bytes_out"]) * 8 / elapsed
+            row["skip_ratio"] = row["frames_unchanged"] / row["frames"] if row["frames"] else 0.0
+        return rows
+
+
+class ClientStatsCollector:
+    """
+    抓取时从统计表生成有界指标：Top-K客户端速率 + 按档位的速率/跳帧比例直方图
+
+    worker 非空时每个序列附加 worker 标签（多进程模式下统计表只反映处理本次抓取的进程）
+    """
+
+    RATE_BUCKETS = (0.25e6, 0.5e6, 1e6, 2e6, 4e6, 8e6, 16e6)
+    SKIP_BUCKETS = (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+    def __init__(self, table: ClientStatsTable, worker: Optional[str] = None):
+        self.table = table
+        self.extra_labels = ['worker'] if worker else []
+        self.extra_values = [worker] if worker else []
+
+    def collect(self):
+        rows = self.table.snapshot()
+
+        top = GaugeMetricFamily(
+            'video_top_client_bandwidth_bps',
+            f'带宽占用最高的{settings.METRICS_TOP_K_CLIENTS}个客户端平均速率',
+            labels=['client_id'] + self.extra_labels
+        )
+        ranked = sorted(rows.items(), key=lambda item: item[1]["rate_bps"], reverse=True)
+        for client_id, row in ranked[:settings.METRICS_TOP_K_CLIENTS]:
+            top.add_metric([client_id] + self.extra_values, row["rate_bps"])
+        yield top
+
+        by_tier: Dict[str, List[float]] = {}
+        for row in rows.values():
+            by_tier.setdefault(row["tier"], []).append(row["rate_bps"])
+        hist = HistogramMetricFamily(
+            'video_client_bandwidth_bps',
+            '客户端平均速率分布（按质量档位）',
+            labels=['tier'] + self.extra_labels
+        )
+        for tier, rates in by_tier.items():
+            buckets = [(str(b), sum(1 for r in rates if r <= b)) for b in self.RATE_BUCKETS]
+            buckets.append(('+Inf', len(rates)))
+            hist.add_metric([tier] + self.extra_values, buckets, sum_value=sum(rates))
+        yield hist
+
+        skip_by_tier: Dict[str, List[float]] = {}
+        for row in rows.values():
+            if row["frames"]:
+                skip_by_tier.setdefault(row["tier"], []).append(row["skip_ratio"])
+        skip_hist = HistogramMetricFamily(
+            'video_client_scene_skip_ratio',
+            '各视频流画面静止跳帧比例分布（按质量档位，单流数值见客户端统计表）',
+            labels=['tier'] + self.extra_labels
+        )
+        for tier, ratios in skip_by_tier.items():
+            buckets = [(str(b), sum(1 for r in ratios if r <= b)) for b in self.SKIP_BUCKETS]
+            buckets.append(('+Inf', len(ratios)))
+            skip_hist.add_metric([tier] + self.extra_values, buckets, sum_value=sum(ratios))
+        yield skip_hist
 
 
 class PrometheusMonitor:
@@ -17,29 +150,26 @@ class PrometheusMonitor:
     特性：
     1. 线程安全：所有指标操作原子化
     2. 单例模式：全局唯一实例
-    3. 动态端口：支持运行时端口切换
+    3. 统一出口：注册在默认注册表，由应用 /metrics 端点导出（见 config/prometheus.py）
     """
     _instance = None
     _lock = Lock()
-    _server_started = False
 
-    def __new__(cls, port: int = 8001):
+    def __new__(cls):
         """单例模式实现"""
         if cls._instance is None:
             with cls._lock:
                 if cls._instance is None:
                     cls._instance = super().__new__(cls)
-                    cls._instance._init_metrics(port)
+                    cls._instance._init_metrics()
         return cls._instance
 
-    def _init_metrics(self, port: int):
-        """初始化指标和HTTP服务"""
-        self.registry = CollectorRegistry()
+    def _init_metrics(self):
+        """初始化指标"""
+        self.registry = REGISTRY
+        self.client_stats = ClientStatsTable(settings.METRICS_MAX_CLIENTS)
         self._define_metrics()
-
-        if not self.__class__._server_started:
-            start_http_server(port, registry=self.registry)
-            self.__class__._server_started = True
+        self.registry.register(ClientStatsCollector(self.client_stats))
 
     def _define_metrics(self):
         """定义所有监控指标"""
@@ -48,6 +178,15 @@ class PrometheusMonitor:
             'video_active_connections',
             '当前活跃视频流连接数',
             ['protocol'],
+            multiprocess_mode='livesum',
+            registry=self.registry
+        )
+
+        self.connection_duration = Histogram(
+            'video_connection_duration_seconds',
+            '视频流连接持续时长分布',
+            ['client_type'],
+            buckets=(1, 10, 30, 60, 300, 900, 3600, '+Inf'),
             registry=self.registry
         )
 
@@ -69,10 +208,11 @@ class PrometheusMonitor:
         )
 
         # ----------------- 带宽指标 -----------------
-        self.bandwidth_usage = Gauge(
-            'video_bandwidth_usage_bytes',
-            '实时带宽使用量',
-            ['client_id', 'direction'],
+        # 客户端维度不作为标签，见 ClientStatsTable / ClientStatsCollector
+        self.bandwidth_usage = Counter(
+            'video_bandwidth_bytes',
+            '累计传输字节数',
+            ['direction'],
             registry=self.registry
         )
 
@@ -80,7 +220,123 @@ class PrometheusMonitor:
         self.quality_changes = Counter(
             'video_quality_adjustments_total',
             '视频质量调整事件',
-            ['client_id', 'action', 'reason'],
+            ['action', 'reason'],
+            registry=self.registry
+        )
+
+        # ----------------- 过载保护指标 -----------------
+        self.inference_queue_depth = Gauge(
+            'video_inference_queue_depth',
+            '推理执行器排队+执行中任务数',
+            multiprocess_mode='livesum',
+            registry=self.registry
+        )
+
+        self.overload_degraded_clients = Gauge(
+            'video_overload_degraded_clients',
+            '因系统过载被强制降级的客户端数',
+            multiprocess_mode='livesum',
+            registry=self.registry
+        )
+
+        # ----------------- 结果持久化指标 -----------------
+        self.result_flush_latency = Histogram(
+            'frame_result_flush_latency_seconds',
+            '帧结果批量写入耗时',
+            buckets=(0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, '+Inf'),
+            registry=self.registry
+        )
+
+        self.result_rows_written = Counter(
+            'frame_result_rows_written_total',
+            '已写入数据库的帧结果行数',
+            registry=self.registry
+        )
+
+        self.result_backlog = Gauge(
+            'frame_result_backlog_rows',
+            '等待写入的帧结果行数',
+            multiprocess_mode='livesum',
+            registry=self.registry
+        )
+
+        self.result_overflow = Counter(
+            'frame_result_overflow_rows_total',
+            '缓冲溢出的帧结果行数',
+            ['policy'],
+            registry=self.registry
+        )
+
+        # ----------------- 数据库连接池指标 -----------------
+        self.db_pool_checkout_latency = Histogram(
+            'db_pool_checkout_latency_seconds',
+            'get_db 会话获取连接的耗时（含池满排队，池未满时含新建连接）',
+            buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, '+Inf'),
+            registry=self.registry
+        )
+
+        self.db_pool_in_use = Gauge(
+            'db_pool_connections_in_use',
+            '已借出的数据库连接数',
+            multiprocess_mode='livesum',
+            registry=self.registry
+        )
+
+        self.db_pool_overflow = Gauge(
+            'db_pool_overflow_connections',
+            '超出常驻连接数的溢出连接数',
+            multiprocess_mode='livesum',
+            registry=self.registry
+        )
+
+        self.db_pool_connects = Counter(
+            'db_pool_connects_total',
+            '新建的数据库物理连接数',
+            registry=self.registry
+        )
+
+        # ----------------- Celery批量任务指标 -----------------
+        self.task_batch_size = Histogram(
+            'celery_task_batch_size',
+            '批量任务单次处理的消息数',
+            ['task'],
+            buckets=(1, 2, 4, 8, 16, 32, 64, '+Inf'),
+            registry=self.registry
+        )
+
+        self.task_batch_duration = Histogram(
+            'celery_task_batch_duration_seconds',
+            '批量任务单次处理耗时',
+            ['task'],
+            buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, '+Inf'),
+            registry=self.registry
+        )
+
+        self.task_batch_items = Counter(
+            'celery_task_batch_items_total',
+            '批量任务处理的消息数（吞吐=rate）',
+            ['task', 'status'],
+            registry=self.registry
+        )
+
+        self.inference_requests = Counter(
+            'inference_requests_total',
+            '同步推理接口请求数（executed=实际推理，coalesced=合并到在途推理，rejected=超出并发上限）',
+            ['route', 'outcome'],
+            registry=self.registry
+        )
+
+        self.stream_frames = Counter(
+            'video_stream_frames_total',
+            '视频流处理帧数（detect=运行检测，track=跟踪外推，unchanged=画面静止复用上一帧）',
+            ['mode'],
+            registry=self.registry
+        )
+
+        self.stream_messages = Counter(
+            'video_stream_messages_total',
+            '视频流结果消息数（full/delta=增量模式下发，suppressed=无变化未发送，legacy=逐帧全量）',
+            ['type'],
             registry=self.registry
         )
 
@@ -95,6 +351,12 @@ class PrometheusMonitor:
         with self._lock:
             self.active_connections.labels(protocol=protocol).dec()
 
+    def record_connection_duration(self, duration: float, client_type: str):
+        """记录连接持续时长（normal=正常关闭，stale=心跳超时）"""
+        self.connection_duration.labels(
+            client_type=client_type
+        ).observe(duration)
+
     def record_limiter_decision(self, limiter_type: str, allowed: bool):
         """记录限流器决策结果"""
         action = "allowed" if allowed else "denied"
@@ -105,10 +367,8 @@ class PrometheusMonitor:
 
     def record_bandwidth(self, client_id: str, bytes: int, direction: Literal['in', 'out']):
         """记录带宽使用（输入/输出）"""
-        self.bandwidth_usage.labels(
-            client_id=client_id,
-            direction=direction
-        ).set(bytes)
+        self.bandwidth_usage.labels(direction=direction).inc(bytes)
+        self.client_stats.add_bytes(client_id, bytes, direction)
 
     def record_processing_latency(self, phase: str, latency_seconds: float):
         """记录处理延迟"""
@@ -119,11 +379,71 @@ class PrometheusMonitor:
     def record_quality_change(self, client_id: str, action: str, reason: str):
         """记录质量调整事件"""
         self.quality_changes.labels(
-            client_id=client_id,
             action=action,
             reason=reason
         ).inc()
+        self.client_stats.add_quality_change(client_id)
+
+    def record_result_flush(self, latency_seconds: float, rows: int):
+        """记录一次帧结果批量写入"""
+        self.result_flush_latency.observe(latency_seconds)
+        self.result_rows_written.inc(rows)
+
+    def record_result_backlog(self, rows: int):
+        """记录帧结果待写积压"""
+        self.result_backlog.set(rows)
+
+    def record_result_overflow(self, rows: int, policy: str):
+        """记录缓冲溢出（drop/spill）"""
+        self.result_overflow.labels(policy=policy).inc(rows)
+
+    def set_client_tier(self, client_id: str, tier: str):
+        """更新客户端所属档位（直方图分组依据）"""
+        self.client_stats.set_tier(client_id, tier)
+
+    def remove_client(self, client_id: str):
+        """客户端断开时移除其统计"""
+        self.client_stats.remove(client_id)
+
+    def record_overload_state(self, queue_depth: int, degraded_clients: int):
+        """记录过载调控器采样状态"""
+        self.inference_queue_depth.set(queue_depth)
+        self.overload_degraded_clients.set(degraded_clients)
+
+    def record_db_checkout(self, wait_seconds: float):
+        """记录一次连接池借出的等待耗时"""
+        self.db_pool_checkout_latency.observe(wait_seconds)
+
+    def record_db_pool_state(self, in_use: int, overflow: int):
+        """记录连接池借出数与溢出数"""
+        self.db_pool_in_use.set(in_use)
+        self.db_pool_overflow.set(overflow)
+
+    def record_db_connect(self):
+        """记录新建物理连接"""
+        self.db_pool_connects.inc()
+
+    def record_task_batch(self, task: str, size: int, duration: float, failed: int = 0):
+        """记录一次批量任务执行"""
+        self.task_batch_size.labels(task=task).observe(size)
+        self.task_batch_duration.labels(task=task).observe(duration)
+        self.task_batch_items.labels(task=task, status="success").inc(size - failed)
+        if failed:
+            self.task_batch_items.labels(task=task, status="failed").inc(failed)
+
+    def record_stream_frame(self, client_id: str, mode: str):
+        """记录视频流单帧的处理方式"""
+        self.stream_frames.labels(mode=mode).inc()
+        self.client_stats.add_frame(client_id, unchanged=mode == "unchanged")
+
+    def record_stream_message(self, message_type: str):
+        """记录视频流结果消息的下发方式"""
+        self.stream_messages.labels(type=message_type).inc()
+
+    def record_inference_request(self, route: str, outcome: str):
+        """记录同步推理接口的请求去向"""
+        self.inference_requests.labels(route=route, outcome=outcome).inc()
 
 
-# 全局单例（默认端口8001）
-monitor = PrometheusMonitor()
\ No newline at end of file
+# 全局单例
+monitor = PrometheusMonitor()
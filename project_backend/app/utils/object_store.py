@@ -0,0 +1,152 @@
+# \app\utils\object_store.py
+"""
+对象存储访问（MinIO / 本地目录）
+
+settings.OBJECT_STORE_BACKEND 选择后端：minio 用于部署环境，local 用于单机开发
+（API 与 Celery worker 需共享同一目录）。两者接口一致，对象以 key 标识。
+接口均为同步调用，在事件循环中使用时请放到线程中执行。
+"""
+import io
+import shutil
+import threading
+from pathlib import Path
+from typing import BinaryIO, Optional
+from project_backend.app.config.settings import settings
+
+# 流式上传的分片大小（MinIO 要求不小于 5MB）
+_PART_SIZE = 16 * 1024 * 1024
+
+
+class MinioObjectStore:
+    """MinIO 客户端封装（线程安全的延迟初始化，首次写入前创建桶）"""
+
+    def __init__(self, bucket: Optional[str] = None):
+        self.bucket = bucket or settings.MINIO_BUCKET
+        self._client = None
+        self._bucket_ready = False
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from minio import Minio
+                    self._client = Minio(
+                        settings.MINIO_ENDPOINT,
+                        access_key=settings.MINIO_ACCESS_KEY,
+                        secret_key=settings.MINIO_SECRET_KEY,
+                        secure=settings.MINIO_SECURE
+                    )
+        return self._client
+
+    def _ensure_bucket(self):
+        if self._bucket_ready:
+            return
+        with self._lock:
+            if not self._bucket_ready:
+                if not self.client.bucket_exists(self.bucket):
+                    self.client.make_bucket(self.bucket)
+                self._bucket_ready = True
+
+    def object_path(self, object_name: str) -> str:
+        """对象完整路径（bucket/key），用于记录到数据库"""
+        return f"{self.bucket}/{object_name}"
+
+    def upload_file(self, object_name: str, file_path: str,
+                    content_type: str = "application/octet-stream") -> str:
+        """上传本地文件（大文件自动分片），返回对象完整路径"""
+        self._ensure_bucket()
+        self.client.fput_object(self.bucket, object_name, file_path, content_type=content_type)
+        return self.object_path(object_name)
+
+    def put_bytes(self, object_name: str, data: bytes,
+                  content_type: str = "application/octet-stream") -> str:
+        """上传内存数据，返回对象完整路径"""
+        self._ensure_bucket()
+        self.client.put_object(
+            self.bucket, object_name, io.BytesIO(data), len(data), content_type=content_type
+        )
+        return self.object_path(object_name)
+
+    def put_stream(self, object_name: str, stream: BinaryIO, length: int,
+                   content_type: str = "application/octet-stream") -> str:
+        """上传文件对象（分片流式上传，不整体读入内存），返回对象完整路径"""
+        self._ensure_bucket()
+        self.client.put_object(
+            self.bucket, object_name, stream, length, content_type=content_type, part_size=_PART_SIZE
+        )
+        return self.object_path(object_name)
+
+    def download_file(self, object_name: str, file_path: str):
+        """下载对象到本地文件"""
+        self.client.fget_object(self.bucket, object_name, file_path)
+
+    def get_bytes(self, object_name: str) -> bytes:
+        response = self.client.get_object(self.bucket, object_name)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def remove(self, object_name: str):
+        self.client.remove_object(self.bucket, object_name)
+
+
+class LocalObjectStore:
+    """本地目录对象存储（开发环境，key 映射为目录下的相对路径）"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or settings.OBJECT_STORE_LOCAL_DIR)
+
+    def _path(self, object_name: str) -> Path:
+        path = (self.root / object_name).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"非法对象key: {object_name}")
+        return path
+
+    def object_path(self, object_name: str) -> str:
+        return str(self._path(object_name))
+
+    def upload_file(self, object_name: str, file_path: str,
+                    content_type: str = "application/octet-stream") -> str:
+        path = self._path(object_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(file_path, path)
+        return str(path)
+
+    def put_bytes(self, object_name: str, data: bytes,
+                  content_type: str = "application/octet-stream") -> str:
+        path = self._path(object_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return str(path)
+
+    def put_stream(self, object_name: str, stream: BinaryIO, length: int,
+                   content_type: str = "application/octet-stream") -> str:
+        path = self._path(object_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(stream, f)
+        return str(path)
+
+    def download_file(self, object_name: str, file_path: str):
+        shutil.copyfile(self._path(object_name), file_path)
+
+    def get_bytes(self, object_name: str) -> bytes:
+        return self._path(object_name).read_bytes()
+
+    def remove(self, object_name: str):
+        self._path(object_name).unlink(missing_ok=True)
+
+
+def create_object_store():
+    """按配置创建对象存储后端"""
+    if settings.OBJECT_STORE_BACKEND == "local":
+        return LocalObjectStore()
+    return MinioObjectStore()
+
+
+# 单例实例
+object_store = create_object_store()
@@ -0,0 +1,76 @@
+# \app\utils\upload.py
+"""
+上传图像的流式读取
+
+按 UPLOAD_CHUNK_SIZE 分块读取，累计超过 MAX_FILE_SIZE 立即中止，超限文件不会被完整缓冲；
+首块到达后即解析图像头（格式与宽高），像素数超过 MAX_IMAGE_PIXELS 的解压炸弹在读完与解码之前拒绝。
+返回读缓冲区上的 memoryview，np.frombuffer / cv2.imdecode 可直接使用而无需再复制。
+"""
+from typing import Optional
+from fastapi import HTTPException, UploadFile, status
+from project_backend.app.config.settings import settings
+from project_backend.app.utils.image_probe import ImageInfo, probe_image
+
+# 首次尝试解析图像头所需的最少字节数
+_MIN_HEADER_BYTES = 1024
+
+
+def _too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"文件大小超过 {max_size // 1024 // 1024}MB 限制"
+    )
+
+
+def _sniff(buffer: bytearray, max_pixels: int, final: bool) -> Optional[ImageInfo]:
+    """解析已读数据的图像头；final 为 True 时仍无法定位尺寸即拒绝"""
+    try:
+        info = probe_image(buffer)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+    if info is None:
+        if final:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="无法从文件头解析图像尺寸")
+        return None
+    if info.pixels > max_pixels:
+        raise HTTPException(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"图像尺寸 {info.width}x{info.height} 超过 {max_pixels} 像素限制"
+        )
+    return info
+
+
+async def read_image_upload(
+        file: UploadFile,
+        max_size: Optional[int] = None,
+        max_pixels: Optional[int] = None
+) -> memoryview:
+    """
+    分块读取上传图像并校验大小与尺寸（读取结束后关闭文件）
+
+    异常:
+        HTTPException: 413 文件或像素数超限；415 非支持的图像格式；400 文件头无法解析
+    """
+    max_size = max_size or settings.MAX_FILE_SIZE
+    max_pixels = max_pixels or settings.MAX_IMAGE_PIXELS
+    try:
+        # 表单解析阶段已知大小时无需读取
+        if file.size is not None and file.size > max_size:
+            raise _too_large(max_size)
+
+        buffer = bytearray()
+        info = None
+        while True:
+            chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if len(buffer) + len(chunk) > max_size:
+                raise _too_large(max_size)
+            buffer += chunk
+            if info is None and len(buffer) >= _MIN_HEADER_BYTES:
+                info = _sniff(buffer, max_pixels, final=len(buffer) >= settings.UPLOAD_SNIFF_BYTES)
+        if info is None:
+            _sniff(buffer, max_pixels, final=True)
+    finally:
+        await file.close()
+    return memoryview(buffer)
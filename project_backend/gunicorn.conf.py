@@ -0,0 +1,12 @@
+# \gunicorn.conf.py
+"""
+gunicorn 配置（docker/app.Dockerfile 以 --config 加载）
+
+多进程指标模式下（PROMETHEUS_MULTIPROC_DIR），worker 退出时清理其指标文件，
+避免已退出 worker 的 live 类 Gauge 仍被聚合。
+"""
+
+
+def child_exit(server, worker):
+    from project_backend.app.config.prometheus import mark_worker_dead
+    mark_worker_dead(worker.pid)
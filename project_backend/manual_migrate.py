@@ -5,17 +5,44 @@ from project_backend.app.database.base import async_engine, Base
 from project_backend.app.database.models.frame import FrameResult
 from project_backend.app.database.models.task import Task
 from project_backend.app.database.models.metadata import ModelMetadata
-from sqlalchemy import text
+from project_backend.app.database.models.rollup import TaskFrameRollup
+from project_backend.app.database.models.image_record import ImageProcessRecord
+from project_backend.app.database.partitions import partition_frame_results
+from sqlalchemy import inspect, text
 
 if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
+def ensure_indexes(sync_conn):
+    """为已存在的表补建模型中声明的索引（如键集分页复合索引）"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
+def ensure_columns(sync_conn):
+    """为已存在的表补建模型中新增的可空列（如 tasks.archive_path、tasks.progress）"""
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                col_type = column.type.compile(dialect=sync_conn.dialect)
+                sync_conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+
+
 async def main():
     try:
         async with async_engine.connect() as conn:
             ping = await conn.scalar(text("SELECT 1"))
             print(f"✅ 数据库心跳检测成功: {ping}")
             await conn.run_sync(Base.metadata.create_all)
+            # create_all 不会给已存在的表补建索引，这里逐个检查补齐
+            await conn.run_sync(ensure_columns)
+            await conn.run_sync(ensure_indexes)
+            # frame_results 转为按天分区表（已分区时仅预建后续分区）
+            converted = await conn.run_sync(partition_frame_results)
+            print(f"✅ frame_results 分区{'转换完成' if converted else '已就绪'}")
             await conn.commit()
             tables = await conn.scalar(
                 text("SELECT COUNT(*) FROM information_schema.tables WHERE table_schema='public'")
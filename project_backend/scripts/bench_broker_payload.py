@@ -0,0 +1,88 @@
+# \scripts\bench_broker_payload.py
+"""
+Celery 消息负载基准测试：图像字节入队 vs 对象存储引用入队
+
+用法：
+    python -m project_backend.scripts.bench_broker_payload --count 1000 --size-mb 5
+
+向 settings.BROKER_URL（Redis）的独立队列投递 count 条消息（不启动worker消费）：
+- bytes: 旧方式，图像字节经 pickle + zlib 进入消息体
+- ref:   新方式，API 先上传对象存储，消息体只携带 JSON 编码的对象key
+输出入队吞吐与 Redis used_memory 增量，结束后清空测试队列并删除上传对象。
+"""
+import argparse
+import logging
+import os
+import time
+import uuid
+import redis
+from project_backend.app.config.settings import settings
+from project_backend.app.tasks.celery_config import app as celery_app
+from project_backend.app.utils.object_store import object_store
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("bench-broker")
+
+TASK_NAME = "app.tasks.process_tasks.edge_detection_task"
+
+
+def used_memory(client: redis.Redis) -> int:
+    return client.info("memory")["used_memory"]
+
+
+def run_mode(mode: str, count: int, image: bytes, client: redis.Redis) -> dict:
+    queue = f"bench_payload_{mode}"
+    client.delete(queue)
+    keys = []
+    baseline = used_memory(client)
+
+    upload_seconds = 0.0
+    start = time.perf_counter()
+    for i in range(count):
+        if mode == "bytes":
+            celery_app.send_task(
+                TASK_NAME, args=(image, f"{i}.jpg"),
+                queue=queue, serializer="pickle", compression="zlib"
+            )
+        else:
+            key = f"{settings.UPLOAD_PREFIX}/bench-{uuid.uuid4().hex}.jpg"
+            upload_start = time.perf_counter()
+            object_store.put_bytes(key, image, content_type="image/jpeg")
+            upload_seconds += time.perf_counter() - upload_start
+            keys.append(key)
+            celery_app.send_task(TASK_NAME, args=(key, f"{i}.jpg"), queue=queue, serializer="json")
+    elapsed = time.perf_counter() - start
+    memory = used_memory(client) - baseline
+
+    client.delete(queue)
+    for key in keys:
+        object_store.remove(key)
+    return {
+        "enqueue_per_sec": count / (elapsed - upload_seconds),
+        "total_per_sec": count / elapsed,
+        "redis_mb": memory / 1024 / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Celery 消息负载基准测试")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--size-mb", type=float, default=5.0)
+    parser.add_argument("--modes", nargs="+", choices=["bytes", "ref"], default=["bytes", "ref"])
+    args = parser.parse_args()
+
+    # 随机字节近似已压缩的JPEG（zlib几乎无法再压缩）
+    image = os.urandom(int(args.size_mb * 1024 * 1024))
+    client = redis.Redis.from_url(settings.BROKER_URL)
+    celery_app.conf.accept_content = ["json", "pickle"]  # 仅本基准发送旧格式消息
+
+    for mode in args.modes:
+        stats = run_mode(mode, args.count, image, client)
+        logger.info(
+            f"{mode:>5}: 入队 {stats['enqueue_per_sec']:,.1f} msg/s，"
+            f"含上传 {stats['total_per_sec']:,.1f} msg/s，Redis 增量 {stats['redis_mb']:,.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# \scripts\bench_bulk_ingest.py
+"""
+帧结果批量写入基准测试
+
+用法：
+    python -m project_backend.scripts.bench_bulk_ingest --sizes 10000 100000 1000000
+
+对 settings.DATABASE_URL 指向的数据库执行 VideoProcessingDAL.bulk_ingest_frames，
+输出各规模下的写入吞吐（rows/sec）。每轮使用独立任务，结束后级联删除。
+"""
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+import uuid
+from sqlalchemy import delete, insert
+from project_backend.app.database.base import async_engine, AsyncSessionLocal, Base, VideoProcessingDAL
+from project_backend.app.database.models.frame import FrameResult, GenderEnum
+from project_backend.app.database.models.task import Task, TaskStatus
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("bench-ingest")
+
+if sys.platform == 'win32':
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+
+def generate_rows(task_id: uuid.UUID, count: int):
+    """惰性生成测试帧（30fps时间戳）"""
+    genders = (GenderEnum.MALE, GenderEnum.FEMALE)
+    for i in range(count):
+        yield (uuid.uuid4(), task_id, i, random.choice(genders), random.random(), i / 30)
+
+
+async def run_once(count: int, batch_size: int) -> float:
+    task_id = uuid.uuid4()
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(Task), [{"id": task_id, "status": TaskStatus.PROCESSING}])
+        await session.commit()
+
+        start = time.perf_counter()
+        written = await VideoProcessingDAL(session).bulk_ingest_frames(
+            generate_rows(task_id, count), batch_size=batch_size
+        )
+        elapsed = time.perf_counter() - start
+
+        await session.execute(delete(FrameResult).where(FrameResult.task_id == task_id))
+        await session.execute(delete(Task).where(Task.id == task_id))
+        await session.commit()
+    return written / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="帧结果批量写入基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    logger.info(f"方言: {async_engine.dialect.name}, 批大小: {args.batch_size}")
+    for size in args.sizes:
+        rate = await run_once(size, args.batch_size)
+        logger.info(f"{size:>9,} 行: {rate:,.0f} rows/sec")
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+# \scripts\bench_db_pool.py
+"""
+数据库连接池规模压测
+
+用法：
+    python -m project_backend.scripts.bench_db_pool --pool-sizes 2 4 8 16 32 --concurrency 64
+
+对每个连接池大小新建独立引擎（max_overflow=0），以固定并发持续执行查询，
+输出吞吐（queries/sec）与P95延迟，并给出吞吐拐点：吞吐达到最大值
+--knee-ratio 比例的最小连接池。结果用于设置 DB_POOL_SIZE / DB_MAX_CONNECTIONS。
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from project_backend.app.config.settings import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("bench-pool")
+
+if sys.platform == 'win32':
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+
+async def run_pool_size(pool_size: int, concurrency: int, duration: float, query: str):
+    """固定并发压测单个连接池大小，返回 (吞吐, P95延迟毫秒)"""
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        pool_size=pool_size,
+        max_overflow=0,
+        pool_timeout=duration + 30,
+        pool_pre_ping=True
+    )
+    stmt = text(query)
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            async with engine.connect() as conn:
+                await conn.execute(stmt)
+            latencies.append(time.perf_counter() - start)
+
+    # 预热，避免建连开销计入结果
+    conns = await asyncio.gather(*(engine.connect() for _ in range(pool_size)))
+    for conn in conns:
+        await conn.close()
+
+    begin = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - begin
+    await engine.dispose()
+
+    p95 = statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else 0.0
+    return len(latencies) / elapsed, p95
+
+
+def find_knee(results, ratio: float) -> int:
+    """吞吐达到最大值 ratio 比例的最小连接池大小"""
+    best = max(qps for _, qps, _ in results)
+    return next(size for size, qps, _ in results if qps >= best * ratio)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="数据库连接池规模压测")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="每个连接池大小的压测时长（秒）")
+    parser.add_argument("--query", default="SELECT 1", help="压测语句（建议替换为代表性查询）")
+    parser.add_argument("--knee-ratio", type=float, default=0.95)
+    args = parser.parse_args()
+
+    results = []
+    for size in sorted(args.pool_sizes):
+        qps, p95 = await run_pool_size(size, args.concurrency, args.duration, args.query)
+        results.append((size, qps, p95))
+        logger.info(f"pool_size={size:>3}: {qps:>10,.0f} q/s, P95 {p95:>8.2f} ms")
+
+    knee = find_knee(results, args.knee_ratio)
+    logger.info(
+        f"吞吐拐点: pool_size={knee}（并发 {args.concurrency}）；"
+        f"多worker部署时 DB_MAX_CONNECTIONS ≈ {knee} × UVICORN_WORKERS × 1.5"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
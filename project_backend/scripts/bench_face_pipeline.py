@@ -0,0 +1,103 @@
+# \scripts\bench_face_pipeline.py
+"""
+两阶段人脸识别基准测试：不同人脸数下的帧吞吐
+
+用法：
+    python -m project_backend.scripts.bench_face_pipeline --face test_images/test.jpg \\
+        --detector weights/yolov8n-face.pt --faces 1 5 20
+
+把单张人脸图按网格平铺成 1280 宽的帧（每格一张脸），分别测量：
+- batch: 检测 + 全部人脸一次批量前向（FaceGenderPipeline.process）
+- loop:  检测 + 逐张人脸前向（对照组）
+输出 frames/sec 与检测/分类阶段耗时，以及检测器实际找到的人脸数。
+"""
+import argparse
+import logging
+import math
+import time
+import cv2
+import numpy as np
+from ultralytics import YOLO
+from project_backend.app.config.settings import settings
+from project_backend.app.ml_models.face_pipeline import FaceGenderPipeline
+from project_backend.app.ml_models.onnx_inference import ONNXGenderClassifier
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("bench-face")
+
+FRAME_WIDTH = 1280
+
+
+def build_frame(face: np.ndarray, count: int) -> np.ndarray:
+    """把人脸图平铺为 count 格的网格帧"""
+    cols = math.ceil(math.sqrt(count))
+    rows = math.ceil(count / cols)
+    cell = FRAME_WIDTH // cols
+    frame = np.zeros((rows * cell, cols * cell, 3), np.uint8)
+    tile = cv2.resize(face, (cell, cell), interpolation=cv2.INTER_AREA)
+    for i in range(count):
+        r, c = divmod(i, cols)
+        frame[r * cell:(r + 1) * cell, c * cell:(c + 1) * cell] = tile
+    return frame
+
+
+def run_mode(pipeline: FaceGenderPipeline, frame: np.ndarray, mode: str, iterations: int) -> dict:
+    detect_seconds = classify_seconds = 0.0
+    faces = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        boxes = pipeline.detect(frame)
+        t1 = time.perf_counter()
+        crops = pipeline.crop(frame, boxes)
+        if mode == "batch":
+            pipeline.classifier.predict_batch(crops)
+        else:
+            for crop in crops:
+                pipeline.classifier.predict_batch([crop])
+        t2 = time.perf_counter()
+        detect_seconds += t1 - t0
+        classify_seconds += t2 - t1
+        faces = len(boxes)
+    elapsed = time.perf_counter() - start
+    return {
+        "fps": iterations / elapsed,
+        "detect_ms": detect_seconds / iterations * 1000,
+        "classify_ms": classify_seconds / iterations * 1000,
+        "faces": faces
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="两阶段人脸识别基准测试")
+    parser.add_argument("--face", required=True, help="单张人脸图像路径")
+    parser.add_argument("--detector", default=settings.FACE_DETECTOR_PATH, help="YOLO人脸检测模型路径")
+    parser.add_argument("--classifier", default=settings.GENDER_CLASSIFIER_PATH, help="性别分类ONNX模型路径")
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", choices=["batch", "loop"], default=["batch", "loop"])
+    args = parser.parse_args()
+    if not args.detector:
+        parser.error("需要 --detector 或 settings.FACE_DETECTOR_PATH")
+
+    face = cv2.imread(args.face, cv2.IMREAD_COLOR)
+    if face is None:
+        parser.error(f"无法读取图像: {args.face}")
+    pipeline = FaceGenderPipeline(
+        YOLO(args.detector), ONNXGenderClassifier(args.classifier), max_faces=max(args.faces)
+    )
+
+    for count in args.faces:
+        frame = build_frame(face, count)
+        run_mode(pipeline, frame, "batch", args.warmup)
+        for mode in args.modes:
+            stats = run_mode(pipeline, frame, mode, args.iterations)
+            logger.info(
+                f"{count:>3} 脸 {mode:>5}: {stats['fps']:,.1f} frames/s，检测 {stats['detect_ms']:.1f} ms，"
+                f"分类 {stats['classify_ms']:.1f} ms（检出 {stats['faces']} 张）"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 # \scripts\migrate_db.py
 import argparse
+import asyncio
 import subprocess
 import logging
 import os
@@ -7,7 +8,9 @@ import time
 from pathlib import Path
 from alembic.config import Config
 from alembic import command
+from sqlalchemy.ext.asyncio import create_async_engine
 from project_backend.app.config.settings import settings
+from project_backend.app.database.partitions import partition_frame_results
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -60,6 +63,19 @@ class MigrationManager:
             command.revision(self.alembic_cfg, autogenerate=True, message="auto-generate")
         command.upgrade(self.alembic_cfg, revision)
 
+    def partition_frame_results(self):
+        """frame_results 转为按天分区表并预建分区（幂等）"""
+        async def run():
+            engine = create_async_engine(os.environ["TARGET_DB"])
+            try:
+                async with engine.begin() as conn:
+                    return await conn.run_sync(partition_frame_results)
+            finally:
+                await engine.dispose()
+
+        converted = asyncio.run(run())
+        logger.info("frame_results 已转换为分区表" if converted else "frame_results 分区已就绪")
+
     def seed_initial_data(self):
         """初始化基础数据"""
         logger.info("正在初始化种子数据...")
@@ -83,6 +99,7 @@ def main():
     try:
         logger.info(f"开始 {args.env} 环境数据库迁移")
         migrator.run_migration()
+        migrator.partition_frame_results()
 
         if args.seed:
             migrator.seed_initial_data()
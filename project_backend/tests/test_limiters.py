@@ -0,0 +1,73 @@
+import pytest
+from project_backend.app.config.settings import settings
+from project_backend.app.services import limiters
+from project_backend.app.services.limiters import BandwidthLimiter, SlidingWindowMeter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可控的 time.monotonic（limiters 按单调时钟计量）"""
+    now = [100.5]
+    monkeypatch.setattr(limiters.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def bandwidth_settings(monkeypatch):
+    # 单客户端 1Mbit/s、全局 10Mbit/s，10 秒窗口，1 秒内允许 2 倍突发
+    monkeypatch.setattr(settings, "MAX_BANDWIDTH_MBPS", 10)
+    monkeypatch.setattr(settings, "MAX_CLIENT_BANDWIDTH_MBPS", 1)
+    monkeypatch.setattr(settings, "BANDWIDTH_WINDOW_SECONDS", 10)
+    monkeypatch.setattr(settings, "BANDWIDTH_BURST_FACTOR", 2)
+
+
+def test_meter_rate_covers_window_then_expires():
+    meter = SlidingWindowMeter(10, buckets=10)
+    meter.add(1000, now=0.5)
+
+    assert meter.rate(0.5) == 1000 * 8 / 10
+    assert meter.rate(9.9) == 1000 * 8 / 10  # 仍在窗口内
+    assert meter.rate(10.5) == 0  # 所在桶已滑出窗口
+
+
+def test_meter_burst_span_counts_recent_buckets_only():
+    meter = SlidingWindowMeter(10, buckets=10)
+    meter.add(1000, now=0.5)
+    meter.add(500, now=3.5)
+
+    assert meter.rate(3.5, span=1) == 500 * 8
+    assert meter.rate(3.5) == 1500 * 8 / 10
+
+
+def test_meter_reused_bucket_is_reset():
+    meter = SlidingWindowMeter(10, buckets=10)
+    meter.add(1000, now=0.5)
+    meter.add(200, now=10.5)  # 与第一次写入落在同一个环形桶
+
+    assert meter.rate(10.5) == 200 * 8 / 10
+
+
+def test_admit_allows_burst_up_to_factor(clock, bandwidth_settings):
+    limiter = BandwidthLimiter()
+
+    # 1 秒内 200KB = 1.6Mbit/s，低于 2 倍突发上限
+    assert limiter.admit("a", 200_000)
+    # 再来 100KB 使突发速率达到 2.4Mbit/s，拒绝
+    assert not limiter.admit("a", 100_000)
+
+    # 下一秒突发窗口重新计算，持续速率 (300KB+200KB)/10s 仍在配额内
+    clock[0] += 1
+    assert limiter.admit("a", 200_000)
+
+
+def test_denied_frames_do_not_consume_global_quota(clock, bandwidth_settings):
+    limiter = BandwidthLimiter()
+
+    assert limiter.admit("a", 200_000)
+    assert not limiter.admit("a", 200_000)
+
+    # 被拒绝的帧只计入客户端自身速率
+    assert limiter.get_client_rate("a") == 400_000 * 8 / 10
+    assert limiter.global_meter.rate(clock[0]) == 200_000 * 8 / 10
+    # 超限客户端不影响其他客户端
+    assert limiter.admit("b", 200_000)
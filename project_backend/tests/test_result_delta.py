@@ -0,0 +1,82 @@
+import pytest
+from project_backend.app.config.settings import settings
+from project_backend.app.services import result_delta
+from project_backend.app.services.result_delta import DeltaEncoder
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(result_delta.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(settings, "STREAM_KEYFRAME_INTERVAL", 5)
+    monkeypatch.setattr(settings, "DELTA_CONFIDENCE_STEP", 0.05)
+    monkeypatch.setattr(settings, "DELTA_BBOX_TOLERANCE", 2)
+    return now
+
+
+def pred(track_id: int, x: float = 0.0, confidence: float = 0.9, label: str = "male") -> dict:
+    return {"track_id": track_id, "label": label, "confidence": confidence, "bbox": [x, 0.0, x + 50.0, 50.0]}
+
+
+def response(*predictions, **extra) -> dict:
+    return {"predictions": list(predictions), "timestamp": "t", **extra}
+
+
+def test_first_message_is_full(clock):
+    encoder = DeltaEncoder()
+    message = encoder.encode(response(pred(1), pred(2)))
+
+    assert message["type"] == "full"
+    assert message["seq"] == 1
+    assert [p["track_id"] for p in message["predictions"]] == [1, 2]
+
+
+def test_changes_below_thresholds_are_suppressed(clock):
+    encoder = DeltaEncoder()
+    encoder.encode(response(pred(1)))
+
+    clock[0] = 1
+    assert encoder.encode(response(pred(1))) is None
+    assert encoder.encode(response(pred(1, x=1.5, confidence=0.93))) is None
+
+
+def test_delta_lists_updated_and_removed_tracks(clock):
+    encoder = DeltaEncoder()
+    encoder.encode(response(pred(1), pred(2)))
+
+    clock[0] = 1
+    message = encoder.encode(response(pred(1, x=10), pred(3)))
+
+    assert message["type"] == "delta"
+    assert message["seq"] == 2
+    assert [p["track_id"] for p in message["updated"]] == [1, 3]
+    assert message["removed"] == [2]
+
+    # 标签变化总是下发
+    message = encoder.encode(response(pred(1, x=10, label="female"), pred(3)))
+    assert [p["track_id"] for p in message["updated"]] == [1]
+    assert "removed" not in message
+
+
+def test_extra_fields_sent_without_prediction_changes(clock):
+    encoder = DeltaEncoder()
+    encoder.encode(response(pred(1)))
+
+    clock[0] = 1
+    message = encoder.encode(response(pred(1), quality={"tier": "low"}))
+
+    assert message["type"] == "delta"
+    assert message["quality"] == {"tier": "low"}
+    assert "updated" not in message and "removed" not in message
+
+
+def test_keyframe_resent_after_interval(clock):
+    encoder = DeltaEncoder()
+    encoder.encode(response(pred(1)))
+
+    clock[0] = 4.9
+    assert encoder.encode(response(pred(1))) is None
+    clock[0] = 5
+    message = encoder.encode(response(pred(1)))
+    assert message["type"] == "full"
+    assert message["seq"] == 2
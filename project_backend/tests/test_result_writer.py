@@ -0,0 +1,131 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+import pytest
+from project_backend.app.config.settings import settings
+from project_backend.app.database import result_writer
+from project_backend.app.database.models.task import TaskStatus
+from project_backend.app.database.result_writer import FrameResultWriter
+
+
+class FakeDatabase:
+    """记录每个事务内执行的语句；fail_next 为真时下一次写帧失败（事务回滚）"""
+
+    def __init__(self):
+        self.transactions = []
+        self.fail_next = False
+
+    @asynccontextmanager
+    async def get_db(self):
+        statements = []
+        yield FakeSession(statements)
+        self.transactions.append(statements)
+
+    def dal(self, session):
+        return FakeDAL(self, session)
+
+
+class FakeSession:
+    def __init__(self, statements):
+        self.statements = statements
+
+    async def execute(self, stmt, params=None):
+        self.statements.append((stmt.__visit_name__, params))
+
+
+class FakeDAL:
+    def __init__(self, database, session):
+        self.database = database
+        self.session = session
+
+    async def bulk_ingest_frames(self, rows, batch_size, commit):
+        if self.database.fail_next:
+            self.database.fail_next = False
+            raise ConnectionError("database down")
+        self.session.statements.append(("frames", [row[2] for row in rows]))
+
+
+@pytest.fixture
+def database(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "RESULT_BUFFER_MAX_ROWS", 4)
+    monkeypatch.setattr(settings, "RESULT_FLUSH_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "RESULT_OVERFLOW_POLICY", "drop")
+    monkeypatch.setattr(settings, "RESULT_SPILL_DIR", str(tmp_path))
+    db = FakeDatabase()
+    monkeypatch.setattr(result_writer, "get_db", db.get_db)
+    monkeypatch.setattr(result_writer, "VideoProcessingDAL", db.dal)
+    return db
+
+
+def frame_indexes(writer: FrameResultWriter) -> list:
+    return [row[2] for row in writer._rows]
+
+
+def append_frames(writer: FrameResultWriter, task_id, count: int):
+    for i in range(1, count + 1):
+        writer.append(task_id, i, "male", 0.9, i / 30)
+
+
+def test_overflow_drops_oldest_batch(database):
+    writer = FrameResultWriter()
+    append_frames(writer, uuid.uuid4(), 5)
+
+    assert frame_indexes(writer) == [3, 4, 5]
+
+
+def test_overflow_spills_and_reloads(database, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "RESULT_OVERFLOW_POLICY", "spill")
+    writer = FrameResultWriter()
+    task_id = uuid.uuid4()
+    append_frames(writer, task_id, 5)
+
+    assert frame_indexes(writer) == [3, 4, 5]
+    assert len(list(tmp_path.glob("frame_results-*.jsonl"))) == 1
+
+    writer._rows.clear()
+    writer._reload_spill()
+
+    assert frame_indexes(writer) == [1, 2]
+    assert writer._rows[0][1] == task_id
+    assert not list(tmp_path.iterdir())
+
+
+def test_corrupt_spill_file_quarantined(database, tmp_path):
+    (tmp_path / "frame_results-1.jsonl").write_text("not json\n", encoding="utf-8")
+    writer = FrameResultWriter()
+    writer._reload_spill()
+
+    assert not writer._rows
+    assert [p.name for p in tmp_path.iterdir()] == ["frame_results-1.bad"]
+
+
+def test_task_closed_with_its_last_frames(database):
+    writer = FrameResultWriter()
+    task_id = writer.open_task()
+    append_frames(writer, task_id, 3)
+    writer.close_task(task_id, TaskStatus.COMPLETED)
+
+    assert asyncio.run(writer._flush_once())
+    assert asyncio.run(writer._flush_once())
+
+    first, second = database.transactions
+    # 任务记录随第一批写入，终态只在包含该会话最后一帧的批次中更新
+    assert [name for name, _ in first] == ["insert", "frames"]
+    assert first[1] == ("frames", [1, 2])
+    assert second[0] == ("frames", [3])
+    assert second[1] == ("update", [{"id": task_id, "status": TaskStatus.COMPLETED}])
+
+
+def test_failed_flush_restores_batch_and_closures(database):
+    writer = FrameResultWriter()
+    task_id = writer.open_task()
+    append_frames(writer, task_id, 2)
+    writer.close_task(task_id, TaskStatus.FAILED)
+
+    database.fail_next = True
+    assert not asyncio.run(writer._flush_once())
+    assert frame_indexes(writer) == [1, 2]
+    assert not database.transactions
+
+    assert asyncio.run(writer._flush_once())
+    assert [name for name, _ in database.transactions[0]] == ["insert", "frames", "update"]
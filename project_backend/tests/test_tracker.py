@@ -0,0 +1,97 @@
+import pytest
+from project_backend.app.config.settings import settings
+from project_backend.app.services.tracker import StreamTracker
+
+
+@pytest.fixture
+def track_settings(monkeypatch):
+    monkeypatch.setattr(settings, "TRACK_DETECT_INTERVAL", 3)
+    monkeypatch.setattr(settings, "TRACK_IOU_THRESHOLD", 0.3)
+    monkeypatch.setattr(settings, "TRACK_MAX_MISSES", 1)
+    monkeypatch.setattr(settings, "TRACK_GENDER_EMA", 0.5)
+    monkeypatch.setattr(settings, "TRACK_LABEL_HYSTERESIS", 0.1)
+    monkeypatch.setattr(settings, "TRACK_VOTE_WINDOW", 3)
+    monkeypatch.setattr(settings, "TRACK_SMOOTHING", "ema")
+
+
+def det(x: float, label: str = "male", confidence: float = 0.9) -> dict:
+    return {"bbox": [x, 0.0, x + 100.0, 100.0], "label": label, "confidence": confidence}
+
+
+def id_near(results, x: float) -> int:
+    """输出框经过平滑，按最近的左边界找对应轨迹"""
+    return min(results, key=lambda r: abs(r["bbox"][0] - x))["track_id"]
+
+
+def test_detection_runs_every_interval(track_settings):
+    tracker = StreamTracker()
+    assert tracker.needs_detection()  # 尚无轨迹
+
+    tracker.update([det(0)])
+    assert not tracker.needs_detection()
+    tracker.predict()
+    assert not tracker.needs_detection()
+    assert tracker.needs_detection(force=True)  # 场景切换等外部触发
+    tracker.predict()
+    assert tracker.needs_detection()
+
+
+def test_detections_keep_track_id_by_iou(track_settings):
+    tracker = StreamTracker()
+    first = tracker.update([det(0), det(500)])
+
+    # 检测顺序变化、框轻微移动，仍沿用原 track_id；远处的新框新建轨迹
+    second = tracker.update([det(505), det(1000), det(5)])
+
+    assert id_near(second, 5) == id_near(first, 0)
+    assert id_near(second, 505) == id_near(first, 500)
+    assert id_near(second, 1000) not in {r["track_id"] for r in first}
+
+
+def test_missed_track_hidden_then_removed(track_settings):
+    tracker = StreamTracker()
+    tracker.update([det(0), det(500)])
+
+    # 一轮未命中：保留轨迹但不输出
+    results = tracker.update([det(0)])
+    assert len(results) == 1
+    assert len(tracker.tracks) == 2
+
+    # 超过 TRACK_MAX_MISSES 轮未命中：删除
+    tracker.update([det(0)])
+    assert len(tracker.tracks) == 1
+
+
+def test_predict_extrapolates_motion(track_settings):
+    tracker = StreamTracker()
+    tracker.update([det(0)])
+    corrected = tracker.update([det(10)])[0]["bbox"][0]
+
+    # 非检测帧按估计速度继续向右外推
+    assert tracker.predict()[0]["bbox"][0] > corrected
+
+
+def test_ema_label_switches_only_past_hysteresis(track_settings):
+    tracker = StreamTracker()
+    labels = [
+        tracker.update([det(0, label, confidence)])[0]["label"]
+        for label, confidence in [("male", 0.9), ("female", 0.7), ("female", 0.7), ("female", 0.7)]
+    ]
+
+    # 男性概率 0.9 -> 0.6 -> 0.45 -> 0.375：跌破 0.5-0.1 才切换
+    assert labels == ["male", "male", "male", "female"]
+
+
+def test_vote_ignores_single_misclassification(track_settings, monkeypatch):
+    monkeypatch.setattr(settings, "TRACK_SMOOTHING", "vote")
+    tracker = StreamTracker()
+    for label in ["male", "male", "female"]:
+        result = tracker.update([det(0, label, 0.9)])[0]
+
+    assert result["label"] == "male"
+    assert result["confidence"] == pytest.approx(0.9)
+
+    # 窗口内多数为女性后切换
+    result = tracker.update([det(0, "female", 0.8)])[0]
+    assert result["label"] == "female"
+    assert result["confidence"] == pytest.approx(0.85)
@@ -0,0 +1,86 @@
+import asyncio
+import io
+import struct
+import tracemalloc
+import pytest
+from fastapi import HTTPException, UploadFile
+from project_backend.app.config.settings import settings
+from project_backend.app.utils.upload import read_image_upload
+
+UPLOAD_SIZE = 100 * 1024 * 1024  # 100MB
+
+
+class LazyUpload(io.RawIOBase):
+    """按需生成内容的上传流（JPEG 文件头 + 填充），不在内存中持有整个文件"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.position = 0
+        # SOI + SOF0(640x480, 3通道)
+        self.header = b"\xff\xd8" + b"\xff\xc0" + struct.pack(">HBHHB", 17, 8, 480, 640, 3) + b"\x00" * 9
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if size < 0:
+            size = self.size - self.position
+        size = min(size, self.size - self.position)
+        start, self.position = self.position, self.position + size
+        head = self.header[start:start + size]
+        return head + b"\x00" * (size - len(head))
+
+
+def png_header(width: int, height: int) -> bytes:
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+
+
+def test_oversized_upload_rejected_with_bounded_memory():
+    stream = LazyUpload(UPLOAD_SIZE)
+    upload = UploadFile(stream, filename="huge.jpg")  # 大小未知，只能边读边判断
+
+    tracemalloc.start()
+    try:
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(read_image_upload(upload))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert exc_info.value.status_code == 413
+    # 读到上限即中止，峰值内存与上限同量级，而不是 100MB
+    assert stream.position <= settings.MAX_FILE_SIZE + settings.UPLOAD_CHUNK_SIZE
+    assert peak < 2 * settings.MAX_FILE_SIZE
+    assert stream.closed
+
+
+def test_oversized_upload_with_known_size_not_read():
+    stream = LazyUpload(UPLOAD_SIZE)
+    upload = UploadFile(stream, size=UPLOAD_SIZE, filename="huge.jpg")
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(read_image_upload(upload))
+
+    assert exc_info.value.status_code == 413
+    assert stream.position == 0
+
+
+def test_decompression_bomb_rejected_from_header():
+    data = png_header(100_000, 100_000) + b"\x00" * 2048
+    upload = UploadFile(io.BytesIO(data), filename="bomb.png")
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(read_image_upload(upload))
+
+    assert exc_info.value.status_code == 413
+    assert "100000x100000" in exc_info.value.detail
+
+
+def test_valid_upload_returns_buffer_view():
+    data = png_header(640, 480) + b"\x00" * 4096
+    upload = UploadFile(io.BytesIO(data), filename="ok.png")
+
+    view = asyncio.run(read_image_upload(upload))
+
+    assert isinstance(view, memoryview)
+    assert view.tobytes() == data